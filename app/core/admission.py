@@ -0,0 +1,177 @@
+import asyncio
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_REJECTED
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """"dashboard=3/6,lists=8/32" -> {"dashboard": (3, 6), "lists": (8, 32)} (concurrency / queue)."""
+    limits = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, value = item.partition("=")
+        concurrency, _, queue = value.partition("/")
+        try:
+            limits[name.strip()] = (max(1, int(concurrency)), max(0, int(queue or 0)))
+        except ValueError:
+            raise ValueError(f"bad ADMISSION_LIMITS entry {item!r}; expected name=concurrency/queue")
+    return limits
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RouteClassLimiter:
+    """
+    `concurrency` requests of one route class run at a time; up to `queue`
+    more wait for a slot. A request is turned away at once when the queue
+    is full, or when the expected wait (queue position x the class's
+    average service time) is already past the deadline; one that does
+    queue gives up when the deadline passes.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self.service_s: Optional[float] = None  # EWMA of slot hold time
+        self._sem = asyncio.Semaphore(concurrency)
+
+    def expected_wait(self) -> float:
+        if self.service_s is None:
+            return 0.0
+        return (self.waiting + 1) / self.concurrency * self.service_s
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        wait = self.expected_wait() or 1.0
+        raise Rejected(reason, max(1, math.ceil(wait)))
+
+    async def acquire(self, deadline_s: float):
+        if not self._sem.locked() and not self.waiting:
+            await self._sem.acquire()  # free slot: returns without suspending
+            self.active += 1
+            ADMISSION_ACTIVE.labels(self.name).inc()
+            return
+        if self.waiting >= self.queue:
+            self._reject("queue_full")
+        if self.expected_wait() > deadline_s:
+            self._reject("deadline")
+        self.waiting += 1
+        ADMISSION_QUEUED.labels(self.name).inc()
+        try:
+            await asyncio.wait_for(self._sem.acquire(), deadline_s)
+        except asyncio.TimeoutError:
+            self._reject("timeout")
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUED.labels(self.name).dec()
+        self.active += 1
+        ADMISSION_ACTIVE.labels(self.name).inc()
+
+    def release(self, held_s: float):
+        self.active -= 1
+        ADMISSION_ACTIVE.labels(self.name).dec()
+        self._sem.release()
+        self.service_s = held_s if self.service_s is None else 0.8 * self.service_s + 0.2 * held_s
+
+    def status(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "avg_service_ms": round(self.service_s * 1000, 1) if self.service_s is not None else None,
+        }
+
+
+class AdmissionController:
+    """Route class per router, set up in main.py with `limit_router`."""
+
+    def __init__(self):
+        self.limiters: Dict[str, RouteClassLimiter] = {}
+        self._endpoints: Dict[object, str] = {}  # endpoint function -> route class
+        self._routes: Optional[List[Tuple[object, str]]] = None
+
+    def limit_router(self, route_class: str, router, exclude=(), only=None):
+        """
+        Put every route of `router` (bar the paths in `exclude`, or just the
+        paths in `only`, as written in the router) under `route_class`.
+        Limits come from ADMISSION_LIMITS; a class missing there is unlimited.
+        """
+        limits = parse_limits(settings.ADMISSION_LIMITS)
+        if route_class in limits and route_class not in self.limiters:
+            self.limiters[route_class] = RouteClassLimiter(route_class, *limits[route_class])
+        for route in router.routes:
+            path = getattr(route, "path", None)
+            if path not in exclude and (only is None or path in only) and hasattr(route, "endpoint"):
+                self._endpoints[route.endpoint] = route_class
+        self._routes = None
+
+    def classify(self, app, scope) -> Tuple[Optional[str], Optional[object]]:
+        if self._routes is None:
+            # include_router copies routes, so match the app's copies by endpoint
+            self._routes = [
+                (route, self._endpoints[route.endpoint]) for route in app.routes
+                if self._endpoints.get(getattr(route, "endpoint", None)) in self.limiters
+            ]
+        for route, route_class in self._routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return route_class, route
+        return None, None
+
+    def status(self) -> dict:
+        return {name: limiter.status() for name, limiter in self.limiters.items()}
+
+
+controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """
+    Holds a route-class slot for the whole response, streamed bodies
+    included, and answers 503 + Retry-After when no slot frees up in time.
+    Limits are per worker process.
+    """
+
+    def __init__(self, app, fastapi_app, controller: AdmissionController = controller):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        route_class, route = self.controller.classify(self.fastapi_app, scope)
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+        # Lets the metrics middleware label rejected requests by route too
+        scope.setdefault("route", route)
+        limiter = self.controller.limiters[route_class]
+        try:
+            await limiter.acquire(settings.ADMISSION_DEADLINE_S)
+        except Rejected as e:
+            response = JSONResponse(
+                {"detail": f"{route_class} is busy, retry shortly", "reason": e.reason},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started)
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Optional
+
+from jose import JWTError, jwt
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from app.core.config import settings
+from app.core.metrics import AUDIT_EVENTS
+from app.models.risk_tables import (
+    AIPrompt, RiskAuditLog, RiskBlacklistAddress, RiskBlacklistEmailDomain, RiskBlacklistIP,
+    RiskBlacklistUser, RiskGreylist, RiskRule, RiskWhitelistAddress, RiskWhitelistUser,
+)
+from app.models.users import User
+
+logger = logging.getLogger("phalanx.audit")
+
+AUDITED_TABLES = {
+    m.__table__.name for m in (
+        RiskRule, RiskWhitelistUser, RiskWhitelistAddress, RiskGreylist, RiskBlacklistUser,
+        RiskBlacklistIP, RiskBlacklistEmailDomain, RiskBlacklistAddress, AIPrompt, User,
+    )
+}
+# Never copied into the audit trail
+REDACTED_COLUMNS = {"password_hash"}
+
+
+# ================= REQUEST CONTEXT =================
+class _RequestContext:
+    __slots__ = ("request", "_actor")
+
+    def __init__(self, request):
+        self.request = request
+        self._actor = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.request.method} {self.request.url.path}"
+
+    @property
+    def actor(self) -> str:
+        # Decoded only when the request actually writes something
+        if self._actor is None:
+            self._actor = _actor_from_cookie(self.request.cookies.get("access_token"))
+        return self._actor
+
+
+_current: ContextVar[Optional[_RequestContext]] = ContextVar("audit_request", default=None)
+# Background workers name themselves, e.g. "system:list_expiry"
+_system_actor: ContextVar[str] = ContextVar("audit_system_actor", default="system")
+
+
+def _actor_from_cookie(token: Optional[str]) -> str:
+    if not token:
+        return "anonymous"
+    if token.startswith("Bearer "):
+        token = token.split(" ", 1)[1]
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub") or "anonymous"
+    except JWTError:
+        return "anonymous"
+
+
+def set_system_actor(name: str):
+    """Attribute writes made by the current task (a background worker) to `system:<name>`."""
+    _system_actor.set(f"system:{name}")
+
+
+async def audit_context_middleware(request, call_next):
+    """Makes the request (path + lazily decoded user) visible to the session hooks below."""
+    token = _current.set(_RequestContext(request))
+    try:
+        return await call_next(request)
+    finally:
+        _current.reset(token)
+
+
+# ================= CAPTURE (session hooks, in the request's own call path) =================
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _row(state, columns) -> dict:
+    # loaded_value never triggers a load; server defaults not fetched back are left out
+    row = {}
+    for c in columns:
+        value = state.attrs[c.key].loaded_value
+        if c.key not in REDACTED_COLUMNS and value is not NO_VALUE:
+            row[c.key] = _plain(value)
+    return row
+
+
+def _key(state) -> str:
+    # identity isn't assigned to new objects until after this hook; the PK columns are
+    return _pk_key(state.mapper.primary_key_from_instance(state.obj()))
+
+
+def _pk_key(pk) -> str:
+    return json.dumps([_plain(v) for v in pk], default=str)
+
+
+def _pending(session) -> list:
+    return session.info.setdefault("audit_pending", [])
+
+
+def _event(action, table, key, before, after) -> dict:
+    ctx = _current.get()
+    return {
+        "action": action,
+        "table_name": table,
+        "entity_key": key,
+        "before": before,
+        "after": after,
+        "actor": ctx.actor if ctx is not None else _system_actor.get(),
+        "request": ctx.label if ctx is not None else None,
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_flush(session, flush_context):
+    if not settings.AUDIT_ENABLED:
+        return
+    pending = _pending(session)
+    for obj in session.new:
+        table = getattr(obj, "__table__", None)
+        if table is not None and table.name in AUDITED_TABLES:
+            state = inspect(obj)
+            pending.append(_event("INSERT", table.name, _key(state), None, _row(state, table.columns)))
+    for obj in session.dirty:
+        table = getattr(obj, "__table__", None)
+        if table is None or table.name not in AUDITED_TABLES:
+            continue
+        state = inspect(obj)
+        before, after = {}, {}
+        for c in table.columns:
+            if c.key in REDACTED_COLUMNS:
+                continue
+            hist = state.attrs[c.key].history
+            if hist.added or hist.deleted:
+                before[c.key] = _plain(hist.deleted[0]) if hist.deleted else None
+                after[c.key] = _plain(hist.added[0]) if hist.added else None
+        if after != before:
+            pending.append(_event("UPDATE", table.name, _key(state), before, after))
+    for obj in session.deleted:
+        table = getattr(obj, "__table__", None)
+        if table is not None and table.name in AUDITED_TABLES:
+            state = inspect(obj)
+            pending.append(_event("DELETE", table.name, _key(state), _row(state, table.columns), None))
+
+
+def _bulk_after(orm_execute_state, params: dict) -> Optional[dict]:
+    # SET values given via .values() aren't exposed on the statement, so
+    # callers pass them as execution_options(audit_values={column: value});
+    # values bound at execute time come with the parameters
+    if not orm_execute_state.is_update:
+        return None
+    after = dict(orm_execute_state.execution_options.get("audit_values") or {})
+    after.update(params)
+    return {k: _plain(v) for k, v in after.items() if k not in REDACTED_COLUMNS}
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _capture_bulk(orm_execute_state):
+    if not settings.AUDIT_ENABLED or not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    stmt = orm_execute_state.statement
+    table = getattr(stmt.table, "name", None)
+    if table not in AUDITED_TABLES:
+        return
+    params = orm_execute_state.parameters
+    # executemany: one parameter set per row
+    param_sets = params if isinstance(params, list) else [params or {}]
+    afters = [_bulk_after(orm_execute_state, p) for p in param_sets]
+    pending = _pending(orm_execute_state.session)
+
+    # Callers that know the rows they hit (e.g. the expiry sweeper) pass
+    # execution_options(audit_keys=[pk tuple, ...]): one event per entry, so
+    # the entry's history finds it like any other change
+    keys = orm_execute_state.execution_options.get("audit_keys")
+    if keys is not None:
+        action = "UPDATE" if orm_execute_state.is_update else "DELETE"
+        if len(afters) != len(keys):
+            afters = afters[:1] * len(keys)
+        pending.extend(_event(action, table, _pk_key(k), None, after) for k, after in zip(keys, afters))
+        return
+
+    try:
+        where = str(stmt.whereclause.compile(compile_kwargs={"literal_binds": True})) if stmt.whereclause is not None else None
+    except Exception:
+        where = str(stmt.whereclause)
+    pk = [c.key for c in stmt.table.primary_key.columns]
+    for p, after in zip(param_sets, afters):
+        if pk and all(c in p for c in pk):
+            # Bulk update by primary key: the row is known
+            action = "UPDATE" if orm_execute_state.is_update else "DELETE"
+            if after is not None:
+                after = {k: v for k, v in after.items() if k not in pk}
+            pending.append(_event(action, table, _pk_key([p[c] for c in pk]), None, after))
+        else:
+            action = "BULK_UPDATE" if orm_execute_state.is_update else "BULK_DELETE"
+            pending.append(_event(action, table, where, None, after))
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session):
+    events = session.info.pop("audit_pending", None)
+    if events:
+        writer.enqueue(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("audit_pending", None)
+
+
+# ================= WRITE-BEHIND =================
+def _is_connection_error(exc: Exception) -> bool:
+    if isinstance(exc, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)):
+        return True
+    return isinstance(exc, DBAPIError) and exc.connection_invalidated
+
+class AuditWriter:
+    """
+    Committed events wait in a bounded in-memory deque. The writer inserts
+    them in one executemany once AUDIT_BATCH are queued or the oldest is
+    AUDIT_FLUSH_MS old, and drains what's left on shutdown. A failed insert
+    puts the batch back and retries on the next tick; connection problems
+    are retried for as long as the queue has room, but a batch the database
+    keeps rejecting is logged and dropped after AUDIT_MAX_ATTEMPTS so it
+    can't hold up everything queued behind it.
+    """
+
+    def __init__(self):
+        self.queue: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._rejected = 0  # consecutive non-connection failures of the head batch
+
+    def enqueue(self, events):
+        now = datetime.now(timezone.utc)
+        room = settings.AUDIT_QUEUE_MAX - len(self.queue)
+        if room < len(events):
+            AUDIT_EVENTS.labels("dropped").inc(len(events) - max(room, 0))
+            logger.warning("audit queue full, dropping %d events", len(events) - max(room, 0))
+            events = events[:max(room, 0)]
+        for e in events:
+            e["occurred_at"] = now
+            self.queue.append(e)
+        AUDIT_EVENTS.labels("queued").inc(len(events))
+        if self._wakeup is not None and len(self.queue) >= settings.AUDIT_BATCH:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write everything queued right now, in AUDIT_BATCH chunks. Returns rows written."""
+        from app.core.database import SessionLocal
+
+        written = 0
+        while self.queue:
+            batch = [self.queue.popleft() for _ in range(min(settings.AUDIT_BATCH, len(self.queue)))]
+            try:
+                async with SessionLocal() as db:
+                    await db.execute(insert(RiskAuditLog), batch)  # executemany
+                    await db.commit()
+            except Exception as exc:
+                AUDIT_EVENTS.labels("failed").inc(len(batch))
+                if not _is_connection_error(exc):
+                    self._rejected += 1
+                    if self._rejected >= settings.AUDIT_MAX_ATTEMPTS:
+                        self._rejected = 0
+                        AUDIT_EVENTS.labels("dropped").inc(len(batch))
+                        logger.error(
+                            "dropping audit batch of %d after %d failed attempts (%s): %s",
+                            len(batch), settings.AUDIT_MAX_ATTEMPTS, exc, json.dumps(batch, default=str),
+                        )
+                        continue
+                self.queue.extendleft(reversed(batch))
+                raise
+            except BaseException:
+                self.queue.extendleft(reversed(batch))
+                raise
+            self._rejected = 0
+            written += len(batch)
+            AUDIT_EVENTS.labels("written").inc(len(batch))
+        return written
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.AUDIT_FLUSH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("audit flush failed; %d events kept for retry", len(self.queue))
+                await asyncio.sleep(settings.AUDIT_FLUSH_MS / 1000)
+
+    async def close(self):
+        """Shutdown: last flush after the worker task is cancelled."""
+        try:
+            written = await self.flush()
+            if written:
+                logger.info("flushed %d audit events at shutdown", written)
+        except Exception:
+            logger.exception("audit shutdown flush failed; %d events lost", len(self.queue))
+
+
+writer = AuditWriter()
@@ -0,0 +1,149 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+# Brotli is optional: without it everything is gzip
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Already-compressed formats (images, fonts, parquet, zip) are left alone
+_COMPRESSIBLE = (
+    "text/html", "text/css", "text/plain", "text/csv", "text/javascript",
+    "application/json", "application/javascript", "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+def _accepted(accept: str) -> set:
+    """Codings in an Accept-Encoding header, minus those refused with q=0."""
+    tokens = set()
+    for item in accept.lower().split(","):
+        coding, *params = [p.strip() for p in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            tokens.add(coding)
+    return tokens
+
+
+def _pick_encoding(accept: str):
+    tokens = _accepted(accept)
+    if brotli is not None and "br" in tokens:
+        return "br"
+    if "gzip" in tokens:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress and flush, so streamed pages still reach the client chunk by chunk."""
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._c.finish()
+        return self._c.flush()
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip for text responses at or over `minimum_size` bytes, picked
+    from Accept-Encoding. Streaming responses are compressed per chunk.
+    Responses that already carry a Content-Encoding pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _pick_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _Responder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    def __init__(self, mw: CompressionMiddleware, encoding: str, send):
+        self.mw = mw
+        self.encoding = encoding
+        self.downstream = send
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start = message  # held until we see the first body chunk
+            headers = Headers(raw=message["headers"])
+            ctype = headers.get("content-type", "").split(";")[0].strip()
+            self.passthrough = (
+                "content-encoding" in headers
+                or ctype not in _COMPRESSIBLE
+            )
+            return
+        if kind != "http.response.body":
+            await self.downstream(message)
+            return
+
+        if self.passthrough:
+            if self.start is not None:
+                await self.downstream(self.start)
+                self.start = None
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more and len(body) < self.mw.minimum_size:
+                await self.downstream(start)
+                await self.downstream(message)
+                self.passthrough = True
+                return
+
+            self.compressor = _Compressor(self.encoding, self.mw.gzip_level, self.mw.brotli_quality)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more:
+                del headers["Content-Length"]
+                await self.downstream(start)
+            else:
+                payload = self.compressor.chunk(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(payload))
+                await self.downstream(start)
+                await self.downstream({"type": "http.response.body", "body": payload})
+                return
+
+        data = self.compressor.chunk(body) if body else b""
+        if not more:
+            data += self.compressor.finish()
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more})
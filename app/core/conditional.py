@@ -0,0 +1,173 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi.responses import Response
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.invalidation import listener, register_invalidator
+from app.models.risk_tables import (
+    RiskBlacklistAddress, RiskBlacklistEmailDomain, RiskBlacklistIP, RiskBlacklistUser,
+    RiskGreylist, RiskRule, RiskTableVersion, RiskWhitelistAddress, RiskWhitelistUser,
+)
+
+# Tables whose pages answer conditional requests
+TRACKED_TABLES = {
+    m.__table__.name for m in (
+        RiskRule, RiskWhitelistUser, RiskWhitelistAddress, RiskGreylist,
+        RiskBlacklistUser, RiskBlacklistIP, RiskBlacklistEmailDomain, RiskBlacklistAddress,
+    )
+}
+
+
+# ================= VERSION BUMPS =================
+def _bump(connection, tables):
+    stmt = insert(RiskTableVersion).values([{"table_name": t, "version": 1} for t in sorted(tables)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RiskTableVersion.table_name],
+        set_={"version": RiskTableVersion.version + 1, "updated_at": func.now()},
+    )
+    connection.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_versions(session, flush_context):
+    # Same transaction as the write: the new version is visible exactly when the rows are
+    touched = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if getattr(obj, "__table__", None) is not None and obj.__table__.name in TRACKED_TABLES
+    }
+    if touched:
+        _bump(session.connection(), touched)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_versions_bulk(orm_execute_state):
+    # update(Model) / delete(Model) statements (e.g. the expiry sweeper) skip the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement.table, "name", None)
+        if table in TRACKED_TABLES:
+            _bump(orm_execute_state.session.connection(), {table})
+
+
+# ================= VERSION CACHE =================
+# table -> (version, updated_at). Only trusted while the invalidation
+# listener is connected; any write by any worker drops the entry.
+_versions: Dict[str, Tuple[int, object]] = {}
+# Bumped on every invalidation, so a load that raced a NOTIFY isn't cached
+_generations: Dict[str, int] = {}
+
+
+def _invalidate_version(table: str):
+    def invalidate(keys):
+        _generations[table] = _generations.get(table, 0) + 1
+        _versions.pop(table, None)
+    return invalidate
+
+
+for _table in TRACKED_TABLES:
+    register_invalidator(_table, _invalidate_version(_table))
+
+
+async def _load_versions(db, names):
+    use_cache = listener.is_listening()
+    rows = {n: _versions[n] for n in names if n in _versions} if use_cache else {}
+    missing = [n for n in names if n not in rows]
+    if missing:
+        generations = {n: _generations.get(n, 0) for n in missing}
+        res = await db.execute(
+            select(RiskTableVersion.table_name, RiskTableVersion.version, RiskTableVersion.updated_at)
+            .where(RiskTableVersion.table_name.in_(missing))
+        )
+        found = {r.table_name: (r.version, r.updated_at) for r in res.all()}
+        for n in missing:
+            rows[n] = found.get(n, (0, None))
+            if use_cache and _generations.get(n, 0) == generations[n]:
+                _versions[n] = rows[n]
+    return rows
+
+
+# ================= VALIDATORS =================
+_build_token: Optional[str] = None
+# When this process computed the token: the build's Last-Modified
+_build_time: Optional[datetime] = None
+
+
+def _build():
+    """Changes on deploy (templates / static assets), so new markup is never 304'd."""
+    global _build_token, _build_time
+    if _build_token is None:
+        from app.core.static_assets import static_files
+        from app.core.templating import env
+
+        h = hashlib.md5(usedforsecurity=False)
+        for name in sorted(env.list_templates()):
+            source, _, _ = env.loader.get_source(env, name)
+            h.update(name.encode() + source.encode())
+        for item in sorted(static_files.manifest.values()):
+            h.update(item.encode())
+        _build_token = h.hexdigest()[:12]
+        _build_time = datetime.now(timezone.utc)
+    return _build_token
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match check: weak comparison, "*" matches anything."""
+    if header.strip() == "*":
+        return True
+    weak = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == weak:
+            return True
+    return False
+
+
+async def conditional_response(request, db, *models) -> Tuple[Optional[Response], Dict[str, str]]:
+    """
+    One PK lookup on rt.risk_table_version instead of the page's queries,
+    and none at all while the versions are cached (see VERSION CACHE).
+    Returns (304 response or None, validator headers for the full response).
+    Writes made outside the app don't bump versions, so the ETag also rolls
+    over every CONDITIONAL_MAX_STALENESS_S.
+    """
+    names = sorted(m.__table__.name for m in models)
+    rows = await _load_versions(db, names)
+
+    epoch = int(time.time() // settings.CONDITIONAL_MAX_STALENESS_S)
+    token = ";".join(f"{n}={rows[n][0] if n in rows else 0}" for n in names)
+    digest = hashlib.md5(f"{_build()}|{epoch}|{token}".encode(), usedforsecurity=False).hexdigest()[:16]
+
+    headers = {"ETag": f'W/"{digest}"', "Cache-Control": "private, no-cache"}
+    # Covers what the ETag covers: data, build and staleness epoch, so a
+    # client revalidating with If-Modified-Since alone isn't 304'd stale markup
+    epoch_start = datetime.fromtimestamp(epoch * settings.CONDITIONAL_MAX_STALENESS_S, timezone.utc)
+    stamps = [updated_at for _, updated_at in rows.values() if updated_at is not None]
+    last_modified = max(stamps + [_build_time, epoch_start]).replace(microsecond=0)
+    headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, headers["ETag"])
+    else:
+        # If-None-Match wins when both are sent (RFC 9110 13.2.2)
+        fresh = False
+        since = request.headers.get("if-modified-since")
+        if since:
+            try:
+                fresh = parsedate_to_datetime(since) >= last_modified
+            except (TypeError, ValueError):
+                fresh = False
+
+    if fresh:
+        return Response(status_code=304, headers=headers), headers
+    return None, headers
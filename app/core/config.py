@@ -32,4 +32,128 @@ class Settings:
 
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
 
+    # SQL instrumentation (see app/core/instrumentation.py)
+    SLOW_QUERY_MS: int = int(os.getenv("SLOW_QUERY_MS", 500))
+    QUERY_COUNT_WARN: int = int(os.getenv("QUERY_COUNT_WARN", 50))
+    DB_LATENCY_WINDOW: int = int(os.getenv("DB_LATENCY_WINDOW", 500))  # max samples behind the readiness p95
+    DB_LATENCY_WINDOW_S: float = float(os.getenv("DB_LATENCY_WINDOW_S", 60))  # ...and their max age
+
+    # Connection pool (app/core/database.py)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+
+    # Startup warmup (app/core/warmup.py): runs in the lifespan handler before the app serves
+    STARTUP_WARMUP_ENABLED: bool = os.getenv("STARTUP_WARMUP_ENABLED", "true").lower() == "true"
+    STARTUP_POOL_CONNECTIONS: int = int(os.getenv("STARTUP_POOL_CONNECTIONS", 5))  # capped at DB_POOL_SIZE
+    STARTUP_WARMUP_TIMEOUT_S: float = float(os.getenv("STARTUP_WARMUP_TIMEOUT_S", 15))
+
+    # Cross-worker cache invalidation over LISTEN/NOTIFY (app/core/invalidation.py)
+    INVALIDATION_ENABLED: bool = os.getenv("INVALIDATION_ENABLED", "true").lower() == "true"
+    INVALIDATION_CHANNEL_PREFIX: str = os.getenv("INVALIDATION_CHANNEL_PREFIX", "phalanx_inval_")
+    INVALIDATION_KEEPALIVE_S: float = float(os.getenv("INVALIDATION_KEEPALIVE_S", 30))
+    INVALIDATION_RECONNECT_MAX_S: float = float(os.getenv("INVALIDATION_RECONNECT_MAX_S", 30))
+
+    # List expiry sweeper (app/services/list_expiry.py): ACTIVE -> EXPIRED once expires_at passes
+    LIST_EXPIRY_ENABLED: bool = os.getenv("LIST_EXPIRY_ENABLED", "true").lower() == "true"
+    LIST_EXPIRY_INTERVAL_S: float = float(os.getenv("LIST_EXPIRY_INTERVAL_S", 60))
+    LIST_EXPIRY_BATCH: int = int(os.getenv("LIST_EXPIRY_BATCH", 500))
+
+    # Feature distribution profiles (app/services/feature_profiles.py): hourly/daily sketches
+    FEATURE_PROFILE_ENABLED: bool = os.getenv("FEATURE_PROFILE_ENABLED", "true").lower() == "true"
+    FEATURE_PROFILE_BATCH: int = int(os.getenv("FEATURE_PROFILE_BATCH", 5000))
+    FEATURE_PROFILE_INTERVAL_S: float = float(os.getenv("FEATURE_PROFILE_INTERVAL_S", 10))
+    FEATURE_PROFILE_BACKFILL_DAYS: int = int(os.getenv("FEATURE_PROFILE_BACKFILL_DAYS", 90))  # first run; also how long folded txns are remembered
+    # Re-read below the watermark for rows committed late with an older update_time
+    FEATURE_PROFILE_OVERLAP_S: float = float(os.getenv("FEATURE_PROFILE_OVERLAP_S", 300))
+    FEATURE_PROFILE_ACCURACY: float = float(os.getenv("FEATURE_PROFILE_ACCURACY", 0.005))  # relative, per quantile
+    FEATURE_PROFILE_CACHE_TTL_S: float = float(os.getenv("FEATURE_PROFILE_CACHE_TTL_S", 30))
+
+    # List snapshot + delta feed (app/services/list_feed.py)
+    LIST_FEED_ENABLED: bool = os.getenv("LIST_FEED_ENABLED", "true").lower() == "true"
+    LIST_FEED_INTERVAL_S: float = float(os.getenv("LIST_FEED_INTERVAL_S", 10))
+    LIST_CHANGES_RETENTION_HOURS: float = float(os.getenv("LIST_CHANGES_RETENTION_HOURS", 72))  # oldest delta base
+    LIST_DELTA_MAX_CHANGES: int = int(os.getenv("LIST_DELTA_MAX_CHANGES", 100000))  # beyond: reload the snapshot
+    LIST_SNAPSHOT_PATH: str = os.getenv("LIST_SNAPSHOT_PATH", "")  # also publish the snapshot file here
+    LIST_SNAPSHOT_BLOOM_BITS: float = float(os.getenv("LIST_SNAPSHOT_BLOOM_BITS", 10))  # per key; 0 = no filters
+
+    # Write-behind audit trail (app/core/audit.py)
+    AUDIT_ENABLED: bool = os.getenv("AUDIT_ENABLED", "true").lower() == "true"
+    AUDIT_FLUSH_MS: int = int(os.getenv("AUDIT_FLUSH_MS", 250))     # max time an event waits in memory
+    AUDIT_BATCH: int = int(os.getenv("AUDIT_BATCH", 200))           # flush early at this many events
+    AUDIT_QUEUE_MAX: int = int(os.getenv("AUDIT_QUEUE_MAX", 50000))  # beyond this, events are dropped (and counted)
+    AUDIT_MAX_ATTEMPTS: int = int(os.getenv("AUDIT_MAX_ATTEMPTS", 5))  # a batch the DB keeps rejecting is logged and dropped
+
+    # Admission control (app/core/admission.py): per route class, per worker.
+    # "class=concurrency/queue"; lists covers lists, blacklist and risk rules; exports the streamed CSV/Parquet downloads
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_LIMITS: str = os.getenv(
+        "ADMISSION_LIMITS", "dashboard=3/6,features=4/12,decisions=4/12,lists=8/32,prompts=2/4,exports=2/2"
+    )
+    ADMISSION_DEADLINE_S: float = float(os.getenv("ADMISSION_DEADLINE_S", 5))  # longest wait for a slot
+
+    # Single-flight TTL result cache (app/core/result_cache.py), per worker
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_MAX_MB: float = float(os.getenv("RESULT_CACHE_MAX_MB", 64))
+    RESULT_CACHE_DASHBOARD_TTL_S: float = float(os.getenv("RESULT_CACHE_DASHBOARD_TTL_S", 5))
+    RESULT_CACHE_DECISIONS_TTL_S: float = float(os.getenv("RESULT_CACHE_DECISIONS_TTL_S", 5))
+
+    # Readiness probe (/health/ready)
+    READINESS_DB_TIMEOUT_S: float = float(os.getenv("READINESS_DB_TIMEOUT_S", 2.0))
+    READINESS_DB_P95_MS: float = float(os.getenv("READINESS_DB_P95_MS", 1500))
+    READINESS_POOL_SATURATION: float = float(os.getenv("READINESS_POOL_SATURATION", 0.9))
+
+    # Latest-decision-per-txn projection (rt.risk_txn_latest_decision)
+    DECISION_PROJECTION_ENABLED: bool = os.getenv("DECISION_PROJECTION_ENABLED", "true").lower() == "true"
+    DECISION_PROJECTION_INTERVAL_S: float = float(os.getenv("DECISION_PROJECTION_INTERVAL_S", 5))
+    DECISION_PROJECTION_BATCH: int = int(os.getenv("DECISION_PROJECTION_BATCH", 5000))
+    # log_ids below the watermark re-read each pass, for rows whose transaction committed late
+    DECISION_PROJECTION_OVERLAP: int = int(os.getenv("DECISION_PROJECTION_OVERLAP", 1000))
+    # "Unknown" countries (user_device lagging) are looked up again this often, for this long
+    DECISION_PROJECTION_COUNTRY_RETRY_S: float = float(os.getenv("DECISION_PROJECTION_COUNTRY_RETRY_S", 60))
+    DECISION_PROJECTION_COUNTRY_RETRY_HOURS: float = float(os.getenv("DECISION_PROJECTION_COUNTRY_RETRY_HOURS", 24))
+
+    # txn -> country enrichment (in-memory LRU in front of rt.risk_txn_country)
+    COUNTRY_CACHE_SIZE: int = int(os.getenv("COUNTRY_CACHE_SIZE", 200000))
+    COUNTRY_LOOKUP_CHUNK: int = int(os.getenv("COUNTRY_LOOKUP_CHUNK", 1000))
+
+    # Streaming exports: rows fetched per server-side cursor round trip / Parquet row group
+    EXPORT_BATCH: int = int(os.getenv("EXPORT_BATCH", 5000))
+
+    # Jinja (app/core/templating.py). Empty cache dir = system temp dir.
+    TEMPLATE_CACHE_DIR: str = os.getenv("TEMPLATE_CACHE_DIR", "")
+    TEMPLATE_AUTO_RELOAD: bool = os.getenv("TEMPLATE_AUTO_RELOAD", "true").lower() == "true"
+    TEMPLATE_STREAM_LISTS: bool = os.getenv("TEMPLATE_STREAM_LISTS", "true").lower() == "true"
+    TEMPLATE_STREAM_BUFFER: int = int(os.getenv("TEMPLATE_STREAM_BUFFER", 64))  # template events per chunk
+
+    # Response compression (app/core/compression.py); brotli used when installed
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+    # ETag roll-over for list pages, so edits made outside the app show up eventually
+    CONDITIONAL_MAX_STALENESS_S: int = int(os.getenv("CONDITIONAL_MAX_STALENESS_S", 300))
+
+    # Live dashboard (SSE) producer (app/services/dashboard_live.py)
+    DASHBOARD_SSE_ENABLED: bool = os.getenv("DASHBOARD_SSE_ENABLED", "true").lower() == "true"
+    DASHBOARD_SSE_TICK_S: float = float(os.getenv("DASHBOARD_SSE_TICK_S", 5))
+    DASHBOARD_SSE_QUEUE: int = int(os.getenv("DASHBOARD_SSE_QUEUE", 8))  # per-client backlog before resync
+    DASHBOARD_SSE_MAX_NEW_DECISIONS: int = int(os.getenv("DASHBOARD_SSE_MAX_NEW_DECISIONS", 50))
+
+    # Time-bucketed dashboard aggregates (app/services/decision_aggregates.py)
+    DECISION_AGG_BATCH: int = int(os.getenv("DECISION_AGG_BATCH", 2000))  # dirty 5m buckets per pass
+    DECISION_AGG_INTERVAL_S: float = float(os.getenv("DECISION_AGG_INTERVAL_S", 5))
+    DECISION_AGG_5M_RETENTION_DAYS: int = int(os.getenv("DECISION_AGG_5M_RETENTION_DAYS", 14))
+    DASHBOARD_DEFAULT_WINDOW: str = os.getenv("DASHBOARD_DEFAULT_WINDOW", "24h")
+    DASHBOARD_MAX_WINDOW_DAYS: int = int(os.getenv("DASHBOARD_MAX_WINDOW_DAYS", 366))
+    DASHBOARD_MAX_POINTS: int = int(os.getenv("DASHBOARD_MAX_POINTS", 2000))  # per chart series
+
+    # Recent risk_features cache for analyst drilldown (app/services/feature_cache.py)
+    FEATURE_CACHE_ENABLED: bool = os.getenv("FEATURE_CACHE_ENABLED", "true").lower() == "true"
+    FEATURE_CACHE_HOURS: float = float(os.getenv("FEATURE_CACHE_HOURS", 6))
+    FEATURE_CACHE_MAX_MB: float = float(os.getenv("FEATURE_CACHE_MAX_MB", 256))
+    FEATURE_CACHE_BATCH: int = int(os.getenv("FEATURE_CACHE_BATCH", 5000))
+    FEATURE_CACHE_INTERVAL_S: float = float(os.getenv("FEATURE_CACHE_INTERVAL_S", 5))
+    # Re-read below the watermark for rows committed late with an older update_time
+    FEATURE_CACHE_OVERLAP_S: float = float(os.getenv("FEATURE_CACHE_OVERLAP_S", 60))
+
 settings = Settings()
\ No newline at end of file
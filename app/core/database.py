@@ -1,14 +1,23 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.core.instrumentation import install_query_hooks
+from app.core.metrics import install_pool_metrics
 
 # Create Async Engine
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False, # Set True for debugging SQL queries
-    future=True
+    future=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
 )
 
+# Per-request query count/timing + slow-query log
+install_query_hooks(engine)
+# Pool occupancy gauges for /metrics
+install_pool_metrics(engine)
+
 # Session Factory
 SessionLocal = sessionmaker(
     autocommit=False, 
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import text
+
+from app.core.admission import controller as admission
+from app.core.config import settings
+from app.core.database import engine
+from app.core.instrumentation import db_latency_p95
+from app.core.result_cache import result_cache
+from app.core.warmup import startup_report
+
+# name -> callable returning True once that in-process cache is loaded.
+# Caches register themselves here so a freshly scaled-out instance stays
+# unready until it can serve without cold misses.
+_warm_checks: Dict[str, Callable[[], bool]] = {}
+
+
+def register_warm_check(name: str, is_warm: Callable[[], bool]):
+    _warm_checks[name] = is_warm
+
+
+# name -> callable returning a progress dict. Reported in the readiness body
+# only: long backfills that the request path doesn't depend on go here.
+_status_hooks: Dict[str, Callable[[], dict]] = {}
+
+
+def register_status(name: str, status: Callable[[], dict]):
+    _status_hooks[name] = status
+
+
+def pool_status() -> dict:
+    pool = engine.sync_engine.pool
+    size = pool.size()
+    checked_out = pool.checkedout()
+    capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+    return {
+        "size": size,
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+async def _probe_db() -> dict:
+    started = time.perf_counter()
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), settings.READINESS_DB_TIMEOUT_S)
+        return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+    except Exception as e:
+        return {
+            "ok": False,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "error": f"{type(e).__name__}: {e}",
+        }
+
+
+async def readiness() -> Tuple[bool, dict]:
+    """
+    Returns (ready, report). Not ready when the DB probe fails or times out,
+    the pool is saturated, the rolling p95 statement latency is over
+    READINESS_DB_P95_MS, or a registered cache has not warmed up yet.
+    """
+    reasons = []
+
+    pool = pool_status()
+    if pool["saturation"] >= settings.READINESS_POOL_SATURATION:
+        # Don't queue the probe behind real traffic on an exhausted pool
+        db = {"ok": False, "latency_ms": None, "error": "pool saturated, probe skipped"}
+        reasons.append("db_pool_saturated")
+    else:
+        try:
+            db = await asyncio.wait_for(_probe_db(), settings.READINESS_DB_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            db = {"ok": False, "latency_ms": None, "error": "timeout (pool checkout)"}
+        if not db["ok"]:
+            reasons.append("db_unreachable")
+
+    p95 = db_latency_p95()
+    db["p95_ms"] = round(p95, 2) if p95 is not None else None
+    if p95 is not None and p95 > settings.READINESS_DB_P95_MS:
+        reasons.append("db_p95_over_threshold")
+
+    caches = {}
+    for name, is_warm in _warm_checks.items():
+        try:
+            caches[name] = bool(is_warm())
+        except Exception:
+            caches[name] = False
+        if not caches[name]:
+            reasons.append(f"cache_cold:{name}")
+
+    background = {}
+    for name, status in _status_hooks.items():
+        try:
+            background[name] = status()
+        except Exception as e:
+            background[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    report = {
+        "status": "ready" if not reasons else "unready",
+        "reasons": reasons,
+        "dependencies": {"database": db},
+        "pool": pool,
+        "caches": caches,
+        "background": background,
+        "admission": admission.status(),
+        "result_cache": result_cache.stats(top=5),
+        "startup": startup_report(),
+    }
+    return not reasons, report
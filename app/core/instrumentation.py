@@ -0,0 +1,135 @@
+import json
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger("phalanx.sql")
+
+
+class QueryStats:
+    """Per-request SQL counters (filled by the engine hooks below)."""
+
+    __slots__ = ("count", "total_ms", "slowest_ms", "slowest_statement")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+
+
+# The middleware puts a fresh QueryStats here; the hooks mutate it in place.
+# SQLAlchemy's greenlet bridge carries the context into the sync hooks.
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_current_route: ContextVar[str] = ContextVar("query_route", default="-")
+
+
+# (monotonic time, ms) of recent request-path statements (this worker), used by
+# readiness. Background workers, exports and backfills don't count: their slow
+# statements say nothing about whether this instance can serve a page.
+_recent_latencies_ms = deque(maxlen=settings.DB_LATENCY_WINDOW)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def db_latency_p95() -> Optional[float]:
+    """
+    p95 in ms of request statements from the last DB_LATENCY_WINDOW_S seconds
+    (at most DB_LATENCY_WINDOW of them); None if none ran, so an idle
+    instance recovers once a slow burst ages out.
+    """
+    cutoff = time.monotonic() - settings.DB_LATENCY_WINDOW_S
+    while _recent_latencies_ms and _recent_latencies_ms[0][0] < cutoff:
+        _recent_latencies_ms.popleft()
+    samples = sorted(ms for _, ms in _recent_latencies_ms)
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+# ================= ENGINE HOOKS =================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+        _recent_latencies_ms.append((time.monotonic(), elapsed_ms))
+
+    if elapsed_ms >= settings.SLOW_QUERY_MS:
+        # One JSON object per line so the log shipper can index the fields
+        logger.warning(json.dumps({
+            "event": "slow_query",
+            "route": _current_route.get(),
+            "duration_ms": round(elapsed_ms, 2),
+            "threshold_ms": settings.SLOW_QUERY_MS,
+            "executemany": executemany,
+            "statement": " ".join(statement.split())[:2000],
+        }))
+
+
+def install_query_hooks(engine):
+    """Attach timing hooks to an AsyncEngine (events live on the sync engine)."""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ================= HTTP MIDDLEWARE =================
+def _server_timing(stats: QueryStats, app_ms: float) -> str:
+    parts = [
+        f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"',
+        f"app;dur={app_ms:.2f}",
+    ]
+    if stats.count:
+        parts.append(f"db-slowest;dur={stats.slowest_ms:.2f}")
+    return ", ".join(parts)
+
+
+async def query_timing_middleware(request, call_next):
+    """
+    Collects query count / DB time for the request and exposes it as a
+    Server-Timing header (visible in the browser devtools Timing tab).
+    """
+    stats = QueryStats()
+    stats_token = _current_stats.set(stats)
+    route_token = _current_route.set(f"{request.method} {request.url.path}")
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current_stats.reset(stats_token)
+        _current_route.reset(route_token)
+
+    app_ms = (time.perf_counter() - started) * 1000
+    response.headers["Server-Timing"] = _server_timing(stats, app_ms)
+
+    if stats.count >= settings.QUERY_COUNT_WARN:
+        logger.warning(json.dumps({
+            "event": "many_queries",
+            "route": f"{request.method} {request.url.path}",
+            "query_count": stats.count,
+            "db_ms": round(stats.total_ms, 2),
+        }))
+    return response
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.risk_tables import (
+    AIPrompt, RiskBlacklistAddress, RiskBlacklistEmailDomain, RiskBlacklistIP, RiskBlacklistUser,
+    RiskGreylist, RiskRule, RiskWhitelistAddress, RiskWhitelistUser,
+)
+from app.models.users import User
+
+logger = logging.getLogger("phalanx.invalidation")
+
+# Tables whose writes are broadcast (one NOTIFY channel each)
+NOTIFY_TABLES = {
+    m.__table__.name for m in (
+        RiskRule, RiskWhitelistUser, RiskWhitelistAddress, RiskGreylist, RiskBlacklistUser,
+        RiskBlacklistIP, RiskBlacklistEmailDomain, RiskBlacklistAddress, AIPrompt, User,
+    )
+}
+# NOTIFY payloads are capped at 8000 bytes; past this we send "everything changed"
+_MAX_PAYLOAD = 7000
+
+# table -> callables taking the changed primary keys (None = drop everything)
+_invalidators: Dict[str, List[Callable[[Optional[list]], None]]] = defaultdict(list)
+
+
+def channel(table: str) -> str:
+    return f"{settings.INVALIDATION_CHANNEL_PREFIX}{table}"
+
+
+def register_invalidator(table: str, fn: Callable[[Optional[list]], None]):
+    """Call `fn(keys)` whenever `table` is written by any worker (keys may be None)."""
+    if table not in NOTIFY_TABLES:
+        raise ValueError(f"{table} is not broadcast; add it to NOTIFY_TABLES")
+    _invalidators[table].append(fn)
+
+
+def dispatch(table: str, keys: Optional[list] = None):
+    for fn in _invalidators.get(table, ()):
+        try:
+            fn(keys)
+        except Exception:
+            logger.exception("invalidator for %s failed", table)
+
+
+def dispatch_all():
+    """After a (re)connect we can't know what was missed: flush every cache."""
+    for table in list(_invalidators):
+        dispatch(table, None)
+
+
+# ================= EMIT (same transaction as the write) =================
+def _notify(session, table: str, keys: Optional[list]):
+    payload = json.dumps({"pid": os.getpid(), "keys": keys}, default=str)
+    if len(payload) > _MAX_PAYLOAD:
+        keys = None
+        payload = json.dumps({"pid": os.getpid(), "keys": None})
+    # Postgres only delivers it if (and when) this transaction commits
+    session.connection().execute(select(func.pg_notify(channel(table), payload)))
+
+    # Remembered for the local dispatch after commit
+    changes = session.info.setdefault("invalidation_changes", {})
+    if keys is None or changes.get(table, []) is None:
+        changes[table] = None
+    else:
+        changes.setdefault(table, []).extend(keys)
+
+
+@event.listens_for(Session, "after_flush")
+def _notify_flushed(session, flush_context):
+    # Switched off, nothing listens and every dependent cache bypasses itself
+    if not settings.INVALIDATION_ENABLED:
+        return
+    changed: Dict[str, Optional[list]] = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(getattr(obj, "__table__", None), "name", None)
+        if table not in NOTIFY_TABLES:
+            continue
+        identity = inspect(obj).identity
+        if identity is None or changed.get(table, []) is None:
+            changed[table] = None
+        else:
+            changed.setdefault(table, []).append(identity[0] if len(identity) == 1 else list(identity))
+    for table, keys in changed.items():
+        _notify(session, table, keys)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _notify_bulk(orm_execute_state):
+    # update(Model) / delete(Model) statements bypass the unit of work
+    if not settings.INVALIDATION_ENABLED:
+        return
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement.table, "name", None)
+        if table in NOTIFY_TABLES:
+            _notify(orm_execute_state.session, table, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_local(session):
+    # This worker doesn't wait for its own NOTIFY to come back round
+    changes = session.info.pop("invalidation_changes", None)
+    for table, keys in (changes or {}).items():
+        dispatch(table, keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("invalidation_changes", None)
+
+
+# ================= LISTEN (one dedicated connection per worker) =================
+class InvalidationListener:
+    """
+    Holds a plain asyncpg connection (outside the pool, so LISTEN state
+    never leaks into request sessions) subscribed to every NOTIFY_TABLES
+    channel. While it is down, `is_listening()` is False and caches that
+    depend on it should bypass themselves.
+    """
+
+    def __init__(self):
+        self._conn: Optional[asyncpg.Connection] = None
+
+    def is_listening(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    def _on_notify(self, conn, pid, chan, payload):
+        table = chan[len(settings.INVALIDATION_CHANNEL_PREFIX):]
+        try:
+            keys = json.loads(payload).get("keys")
+        except (ValueError, AttributeError):
+            keys = None
+        dispatch(table, keys)
+
+    async def _connect(self):
+        dsn = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        conn = await asyncpg.connect(dsn)
+        try:
+            for table in sorted(NOTIFY_TABLES):
+                await conn.add_listener(channel(table), self._on_notify)
+        except Exception:
+            conn.terminate()
+            raise
+        return conn
+
+    async def run(self):
+        backoff = 1.0
+        while True:
+            try:
+                self._conn = await self._connect()
+                # Anything written while we weren't listening is unknown
+                dispatch_all()
+                backoff = 1.0
+                logger.info("listening on %d invalidation channels", len(NOTIFY_TABLES))
+                while True:
+                    await asyncio.sleep(settings.INVALIDATION_KEEPALIVE_S)
+                    # Surfaces a dead socket; notifications themselves arrive via the callback
+                    await asyncio.wait_for(self._conn.execute("SELECT 1"), settings.INVALIDATION_KEEPALIVE_S)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("invalidation listener dropped; reconnecting in %.0fs", backoff)
+            finally:
+                conn, self._conn = self._conn, None
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, settings.INVALIDATION_RECONNECT_MAX_S)
+
+
+listener = InvalidationListener()
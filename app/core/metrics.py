@@ -0,0 +1,161 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+# Multi-worker mode: when PROMETHEUS_MULTIPROC_DIR is set (and wiped before the
+# workers start), every uvicorn worker writes its samples to mmap'd files in
+# that dir and /metrics aggregates all of them, whichever worker serves it.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ================= HTTP =================
+REQUEST_LATENCY = Histogram(
+    "phalanx_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "phalanx_http_requests_in_flight",
+    "Requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# ================= ADMISSION CONTROL =================
+ADMISSION_ACTIVE = Gauge(
+    "phalanx_admission_active",
+    "Requests holding a route-class slot",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "phalanx_admission_queued",
+    "Requests waiting for a route-class slot",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTED = Counter(
+    "phalanx_admission_rejected",
+    "Requests answered 503 by admission control",
+    ["route_class", "reason"],  # queue_full | deadline | timeout
+)
+
+# ================= DB POOL =================
+DB_POOL_CHECKED_OUT = Gauge(
+    "phalanx_db_pool_checked_out",
+    "DB connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OPEN = Gauge(
+    "phalanx_db_pool_connections",
+    "DB connections currently open (idle + checked out)",
+    multiprocess_mode="livesum",
+)
+
+# ================= BUSINESS TIMINGS =================
+DASHBOARD_COMPUTE = Histogram(
+    "phalanx_dashboard_compute_seconds",
+    "Time spent building the executive dashboard",
+    ["phase"],  # query | aggregate
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_CALL = Histogram(
+    "phalanx_llm_call_seconds",
+    "Latency of outbound LLM (Gemini) calls",
+    ["outcome"],  # success | error
+    buckets=(0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 40.0, 60.0),
+)
+LLM_CALLS = Counter(
+    "phalanx_llm_calls",
+    "Outbound LLM (Gemini) calls",
+    ["outcome"],
+)
+COUNTRY_LOOKUPS = Counter(
+    "phalanx_country_lookups",
+    "txn -> country resolutions by where they were answered",
+    ["source"],  # memory | table | user_device | missing
+)
+
+RESULT_CACHE_REQUESTS = Counter(
+    "phalanx_result_cache_requests",
+    "Result cache lookups",
+    ["cache", "outcome"],  # hit | miss | coalesced (joined an in-flight computation)
+)
+RESULT_CACHE_BYTES = Gauge(
+    "phalanx_result_cache_bytes",
+    "Estimated size of cached query results",
+    multiprocess_mode="livesum",
+)
+
+AUDIT_EVENTS = Counter(
+    "phalanx_audit_events",
+    "Audit trail events by what happened to them",
+    ["outcome"],  # queued | written | dropped | failed
+)
+
+
+def install_pool_metrics(engine):
+    """Track pool occupancy via pool events so every worker reports its own share."""
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_conn, conn_record):
+        DB_POOL_OPEN.inc()
+
+    @event.listens_for(pool, "close")
+    def _on_close(dbapi_conn, conn_record):
+        DB_POOL_OPEN.dec()
+
+    @event.listens_for(pool, "close_detached")
+    def _on_close_detached(dbapi_conn):
+        DB_POOL_OPEN.dec()
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_conn, conn_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def _route_label(request) -> str:
+    # Use the route template ("/decisions/{log_id}") to keep label cardinality bounded
+    route = request.scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    if request.url.path.startswith("/static/"):
+        return "/static"
+    return "<unmatched>"
+
+
+async def metrics_middleware(request, call_next):
+    method = request.method
+    REQUESTS_IN_FLIGHT.labels(method).inc()
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.labels(method).dec()
+        REQUEST_LATENCY.labels(method, _route_label(request), status).observe(
+            time.perf_counter() - started
+        )
+
+
+def render_metrics():
+    """Returns (body, content_type) in the Prometheus text exposition format."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,189 @@
+import asyncio
+import functools
+import inspect
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.metrics import RESULT_CACHE_BYTES, RESULT_CACHE_REQUESTS
+
+# Per-key hit/miss counters kept for this many keys (least recently seen dropped)
+KEY_STATS_MAX = 500
+
+
+def _sizeof(value, seen=None, depth=0) -> int:
+    """Rough deep size in bytes; good enough to keep the cache inside its budget."""
+    if seen is None:
+        seen = set()
+    if id(value) in seen or depth > 8:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(_sizeof(k, seen, depth + 1) + _sizeof(v, seen, depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(_sizeof(v, seen, depth + 1) for v in value)
+    attrs = getattr(value, "__dict__", None)
+    if attrs:
+        # ORM instances: count the loaded values, not the session / mapper state
+        size += sum(_sizeof(v, seen, depth + 1) for k, v in attrs.items() if not k.startswith("_sa_"))
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "size")
+
+    def __init__(self, value, expires: float, size: int):
+        self.value = value
+        self.expires = expires
+        self.size = size
+
+
+class ResultCache:
+    """
+    Async result cache shared by every caller in the process.
+
+    Single flight: while a key is being computed, identical calls await the
+    same future instead of running the queries again. If the caller doing
+    the work is cancelled (client went away), the next waiter takes over.
+    Exceptions are handed to everyone waiting and never cached.
+
+    Results live for their TTL; past `max_bytes` (estimated) the least
+    recently used entries go first. Cached values are shared, so callers
+    must treat them as read-only.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[Tuple[str, Hashable], _Entry]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._key_stats: "OrderedDict[Tuple[str, Hashable], Dict[str, int]]" = OrderedDict()
+
+    # --- stats ---
+    def _record(self, full_key, outcome: str):
+        RESULT_CACHE_REQUESTS.labels(full_key[0], outcome).inc()
+        stats = self._key_stats.get(full_key)
+        if stats is None:
+            stats = self._key_stats[full_key] = {"hit": 0, "miss": 0, "coalesced": 0}
+            while len(self._key_stats) > KEY_STATS_MAX:
+                self._key_stats.popitem(last=False)
+        else:
+            self._key_stats.move_to_end(full_key)
+        stats[outcome] += 1
+
+    def stats(self, top: int = 20) -> dict:
+        busiest = sorted(self._key_stats.items(), key=lambda kv: -sum(kv[1].values()))[:top]
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            "keys": [{"cache": name, "key": str(key), **counts} for (name, key), counts in busiest],
+        }
+
+    # --- storage ---
+    def _drop(self, full_key):
+        entry = self._entries.pop(full_key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def _store(self, full_key, value, ttl_s: float):
+        self._drop(full_key)
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        self._entries[full_key] = _Entry(value, time.monotonic() + ttl_s, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+        RESULT_CACHE_BYTES.set(self.bytes)
+
+    def invalidate(self, name: str, key: Hashable = None):
+        """Drop one key of cache `name`, or all of it (key=None)."""
+        for full_key in [k for k in self._entries if k[0] == name and (key is None or k[1] == key)]:
+            self._drop(full_key)
+        RESULT_CACHE_BYTES.set(self.bytes)
+
+    # --- lookup ---
+    async def get_or_compute(self, name: str, key: Hashable, ttl_s: float, compute: Callable[[], Awaitable[Any]]):
+        full_key = (name, key)
+        while True:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                if entry.expires > time.monotonic():
+                    self._entries.move_to_end(full_key)
+                    self._record(full_key, "hit")
+                    return entry.value
+                self._drop(full_key)
+            pending = self._inflight.get(full_key)
+            if pending is None:
+                break
+            self._record(full_key, "coalesced")
+            # wait() only raises if *this* task is cancelled, and never cancels `pending`
+            await asyncio.wait({pending})
+            if pending.cancelled():
+                continue  # the computing request was cancelled, not us: take over
+            return pending.result()
+
+        self._record(full_key, "miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(value)
+            self._store(full_key, value, ttl_s)
+            return value
+        finally:
+            self._inflight.pop(full_key, None)
+
+    def cached(self, name: str, ttl_s: float, key: Callable[..., Hashable] = None):
+        """
+        Decorator for async functions. The key is `key(*args, **kwargs)`, or
+        by default every bound argument (defaults applied) except DB
+        sessions and requests. A TTL of 0 (or RESULT_CACHE_ENABLED=false)
+        calls straight through.
+        """
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            def default_key(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                return tuple(
+                    (arg, value) for arg, value in bound.arguments.items()
+                    if not isinstance(value, (AsyncSession, Request))
+                )
+
+            make_key = key or default_key
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not settings.RESULT_CACHE_ENABLED or ttl_s <= 0:
+                    return await fn(*args, **kwargs)
+                return await self.get_or_compute(
+                    name, make_key(*args, **kwargs), ttl_s, lambda: fn(*args, **kwargs)
+                )
+
+            wrapper.cache_name = name
+            return wrapper
+        return decorator
+
+
+result_cache = ResultCache(int(settings.RESULT_CACHE_MAX_MB * 2 ** 20))
+cached = result_cache.cached
@@ -0,0 +1,57 @@
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Dict
+
+import orjson
+from fastapi.responses import JSONResponse
+from sqlalchemy import inspect
+
+# datetimes / dates / UUIDs / dataclasses / numpy are native in orjson
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(v):
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, (set, frozenset)):
+        return list(v)
+    return str(v)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    orjson-backed JSONResponse. Returning it directly from a route skips
+    FastAPI's jsonable_encoder pass, which dominates on wide rows / JSONB.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ================= MODEL -> DICT =================
+# Per-model (column names, attrgetter) computed once instead of walking
+# __table__.columns and calling getattr per column on every request.
+_ACCESSORS: Dict[type, tuple] = {}
+
+
+def _accessor(model_cls):
+    acc = _ACCESSORS.get(model_cls)
+    if acc is None:
+        attrs = inspect(model_cls).mapper.column_attrs
+        names = tuple(a.columns[0].name for a in attrs)  # DB column name (e.g. withdraw_currency)
+        getter = attrgetter(*(a.key for a in attrs))
+        if len(names) == 1:  # attrgetter with a single name returns a scalar
+            single = getter
+            getter = lambda obj: (single(obj),)
+        acc = _ACCESSORS[model_cls] = (names, getter)
+    return acc
+
+
+def model_to_dict(obj) -> dict:
+    """All mapped columns of an ORM instance, keyed by column name."""
+    names, getter = _accessor(type(obj))
+    return dict(zip(names, getter(obj)))
@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import os
+from typing import Dict
+
+from fastapi.staticfiles import StaticFiles
+
+logger = logging.getLogger("phalanx.static")
+
+STATIC_DIR = "app/static"
+STATIC_PREFIX = "/static/"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Third-party assets served from app/static/vendor (fetched by
+# scripts/vendor_assets.py). Until a file has been vendored, static_url()
+# falls back to the CDN it came from.
+VENDOR_ASSETS: Dict[str, str] = {
+    "vendor/bootstrap/5.3.0/css/bootstrap.min.css":
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
+    "vendor/bootstrap/5.3.0/js/bootstrap.bundle.min.js":
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js",
+    "vendor/jquery/3.6.0/jquery.min.js":
+        "https://code.jquery.com/jquery-3.6.0.min.js",
+    "vendor/chart.js/4.4.1/chart.umd.min.js":
+        "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js",
+    "vendor/fontawesome/6.4.0/css/all.min.css":
+        "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css",
+    "vendor/codemirror/5.65.5/codemirror.min.css":
+        "https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.5/codemirror.min.css",
+    "vendor/codemirror/5.65.5/theme/dracula.min.css":
+        "https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.5/theme/dracula.min.css",
+    "vendor/codemirror/5.65.5/codemirror.min.js":
+        "https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.5/codemirror.min.js",
+    "vendor/codemirror/5.65.5/mode/markdown/markdown.min.js":
+        "https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.5/mode/markdown/markdown.min.js",
+    "vendor/codemirror/5.65.5/mode/javascript/javascript.min.js":
+        "https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.65.5/mode/javascript/javascript.min.js",
+}
+# all.min.css loads these via relative ../webfonts/ URLs
+for _font in ("fa-brands-400", "fa-regular-400", "fa-solid-900", "fa-v4compatibility"):
+    for _ext in ("woff2", "ttf"):
+        VENDOR_ASSETS[f"vendor/fontawesome/6.4.0/webfonts/{_font}.{_ext}"] = (
+            f"https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/{_font}.{_ext}"
+        )
+
+
+def _fingerprint(rel_path: str, digest: str) -> str:
+    base, ext = os.path.splitext(rel_path)
+    return f"{base}.{digest}{ext}"
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """
+    StaticFiles that also answers to content-hashed names
+    ("css/styles.3f2a9c1b0e.css"). Hashed URLs never change content, so they
+    are served `immutable`; plain URLs still work but must revalidate.
+    """
+
+    def __init__(self, directory: str = STATIC_DIR):
+        super().__init__(directory=directory)
+        self.manifest: Dict[str, str] = {}  # "css/styles.css" -> "css/styles.<hash>.css"
+        self._reverse: Dict[str, str] = {}  # os path of hashed name -> real os path
+        self.build_manifest()
+
+    def build_manifest(self):
+        manifest, reverse = {}, {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, self.directory).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    digest = hashlib.md5(f.read(), usedforsecurity=False).hexdigest()[:10]
+                hashed = _fingerprint(rel, digest)
+                manifest[rel] = hashed
+                reverse[os.path.normpath(hashed)] = os.path.normpath(rel)
+        self.manifest, self._reverse = manifest, reverse
+        logger.info("fingerprinted %d static files", len(manifest))
+
+    async def get_response(self, path: str, scope):
+        real = self._reverse.get(path)
+        response = await super().get_response(real or path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE if real else "no-cache"
+        return response
+
+
+static_files = FingerprintedStaticFiles()
+
+
+def static_url(path: str) -> str:
+    """Template helper: fingerprinted local URL, else the CDN for unvendored assets."""
+    hashed = static_files.manifest.get(path)
+    if hashed:
+        return STATIC_PREFIX + hashed
+    if path in VENDOR_ASSETS:
+        return VENDOR_ASSETS[path]
+    return STATIC_PREFIX + path
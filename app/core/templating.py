@@ -0,0 +1,54 @@
+import logging
+import os
+
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from app.core.config import settings
+from app.core.static_assets import static_url
+
+logger = logging.getLogger("phalanx.templates")
+
+TEMPLATE_DIR = "app/templates"
+
+
+def _bytecode_cache():
+    # Compiled template bytecode survives restarts / is shared by all workers
+    if settings.TEMPLATE_CACHE_DIR:
+        os.makedirs(settings.TEMPLATE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR)
+    return FileSystemBytecodeCache()  # per-user dir under the system temp dir
+
+
+# One Environment for the whole app: one compile cache instead of one per router
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+    cache_size=-1,  # never evict; the template set is small and fixed
+)
+templates = Jinja2Templates(env=env)
+env.globals["static_url"] = static_url
+
+
+def precompile_templates() -> int:
+    """Load (and compile) every template up front so no request pays for it."""
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    logger.info("precompiled %d templates", len(names))
+    return len(names)
+
+
+def stream_template(request, name: str, context: dict, headers: dict = None) -> StreamingResponse:
+    """
+    Renders `name` as a chunked response: the head of the page goes out
+    while the rest of the table is still rendering. Rendering runs in the
+    threadpool, so the context must already be fully loaded.
+    """
+    context.setdefault("request", request)
+    stream = env.get_template(name).stream(context)
+    stream.enable_buffering(settings.TEMPLATE_STREAM_BUFFER)
+    return StreamingResponse(stream, media_type="text/html; charset=utf-8", headers=headers)
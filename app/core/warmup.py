@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.core.templating import precompile_templates
+from app.models.risk_tables import (
+    AIPrompt, RiskBlacklistAddress, RiskBlacklistEmailDomain, RiskBlacklistIP, RiskBlacklistUser,
+    RiskGreylist, RiskRule, RiskWhitelistAddress, RiskWhitelistUser,
+)
+
+logger = logging.getLogger("phalanx.startup")
+
+# Filled by run_startup_warmup; shown under "startup" in /health/ready
+_report: Dict[str, object] = {"done": False, "phases_ms": {}}
+
+
+def startup_report() -> dict:
+    return _report
+
+
+def _hot_queries():
+    """
+    The statements behind the first pages people open, written exactly as
+    the routers write them so SQLAlchemy's compiled cache and asyncpg's
+    per-connection prepared statements are reused by real requests.
+    """
+    return [
+        select(RiskRule).order_by(RiskRule.priority.desc()),
+        select(AIPrompt).where(AIPrompt.prompt_key == 'RISK_ANALYSIS_MAIN', AIPrompt.is_active == True),
+        select(RiskWhitelistUser).order_by(RiskWhitelistUser.created_at.desc()),
+        select(RiskWhitelistAddress).order_by(RiskWhitelistAddress.created_at.desc()),
+        select(RiskGreylist).order_by(RiskGreylist.created_at.desc()),
+        select(RiskBlacklistUser).order_by(RiskBlacklistUser.created_at.desc()),
+        select(RiskBlacklistIP).order_by(RiskBlacklistIP.created_at.desc()),
+        select(RiskBlacklistEmailDomain).order_by(RiskBlacklistEmailDomain.created_at.desc()),
+        select(RiskBlacklistAddress).order_by(RiskBlacklistAddress.created_at.desc()),
+    ]
+
+
+# ================= PHASES =================
+async def warm_pool(connections: int) -> int:
+    """Open `connections` pool connections at once and ping each. Returns how many came up."""
+    connections = max(0, min(connections, settings.DB_POOL_SIZE))
+    if not connections:
+        return 0
+    all_settled, release = asyncio.Event(), asyncio.Event()
+    settled = 0
+
+    def settle():
+        nonlocal settled
+        settled += 1
+        if settled == connections:
+            all_settled.set()
+
+    async def hold():
+        # Held until all are open, otherwise the pool would hand back the same one
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                settle()
+                await release.wait()
+        except Exception:
+            if not release.is_set():
+                settle()
+            raise
+
+    tasks = [asyncio.create_task(hold()) for _ in range(connections)]
+    try:
+        await all_settled.wait()
+    finally:
+        release.set()
+        if not all_settled.is_set():
+            # Timed out (or cancelled): don't wait for connects still in flight
+            for task in tasks:
+                task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        logger.warning("pool warmup: %d of %d connections failed (%s)", len(errors), connections, errors[0])
+    return connections - len(errors)
+
+
+async def warm_queries(sessions: int) -> int:
+    """Run the hot statements on `sessions` concurrent sessions (one pooled connection each)."""
+    async def run_all():
+        async with SessionLocal() as db:
+            for stmt in _hot_queries():
+                (await db.execute(stmt)).scalars().all()
+
+    await asyncio.gather(*(run_all() for _ in range(max(1, sessions))))
+    return len(_hot_queries())
+
+
+async def _timed(phases: Dict[str, float], name: str, coro):
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        phases[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+async def run_startup_warmup():
+    """
+    Lifespan startup: compile templates (in a thread) while the pool opens
+    and pings its connections, then run the hot queries on every one of them.
+    Failures are logged, never raised: a DB blip at boot shouldn't stop the
+    process, readiness will report it instead.
+    """
+    phases: Dict[str, float] = {}
+    started = time.perf_counter()
+    error: Optional[str] = None
+
+    async def db_phases():
+        opened = await _timed(phases, "pool", warm_pool(settings.STARTUP_POOL_CONNECTIONS))
+        if not opened and settings.STARTUP_POOL_CONNECTIONS > 0:
+            raise ConnectionError("no pool connection could be opened")
+        await _timed(phases, "queries", warm_queries(opened))
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                _timed(phases, "templates", asyncio.to_thread(precompile_templates)),
+                db_phases() if settings.STARTUP_WARMUP_ENABLED else asyncio.sleep(0),
+            ),
+            settings.STARTUP_WARMUP_TIMEOUT_S,
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logger.exception("startup warmup failed")
+
+    _report.update({
+        "done": True,
+        "phases_ms": phases,
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "error": error,
+    })
+    # One JSON object per line, like the slow-query log
+    logger.info(json.dumps({"event": "startup_warmup", **_report}))
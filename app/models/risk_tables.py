@@ -1,4 +1,3 @@
-
 from sqlalchemy import Column, Integer, String, Text, DateTime, func
 from app.core.database import Base
 from sqlalchemy import PrimaryKeyConstraint
@@ -201,4 +200,174 @@ class AIPrompt(Base):
     is_active = Column(Boolean, default=False)
     change_reason = Column(String, nullable=True)
     created_by = Column(String, default="admin")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# ================= LATEST DECISION PROJECTION =================
+# One row per txn_id ("last write wins" over risk_withdraw_decision), kept up
+# to date by app/services/decision_projection.py. Narrow on purpose: the
+# dashboard and search read this instead of re-deduplicating raw logs.
+class RiskTxnLatestDecision(Base):
+    __tablename__ = "risk_txn_latest_decision"
+    __table_args__ = {"schema": "rt"}
+
+    txn_id = Column(String, primary_key=True)
+    log_id = Column(BigInteger)
+    user_code = Column(String, index=True)
+    decision_source = Column(String)
+    decision = Column(String)
+    confidence = Column(Float)
+    decision_timestamp = Column(DateTime(timezone=True), index=True)
+
+    # Extracted from features_snapshot / user_device at projection time
+    withdrawal_amount = Column(Double)
+    withdraw_currency = Column(String)
+    country = Column(String)
+
+
+class ProjectionWatermark(Base):
+    __tablename__ = "risk_projection_watermark"
+    __table_args__ = {"schema": "rt"}
+
+    name = Column(String, primary_key=True)
+    last_log_id = Column(BigInteger, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ================= TXN -> COUNTRY ENRICHMENT =================
+# Lazily filled from user_device by app/services/country_enrichment.py so a
+# txn's country is only ever looked up in user_device once.
+class RiskTxnCountry(Base):
+    __tablename__ = "risk_txn_country"
+    __table_args__ = {"schema": "rt"}
+
+    event_id = Column(BigInteger, primary_key=True)  # == numeric txn_id
+    country = Column(String)
+    resolved_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ================= TABLE VERSIONS (HTTP conditional requests) =================
+# Bumped in the writer's transaction by app/core/conditional.py whenever an
+# ORM flush touches a tracked table; list pages derive their ETag from it.
+class RiskTableVersion(Base):
+    __tablename__ = "risk_table_version"
+    __table_args__ = {"schema": "rt"}
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ================= TIME-BUCKETED DASHBOARD AGGREGATES =================
+# Maintained by app/services/decision_aggregates.py from the latest-decision
+# projection (decision counts / amounts) and the raw log (latency), at 5m, 1h
+# and 1d granularity. Buckets are recomputed wholesale when marked dirty.
+class RiskDecisionAgg(Base):
+    __tablename__ = "risk_decision_agg"
+    __table_args__ = {"schema": "rt"}
+
+    granularity = Column(String, primary_key=True)  # 5m | 1h | 1d
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    source = Column(String, primary_key=True)       # AI | RULE
+    decision = Column(String, primary_key=True)     # upper-cased, UNKNOWN if missing
+    country = Column(String, primary_key=True)
+    txn_count = Column(BigInteger, nullable=False, default=0)
+    amount_sum = Column(Double, nullable=False, default=0)
+
+
+class RiskLatencyAgg(Base):
+    __tablename__ = "risk_latency_agg"
+    __table_args__ = {"schema": "rt"}
+
+    granularity = Column(String, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    source = Column(String, primary_key=True)
+    log_count = Column(BigInteger, nullable=False, default=0)
+    latency_sum_ms = Column(Double, nullable=False, default=0)
+
+
+# Highest-confidence AI reject of each bucket (the dashboard's AI insight)
+class RiskAiRejectAgg(Base):
+    __tablename__ = "risk_ai_reject_agg"
+    __table_args__ = {"schema": "rt"}
+
+    granularity = Column(String, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    log_id = Column(BigInteger, nullable=False)     # risk_withdraw_decision row
+    confidence = Column(Float, nullable=False)
+    decision_timestamp = Column(DateTime(timezone=True), nullable=False)
+
+
+class RiskAggDirty(Base):
+    __tablename__ = "risk_agg_dirty"
+    __table_args__ = {"schema": "rt"}
+
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)  # 5m bucket
+    marked_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ================= AUDIT TRAIL =================
+# Written in batches by app/core/audit.py (write-behind), never on the request path.
+class RiskAuditLog(Base):
+    __tablename__ = "risk_audit_log"
+    __table_args__ = {"schema": "rt"}
+
+    audit_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    occurred_at = Column(DateTime(timezone=True), nullable=False)  # commit time of the change
+    actor = Column(String)            # JWT subject, "anonymous" or "system:<worker>"
+    action = Column(String, nullable=False)  # INSERT | UPDATE | DELETE | BULK_UPDATE | BULK_DELETE
+    table_name = Column(String, nullable=False)
+    entity_key = Column(String)       # primary key (JSON), or the WHERE clause for bulk statements
+    before = Column(JSONB(none_as_null=True))  # changed columns only for UPDATE
+    after = Column(JSONB(none_as_null=True))
+    request = Column(String)          # "POST /blacklist/ip"
+
+
+# ================= FEATURE PROFILES =================
+# Per-column quantile sketches of risk_features, one per hour and per day,
+# built incrementally by app/services/feature_profiles.py.
+class RiskFeatureProfile(Base):
+    __tablename__ = "risk_feature_profile"
+    __table_args__ = {"schema": "rt"}
+
+    granularity = Column(String, primary_key=True)   # 1h | 1d
+    column_name = Column(String, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    nulls = Column(BigInteger, nullable=False, default=0)
+    sketch = Column(JSONB, nullable=False)           # QuantileSketch.to_dict()
+
+
+class RiskFeatureProfileWatermark(Base):
+    __tablename__ = "risk_feature_profile_watermark"
+    __table_args__ = {"schema": "rt"}
+
+    name = Column(String, primary_key=True)
+    # Keyset position: last (update_time, user_code, txn_id) folded in
+    update_time = Column(DateTime(timezone=True))
+    user_code = Column(String)
+    txn_id = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Transactions already folded into the profiles: a re-written row counts once
+class RiskFeatureProfiled(Base):
+    __tablename__ = "risk_feature_profiled"
+    __table_args__ = {"schema": "rt"}
+
+    user_code = Column(String, primary_key=True)
+    txn_id = Column(String, primary_key=True)
+    update_time = Column(DateTime(timezone=True), nullable=False)  # of the write that was folded
+
+
+# ================= LIST CHANGE FEED =================
+# Appended, read and pruned by app/services/list_feed.py, in the transaction
+# of the list write itself.
+class RiskListChange(Base):
+    __tablename__ = "risk_list_changes"
+    __table_args__ = {"schema": "rt"}
+
+    change_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    version = Column(BigInteger, nullable=False)  # feed version of the writing transaction
+    table_name = Column(Text, nullable=False)
+    entry_part = Column(Text)         # greylist entity_type, NULL elsewhere
+    entry_key = Column(Text)          # NULL: bulk write whose keys weren't known
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -2,17 +2,17 @@ from typing import Optional
 from jose import jwt, JWTError
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.core.database import get_db
+from app.core.templating import templates
+from app.core.serialization import FastJSONResponse
 from app.models.users import User
 from app.core.security import verify_password, get_password_hash, create_access_token
 from app.core.config import settings
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 # --- REGISTER ---
 @router.get("/register", response_class=HTMLResponse)
@@ -103,7 +103,7 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     await db.delete(user)
     await db.commit()
     
-    return {"status": "success", "message": "User deleted"}
+    return FastJSONResponse({"status": "success", "message": "User deleted"})
 
 # ========================================================
 #  NEW: AUTHENTICATION DEPENDENCY (get_current_user)
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.conditional import conditional_response
+from app.core.templating import templates, stream_template
+from app.core.config import settings
+from app.core.serialization import FastJSONResponse
 from app.models.risk_tables import (
     RiskBlacklistUser, RiskBlacklistIP, RiskBlacklistEmailDomain, RiskBlacklistAddress
 )
@@ -11,24 +14,33 @@ from app.schemas.blacklist import (
 )
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 # ================= MAIN DASHBOARD VIEW =================
 @router.get("/blacklist")
 async def view_blacklist_dashboard(request: Request, db: AsyncSession = Depends(get_db)):
+    not_modified, validators = await conditional_response(
+        request, db, RiskBlacklistUser, RiskBlacklistIP, RiskBlacklistEmailDomain, RiskBlacklistAddress
+    )
+    if not_modified:
+        return not_modified
+
     # Fetch all lists in parallel (conceptually) for the dashboard
     users = await db.execute(select(RiskBlacklistUser).order_by(RiskBlacklistUser.created_at.desc()))
     ips = await db.execute(select(RiskBlacklistIP).order_by(RiskBlacklistIP.created_at.desc()))
     domains = await db.execute(select(RiskBlacklistEmailDomain).order_by(RiskBlacklistEmailDomain.created_at.desc()))
     addresses = await db.execute(select(RiskBlacklistAddress).order_by(RiskBlacklistAddress.created_at.desc()))
 
-    return templates.TemplateResponse("lists/blacklist.html", {
+    context = {
         "request": request,
         "users": users.scalars().all(),
         "ips": ips.scalars().all(),
         "domains": domains.scalars().all(),
         "addresses": addresses.scalars().all()
-    })
+    }
+    # Large page: stream it so the layout renders before the tables finish
+    if settings.TEMPLATE_STREAM_LISTS:
+        return stream_template(request, "lists/blacklist.html", context, headers=validators)
+    return templates.TemplateResponse("lists/blacklist.html", context, headers=validators)
 
 # ================= 1. BLACKLIST USER =================
 @router.post("/blacklist/user")
@@ -37,7 +49,7 @@ async def add_bl_user(item: BlacklistUserCreate, db: AsyncSession = Depends(get_
         raise HTTPException(400, "User already blacklisted")
     db.add(RiskBlacklistUser(**item.dict()))
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path to capture full ID string
 @router.put("/blacklist/user/{user_code:path}")
@@ -48,7 +60,7 @@ async def update_bl_user(user_code: str, item: BlacklistUserCreate, db: AsyncSes
     entry.expires_at = item.expires_at
     entry.status = item.status
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path to capture full ID string
 @router.delete("/blacklist/user/{user_code:path}")
@@ -57,7 +69,7 @@ async def delete_bl_user(user_code: str, db: AsyncSession = Depends(get_db)):
     if not entry: raise HTTPException(404, "Not found")
     await db.delete(entry)
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # ================= 2. BLACKLIST IP =================
 @router.post("/blacklist/ip")
@@ -66,7 +78,7 @@ async def add_bl_ip(item: BlacklistIPCreate, db: AsyncSession = Depends(get_db))
         raise HTTPException(400, "IP already blacklisted")
     db.add(RiskBlacklistIP(**item.dict()))
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path
 @router.put("/blacklist/ip/{ip_address:path}")
@@ -77,7 +89,7 @@ async def update_bl_ip(ip_address: str, item: BlacklistIPCreate, db: AsyncSessio
     entry.expires_at = item.expires_at
     entry.status = item.status
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path
 @router.delete("/blacklist/ip/{ip_address:path}")
@@ -86,7 +98,7 @@ async def delete_bl_ip(ip_address: str, db: AsyncSession = Depends(get_db)):
     if not entry: raise HTTPException(404, "Not found")
     await db.delete(entry)
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # ================= 3. BLACKLIST DOMAIN =================
 @router.post("/blacklist/domain")
@@ -95,7 +107,7 @@ async def add_bl_domain(item: BlacklistDomainCreate, db: AsyncSession = Depends(
         raise HTTPException(400, "Domain already blacklisted")
     db.add(RiskBlacklistEmailDomain(**item.dict()))
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path
 @router.put("/blacklist/domain/{domain:path}")
@@ -106,7 +118,7 @@ async def update_bl_domain(domain: str, item: BlacklistDomainCreate, db: AsyncSe
     entry.expires_at = item.expires_at
     entry.status = item.status
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path
 @router.delete("/blacklist/domain/{domain:path}")
@@ -115,7 +127,7 @@ async def delete_bl_domain(domain: str, db: AsyncSession = Depends(get_db)):
     if not entry: raise HTTPException(404, "Not found")
     await db.delete(entry)
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # ================= 4. BLACKLIST ADDRESS =================
 @router.post("/blacklist/address")
@@ -124,7 +136,7 @@ async def add_bl_address(item: BlacklistAddressCreate, db: AsyncSession = Depend
         raise HTTPException(400, "Address already blacklisted")
     db.add(RiskBlacklistAddress(**item.dict()))
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path
 @router.put("/blacklist/address/{address:path}")
@@ -136,7 +148,7 @@ async def update_bl_address(address: str, item: BlacklistAddressCreate, db: Asyn
     entry.expires_at = item.expires_at
     entry.status = item.status
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path
 @router.delete("/blacklist/address/{address:path}")
@@ -145,4 +157,4 @@ async def delete_bl_address(address: str, db: AsyncSession = Depends(get_db)):
     if not entry: raise HTTPException(404, "Not found")
     await db.delete(entry)
     await db.commit()
-    return {"status": "success"}
\ No newline at end of file
+    return FastJSONResponse({"status": "success"})
\ No newline at end of file
@@ -1,30 +1,38 @@
+from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import desc, or_, func
+from sqlalchemy import desc, or_, func, literal, Text
+from sqlalchemy.dialects.postgresql import JSONB
 from app.core.database import get_db
+from app.core.templating import templates
+from app.core.result_cache import cached
+from app.core.serialization import dumps
 from app.models.risk_tables import RiskWithdrawDecision
+from app.services.export import export_response
+from app.core.config import settings
 import math
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
-@router.get("/decisions")
-async def view_decisions(
-    request: Request, 
-    page: int = 1, 
-    q: str = "", 
-    source: str = "ALL",
-    db: AsyncSession = Depends(get_db)
-):
-    PAGE_SIZE = 15
-    offset = (page - 1) * PAGE_SIZE
-    
-    # Base Query
-    query = select(RiskWithdrawDecision)
-    
-    # Filters
+# Columns the list template actually renders (features_snapshot / llm_reasoning stay in the DB)
+LIST_COLUMNS = (
+    RiskWithdrawDecision.log_id,
+    RiskWithdrawDecision.user_code,
+    RiskWithdrawDecision.txn_id,
+    RiskWithdrawDecision.decision_source,
+    RiskWithdrawDecision.decision,
+    RiskWithdrawDecision.primary_threat,
+    RiskWithdrawDecision.confidence,
+    RiskWithdrawDecision.narrative,
+    RiskWithdrawDecision.decision_timestamp,
+)
+MAX_SNAPSHOT_FIELDS = 100
+
+def decision_filters(q: str = "", source: str = "ALL"):
+    """Search filters shared by the list view and the export."""
     filters = []
     if q:
         filters.append(or_(
@@ -34,24 +42,58 @@ async def view_decisions(
     
     if source != "ALL":
         filters.append(RiskWithdrawDecision.decision_source == source)
-        
+    return filters
+
+@cached("decisions", ttl_s=settings.RESULT_CACHE_DECISIONS_TTL_S)
+async def decision_page(db, page: int, q: str, source: str, page_size: int = 15) -> dict:
+    """
+    One page of the decision log plus the filtered total (cached briefly,
+    shared by identical requests). Rows are plain dicts, not ORM objects:
+    they outlive the session that loaded them and are read by many requests.
+    """
+    offset = (page - 1) * page_size
+
+    # Base Query
+    query = select(RiskWithdrawDecision)
+
+    # Filters
+    filters = decision_filters(q, source)
     if filters:
         query = query.where(*filters)
-        
+
     # Count (Simple estimate for performance)
     count_query = select(func.count()).select_from(query.subquery())
     count_result = await db.execute(count_query)
     total_records = count_result.scalar() or 0
-    total_pages = math.ceil(total_records / PAGE_SIZE)
-    
+
     # Fetch Data
-    query = query.order_by(RiskWithdrawDecision.decision_timestamp.desc()).offset(offset).limit(PAGE_SIZE)
+    query = (
+        select(*LIST_COLUMNS)
+        .where(*filters)
+        .order_by(RiskWithdrawDecision.decision_timestamp.desc())
+        .offset(offset)
+        .limit(page_size)
+    )
     result = await db.execute(query)
-    logs = result.scalars().all()
+    return {"logs": [dict(row._mapping) for row in result], "total_records": total_records}
+
+@router.get("/decisions")
+async def view_decisions(
+    request: Request, 
+    page: int = 1, 
+    q: str = "", 
+    source: str = "ALL",
+    db: AsyncSession = Depends(get_db)
+):
+    PAGE_SIZE = 15
+    q = q.strip()
+    data = await decision_page(db, page, q, source, PAGE_SIZE)
+    total_records = data["total_records"]
+    total_pages = math.ceil(total_records / PAGE_SIZE)
     
     return templates.TemplateResponse("risk/decisions_list.html", {
         "request": request,
-        "logs": logs,
+        "logs": data["logs"],
         "page": page,
         "total_pages": total_pages,
         "q": q,
@@ -59,19 +101,65 @@ async def view_decisions(
         "total_records": total_records
     })
 
+# Declared before /decisions/{log_id} so "export" isn't parsed as a log_id
+@router.get("/decisions/export")
+async def export_decisions(
+    format: str = "csv",
+    q: str = "",
+    source: str = "ALL",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """Streams the filtered decision log as CSV / NDJSON / Parquet."""
+    filters = decision_filters(q, source)
+    if start:
+        filters.append(RiskWithdrawDecision.decision_timestamp >= start)
+    if end:
+        filters.append(RiskWithdrawDecision.decision_timestamp < end)
+
+    columns = list(RiskWithdrawDecision.__table__.columns)
+    query = select(*columns)
+    if filters:
+        query = query.where(*filters)
+    query = query.order_by(RiskWithdrawDecision.decision_timestamp.desc())
+    return export_response(query, columns, format, "decisions")
+
+def _snapshot_column(fields: Optional[str]):
+    """
+    Full features_snapshot, or (with ?fields=a,b,c.d) a jsonb object holding
+    only those keys, extracted in the DB with -> / #> so the rest never leaves it.
+    """
+    if not fields:
+        return RiskWithdrawDecision.features_snapshot
+
+    keys = [f.strip() for f in fields.split(",") if f.strip()][:MAX_SNAPSHOT_FIELDS]
+    pairs = []
+    for key in keys:
+        path = key.split(".")
+        value = (
+            RiskWithdrawDecision.features_snapshot[tuple(path)]  # #> '{a,b}'
+            if len(path) > 1
+            else RiskWithdrawDecision.features_snapshot[key]     # -> 'a'
+        )
+        pairs.extend([literal(key, Text), value])
+    return func.jsonb_build_object(*pairs, type_=JSONB).label("features_snapshot")
+
 @router.get("/decisions/{log_id}")
-async def get_decision_details(log_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(RiskWithdrawDecision).where(RiskWithdrawDecision.log_id == log_id))
-    log = result.scalars().first()
+async def get_decision_details(
+    log_id: int,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    scalar_columns = [c for c in RiskWithdrawDecision.__table__.columns if c.name != "features_snapshot"]
+    result = await db.execute(
+        select(*scalar_columns, _snapshot_column(fields))
+        .where(RiskWithdrawDecision.log_id == log_id)
+    )
+    row = result.first()
     
-    if not log:
+    if not row:
         raise HTTPException(status_code=404, detail="Log entry not found")
     
-    # Convert to Dict
-    data = {c.name: getattr(log, c.name) for c in log.__table__.columns}
-    
-    # Handle Date Serialization
-    if data['decision_timestamp']:
-        data['decision_timestamp'] = data['decision_timestamp'].isoformat()
-        
-    return data
\ No newline at end of file
+    # Convert to Dict (dates / JSONB are serialized natively by orjson)
+    # Large snapshots are compressed by CompressionMiddleware
+    return Response(content=dumps(dict(row._mapping)), media_type="application/json")
@@ -1,14 +1,30 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import desc, or_, func, text
 from app.core.database import get_db
+from app.core.templating import templates
+from app.core.serialization import FastJSONResponse, model_to_dict
 from app.models.risk_tables import RiskFeature
+from app.services.export import export_response
+from app.services.feature_cache import cache as recent_features
+from app.services.dashboard_data import parse_window
+from app.services.feature_profiles import all_profiles, column_profile
 import math
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+def feature_filters(q: str = ""):
+    """Search filters shared by the list view and the export."""
+    if not q:
+        return []
+    return [or_(
+        RiskFeature.user_code.ilike(f"%{q}%"),
+        RiskFeature.txn_id.ilike(f"%{q}%"),
+        RiskFeature.destination_address.ilike(f"%{q}%")
+    )]
 
 @router.get("/risk-features")
 async def view_risk_features(
@@ -24,14 +40,9 @@ async def view_risk_features(
     query = select(RiskFeature)
     
     # Search Filter
-    if q:
-        query = query.where(
-            or_(
-                RiskFeature.user_code.ilike(f"%{q}%"),
-                RiskFeature.txn_id.ilike(f"%{q}%"),
-                RiskFeature.destination_address.ilike(f"%{q}%")
-            )
-        )
+    filters = feature_filters(q)
+    if filters:
+        query = query.where(*filters)
     
     # Total Count (Optimized for Hologres: simple count)
     # Note: In massive tables, count(*) can be slow. 
@@ -55,8 +66,90 @@ async def view_risk_features(
         "total_records": total_records
     })
 
+@router.get("/risk-features/export")
+async def export_risk_features(
+    format: str = "csv",
+    q: str = "",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """Streams the filtered feature table as CSV / NDJSON / Parquet."""
+    filters = feature_filters(q)
+    if start:
+        filters.append(RiskFeature.update_time >= start)
+    if end:
+        filters.append(RiskFeature.update_time < end)
+
+    columns = list(RiskFeature.__table__.columns)
+    query = select(*columns)
+    if filters:
+        query = query.where(*filters)
+    query = query.order_by(RiskFeature.update_time.desc())
+    return export_response(query, columns, format, "risk_features")
+
+@router.get("/risk-features/profile")
+async def get_feature_profile(
+    column: Optional[str] = None,
+    window: str = "7d",
+    threshold: Optional[float] = None,
+    op: str = ">",
+    quantiles: Optional[str] = None,
+    bins: int = 20,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Distribution of a feature column over `window` (quantiles, histogram and,
+    with ?threshold=, the share of rows `column <op> threshold` would hit),
+    merged from the hourly/daily sketches. Without `column`: every column's summary.
+    """
+    try:
+        span = parse_window(window)
+        if column is None:
+            return FastJSONResponse(await all_profiles(db, span))
+        qs = tuple(float(q) for q in quantiles.split(",")) if quantiles else None
+        if qs and not all(0 <= q <= 1 for q in qs):
+            raise ValueError("quantiles must be between 0 and 1")
+        profile = await column_profile(
+            db, column, span, threshold=threshold, op=op, bins=max(1, min(bins, 200)),
+            **({"quantiles": qs} if qs else {}),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(profile)
+
+@router.get("/risk-features/history")
+async def get_feature_history(
+    user_code: str,
+    hours: float = 24,
+    limit: int = 200,
+    db: AsyncSession = Depends(get_db),
+):
+    """A user's feature rows over the last `hours`, newest first."""
+    limit = max(1, min(limit, 1000))
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+
+    # Recent windows come straight from the in-memory cache
+    if recent_features.covers(since):
+        rows = recent_features.user_history(user_code, since, limit)
+        return FastJSONResponse({"user_code": user_code, "source": "cache", "rows": rows})
+
+    query = (
+        select(RiskFeature)
+        .where(RiskFeature.user_code == user_code, RiskFeature.update_time >= since)
+        .order_by(RiskFeature.update_time.desc())
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    rows = [model_to_dict(r) for r in result.scalars().all()]
+    return FastJSONResponse({"user_code": user_code, "source": "db", "rows": rows})
+
 @router.get("/risk-features/details")
 async def get_feature_details(user_code: str, txn_id: str, db: AsyncSession = Depends(get_db)):
+    # Recent rows are served from memory; older ones fall through to the DB
+    cached = recent_features.get(user_code, txn_id)
+    if cached is not None:
+        return FastJSONResponse(cached)
+
     # Fetch specific record
     query = select(RiskFeature).where(
         (RiskFeature.user_code == user_code) & 
@@ -69,12 +162,5 @@ async def get_feature_details(user_code: str, txn_id: str, db: AsyncSession = De
         raise HTTPException(status_code=404, detail="Transaction not found")
     
     # Convert SQLAlchemy object to Dict dynamically to show ALL columns
-    # This avoids hardcoding 50 fields in HTML
-    data_dict = {c.name: getattr(record, c.name) for c in record.__table__.columns}
-    
-    # Handle dates for JSON serialization
-    for k, v in data_dict.items():
-        if hasattr(v, 'isoformat'):
-            data_dict[k] = v.isoformat()
-            
-    return data_dict
\ No newline at end of file
+    # This avoids hardcoding 50 fields in HTML (dates are handled by orjson)
+    return FastJSONResponse(model_to_dict(record))
\ No newline at end of file
@@ -1,21 +1,27 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.conditional import etag_matches, conditional_response
+from app.core.templating import templates
+from app.core.serialization import FastJSONResponse
 from app.models.risk_tables import RiskWhitelistUser, RiskWhitelistAddress, RiskGreylist
+from app.services import list_feed
 from app.schemas.lists import WhitelistUserCreate, WhitelistAddressCreate, GreylistCreate
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 # ==========================================
 # 1. USER WHITELIST MANAGEMENT
 # ==========================================
 @router.get("/whitelist/users")
 async def view_whitelist_users(request: Request, db: AsyncSession = Depends(get_db)):
+    not_modified, validators = await conditional_response(request, db, RiskWhitelistUser)
+    if not_modified:
+        return not_modified
     result = await db.execute(select(RiskWhitelistUser).order_by(RiskWhitelistUser.created_at.desc()))
-    return templates.TemplateResponse("lists/whitelist_users.html", {"request": request, "users": result.scalars().all()})
+    return templates.TemplateResponse("lists/whitelist_users.html", {"request": request, "users": result.scalars().all()}, headers=validators)
 
 @router.post("/whitelist/users/add")
 async def add_whitelist_user(item: WhitelistUserCreate, db: AsyncSession = Depends(get_db)):
@@ -28,7 +34,7 @@ async def add_whitelist_user(item: WhitelistUserCreate, db: AsyncSession = Depen
     db.add(new_entry)
     try:
         await db.commit()
-        return {"status": "success"}
+        return FastJSONResponse({"status": "success"})
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -38,8 +44,11 @@ async def add_whitelist_user(item: WhitelistUserCreate, db: AsyncSession = Depen
 # ==========================================
 @router.get("/whitelist/addresses")
 async def view_whitelist_addresses(request: Request, db: AsyncSession = Depends(get_db)):
+    not_modified, validators = await conditional_response(request, db, RiskWhitelistAddress)
+    if not_modified:
+        return not_modified
     result = await db.execute(select(RiskWhitelistAddress).order_by(RiskWhitelistAddress.created_at.desc()))
-    return templates.TemplateResponse("lists/whitelist_addresses.html", {"request": request, "addresses": result.scalars().all()})
+    return templates.TemplateResponse("lists/whitelist_addresses.html", {"request": request, "addresses": result.scalars().all()}, headers=validators)
 
 @router.post("/whitelist/addresses/add")
 async def add_whitelist_address(item: WhitelistAddressCreate, db: AsyncSession = Depends(get_db)):
@@ -51,7 +60,7 @@ async def add_whitelist_address(item: WhitelistAddressCreate, db: AsyncSession =
     db.add(new_entry)
     try:
         await db.commit()
-        return {"status": "success"}
+        return FastJSONResponse({"status": "success"})
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -61,8 +70,11 @@ async def add_whitelist_address(item: WhitelistAddressCreate, db: AsyncSession =
 # ==========================================
 @router.get("/greylist")
 async def view_greylist(request: Request, db: AsyncSession = Depends(get_db)):
+    not_modified, validators = await conditional_response(request, db, RiskGreylist)
+    if not_modified:
+        return not_modified
     result = await db.execute(select(RiskGreylist).order_by(RiskGreylist.created_at.desc()))
-    return templates.TemplateResponse("lists/greylist.html", {"request": request, "items": result.scalars().all()})
+    return templates.TemplateResponse("lists/greylist.html", {"request": request, "items": result.scalars().all()}, headers=validators)
 
 @router.post("/greylist/add")
 async def add_greylist(item: GreylistCreate, db: AsyncSession = Depends(get_db)):
@@ -78,7 +90,7 @@ async def add_greylist(item: GreylistCreate, db: AsyncSession = Depends(get_db))
     db.add(new_entry)
     try:
         await db.commit()
-        return {"status": "success"}
+        return FastJSONResponse({"status": "success"})
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -100,7 +112,7 @@ async def update_whitelist_user(user_code: str, item: WhitelistUserCreate, db: A
     entry.status = item.status
     
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # FIX: Added :path to capture full string ID properly
 @router.delete("/whitelist/users/{user_code:path}")
@@ -111,7 +123,7 @@ async def delete_whitelist_user(user_code: str, db: AsyncSession = Depends(get_d
     
     await db.delete(entry)
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # ==========================================
 # 2. ADDRESS WHITELIST - UPDATE & DELETE
@@ -128,7 +140,7 @@ async def update_whitelist_address(address: str, item: WhitelistAddressCreate, d
     entry.status = item.status
     
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 @router.delete("/whitelist/addresses/{address:path}")
 async def delete_whitelist_address(address: str, db: AsyncSession = Depends(get_db)):
@@ -138,7 +150,7 @@ async def delete_whitelist_address(address: str, db: AsyncSession = Depends(get_
     
     await db.delete(entry)
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 # ==========================================
 # 3. GREYLIST - UPDATE & DELETE
@@ -161,7 +173,7 @@ async def update_greylist(item: GreylistCreate, db: AsyncSession = Depends(get_d
     entry.status = item.status
     
     await db.commit()
-    return {"status": "success"}
+    return FastJSONResponse({"status": "success"})
 
 @router.delete("/greylist/delete")
 async def delete_greylist(entity_value: str, entity_type: str, db: AsyncSession = Depends(get_db)):
@@ -177,4 +189,30 @@ async def delete_greylist(entity_value: str, entity_type: str, db: AsyncSession
     
     await db.delete(entry)
     await db.commit()
-    return {"status": "success"}
\ No newline at end of file
+    return FastJSONResponse({"status": "success"})
+
+# ==========================================
+# 4. SNAPSHOT + DELTA FEED (for services that check lists locally)
+# ==========================================
+@router.get("/lists/snapshot")
+async def get_list_snapshot(request: Request, bloom: bool = False):
+    """
+    Every active list in the binary format of app/services/list_snapshot.py.
+    X-List-Version is the version to pass to /lists/delta next.
+    """
+    version, body, digest = await list_feed.snapshot(bloom)
+    headers = {"ETag": f'"{digest}"', "X-List-Version": str(version), "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/octet-stream", headers=headers)
+
+@router.get("/lists/delta")
+async def get_list_delta(since: int):
+    """Keys added to or removed from any list after version `since`; 410 means reload the snapshot."""
+    try:
+        return FastJSONResponse(await list_feed.delta(since))
+    except list_feed.VersionGone as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,16 +1,19 @@
 import json
+import time
 import urllib.request
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import desc, update
 
 from app.core.database import get_db
+from app.core.templating import templates
+from app.core.serialization import FastJSONResponse
 from app.models.risk_tables import AIPrompt
 from app.core.config import settings
+from app.core.metrics import LLM_CALL, LLM_CALLS
 
 # --- AUTH IMPORT (Adjust based on your actual auth.py file) ---
 # Assuming you have a function that returns the User model from the JWT token
@@ -19,7 +22,6 @@ from app.routers.auth import get_current_user
 from app.models.users import User
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 # --- SCHEMAS ---
 class PromptUpdate(BaseModel):
@@ -83,8 +85,15 @@ async def test_prompt(payload: PromptTest):
             api_url, data=data, headers={"Content-Type": "application/json"}
         )
         
-        with urllib.request.urlopen(req) as response:
-            res_json = json.loads(response.read().decode("utf-8"))
+        llm_started = time.perf_counter()
+        outcome = "error"
+        try:
+            with urllib.request.urlopen(req) as response:
+                res_json = json.loads(response.read().decode("utf-8"))
+            outcome = "success"
+        finally:
+            LLM_CALL.labels(outcome).observe(time.perf_counter() - llm_started)
+            LLM_CALLS.labels(outcome).inc()
             
         # 4. Extract Text
         try:
@@ -92,14 +101,14 @@ async def test_prompt(payload: PromptTest):
             # Clean formatting code fences if present
             if "```json" in model_reply:
                 model_reply = model_reply.replace("```json", "").replace("```", "")
-            return {"status": "success", "reply": model_reply}
+            return FastJSONResponse({"status": "success", "reply": model_reply})
         except Exception as e:
-            return {"status": "error", "reply": f"Raw Gemini response invalid: {str(e)}", "raw": res_json}
+            return FastJSONResponse({"status": "error", "reply": f"Raw Gemini response invalid: {str(e)}", "raw": res_json})
 
     except json.JSONDecodeError:
-        return {"status": "error", "reply": "Invalid Test Data JSON format."}
+        return FastJSONResponse({"status": "error", "reply": "Invalid Test Data JSON format."})
     except Exception as e:
-        return {"status": "error", "reply": str(e)}
+        return FastJSONResponse({"status": "error", "reply": str(e)})
 
 
 @router.post("/publish")
@@ -124,6 +133,7 @@ async def publish_prompt(
         update(AIPrompt)
         .where(AIPrompt.prompt_key == payload.prompt_key)
         .values(is_active=False)
+        .execution_options(audit_values={"is_active": False})
     )
 
     # 3. Insert new Active Prompt using logged-in username
@@ -138,4 +148,4 @@ async def publish_prompt(
     db.add(new_prompt)
     await db.commit()
 
-    return {"status": "success", "version": new_version}
\ No newline at end of file
+    return FastJSONResponse({"status": "success", "version": new_version})
\ No newline at end of file
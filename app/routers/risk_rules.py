@@ -1,61 +1,44 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.core.database import get_db
+from app.core.conditional import conditional_response
+from app.core.templating import templates, stream_template
+from app.core.config import settings
+from app.core.serialization import FastJSONResponse
 from app.models.risk_tables import RiskRule
 from app.schemas.risk import RiskRuleCreate
+from app.services.rule_compiler import evaluation_report, validate_logic_expression
 from sqlalchemy import func
-import ast
 
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
-
-
-# --- 1. Helper: AST Validator (Derived from your provided code) ---
-_ALLOWED_NODES = (
-    ast.Expression, ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.Compare,
-    ast.Name, ast.Load, ast.Constant, ast.And, ast.Or, ast.Not,
-    ast.UAdd, ast.USub, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod,
-    ast.Eq, ast.NotEq, ast.Gt, ast.GtE, ast.Lt, ast.LtE,
-)
-
-def validate_logic_expression(expr: str):
-    """
-    Parses string to AST and checks if it is a safe, valid Python expression.
-    Returns (True, None) or (False, error_message).
-    """
-    expr = (expr or "").replace("\n", " ").strip()
-    if not expr:
-        return False, "Expression cannot be empty."
-    
-    try:
-        # 1. Check Syntax
-        tree = ast.parse(expr, mode="eval")
-        
-        # 2. Check Security/Allowed Nodes
-        for n in ast.walk(tree):
-            if not isinstance(n, _ALLOWED_NODES):
-                return False, f"Security Block: Disallowed logic element '{type(n).__name__}'"
-                
-        return True, None
-    except SyntaxError as e:
-        return False, f"Syntax Error: {e.msg} at offset {e.offset}"
-    except Exception as e:
-        return False, str(e)
 
 
 @router.get("/risk-rules")
 async def view_risk_rules(request: Request, db: AsyncSession = Depends(get_db)):
+    not_modified, validators = await conditional_response(request, db, RiskRule)
+    if not_modified:
+        return not_modified
+
     # Fetch all rules ordered by Priority (descending)
     result = await db.execute(select(RiskRule).order_by(RiskRule.priority.desc()))
     rules = result.scalars().all()
     
-    return templates.TemplateResponse("risk/rules_list.html", {
+    context = {
         "request": request, 
         "rules": rules
-    })
+    }
+    if settings.TEMPLATE_STREAM_LISTS:
+        return stream_template(request, "risk/rules_list.html", context, headers=validators)
+    return templates.TemplateResponse("risk/rules_list.html", context, headers=validators)
+
+# --- COMPILED RULE SET: shared-DAG evaluation savings on recent feature rows ---
+@router.get("/risk-rules/compiled")
+async def compiled_rules_report(sample: int = 1000, db: AsyncSession = Depends(get_db)):
+    if not 1 <= sample <= 50000:
+        raise HTTPException(status_code=400, detail="sample must be between 1 and 50000")
+    return FastJSONResponse(await evaluation_report(db, sample))
 
 # --- NEW: ADD RULE ENDPOINT ---
 @router.post("/risk-rules/add")
@@ -86,7 +69,7 @@ async def create_risk_rule(rule: RiskRuleCreate, db: AsyncSession = Depends(get_
         db.add(new_rule)
         await db.commit()
         await db.refresh(new_rule)
-        return {"status": "success", "message": "Rule created successfully", "rule_id": new_rule.rule_id}
+        return FastJSONResponse({"status": "success", "message": "Rule created successfully", "rule_id": new_rule.rule_id})
     except Exception as e:
         await db.rollback()
         # Log the error in a real app
@@ -124,7 +107,7 @@ async def update_risk_rule(
     # 3. Commit
     try:
         await db.commit()
-        return {"status": "success", "message": "Rule updated successfully"}
+        return FastJSONResponse({"status": "success", "message": "Rule updated successfully"})
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
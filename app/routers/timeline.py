@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from app.core.serialization import FastJSONResponse
+from app.services.user_timeline import user_timeline
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 500
+
+@router.get("/users/{user_code}/timeline")
+async def get_user_timeline(
+    user_code: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+):
+    """Decisions, feature rows and device events for one user, newest first (cursor-paginated)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    try:
+        page = await user_timeline(user_code, start, end, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(page)
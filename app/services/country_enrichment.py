@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Dict, Iterable
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.metrics import COUNTRY_LOOKUPS
+from app.models.risk_tables import RiskTxnCountry, UserDevice
+
+# event_id -> country, most recently used last. Per-process and bounded.
+_lru: "OrderedDict[int, str]" = OrderedDict()
+
+
+def _remember(event_id: int, country: str):
+    _lru[event_id] = country
+    _lru.move_to_end(event_id)
+    while len(_lru) > settings.COUNTRY_CACHE_SIZE:
+        _lru.popitem(last=False)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def resolve_countries(db, txn_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    Maps txn_id -> country for numeric txn_ids. Lookup order: in-memory LRU,
+    rt.risk_txn_country, then user_device (results written back to the
+    lookup table). Every DB round trip is chunked to COUNTRY_LOOKUP_CHUNK ids.
+    Txns with no known country are simply absent from the result.
+    Write-backs join the caller's transaction; the caller commits.
+    """
+    wanted = {int(t) for t in txn_ids if t and str(t).isdigit()}
+    found: Dict[int, str] = {}
+
+    # 1. Memory
+    for event_id in wanted:
+        country = _lru.get(event_id)
+        if country is not None:
+            _lru.move_to_end(event_id)
+            found[event_id] = country
+    COUNTRY_LOOKUPS.labels("memory").inc(len(found))
+
+    # 2. Lookup table
+    missing = sorted(wanted - found.keys())
+    from_table = 0
+    for chunk in _chunks(missing, settings.COUNTRY_LOOKUP_CHUNK):
+        res = await db.execute(
+            select(RiskTxnCountry.event_id, RiskTxnCountry.country)
+            .where(RiskTxnCountry.event_id.in_(chunk))
+        )
+        for event_id, country in res.all():
+            found[event_id] = country
+            _remember(event_id, country)
+            from_table += 1
+    COUNTRY_LOOKUPS.labels("table").inc(from_table)
+
+    # 3. user_device (source of truth) -> write back
+    missing = sorted(wanted - found.keys())
+    resolved = {}
+    for chunk in _chunks(missing, settings.COUNTRY_LOOKUP_CHUNK):
+        res = await db.execute(
+            select(UserDevice.event_id, UserDevice.country)
+            .where(UserDevice.event_id.in_(chunk), UserDevice.country.isnot(None))
+        )
+        for event_id, country in res.all():
+            resolved[event_id] = country
+
+    if resolved:
+        rows = [{"event_id": k, "country": v} for k, v in resolved.items()]
+        for chunk in _chunks(rows, settings.COUNTRY_LOOKUP_CHUNK):
+            await db.execute(insert(RiskTxnCountry).values(chunk).on_conflict_do_nothing())
+        for event_id, country in resolved.items():
+            found[event_id] = country
+            _remember(event_id, country)
+    COUNTRY_LOOKUPS.labels("user_device").inc(len(resolved))
+    COUNTRY_LOOKUPS.labels("missing").inc(len(wanted) - len(found))
+
+    return {str(k): v for k, v in found.items()}
@@ -0,0 +1,262 @@
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.future import select
+from app.core.config import settings
+from app.models.risk_tables import RiskWithdrawDecision, RiskTxnLatestDecision
+from app.core.metrics import DASHBOARD_COMPUTE
+from app.services.decision_aggregates import (
+    GRANULARITIES, ceil_ts, floor_ts, decision_totals, latency_totals, decision_series, latency_series,
+    top_ai_reject,
+)
+
+WINDOW_RE = re.compile(r"^(\d+)([mhd])$")
+_WINDOW_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+AUTO_MAX_POINTS = 200  # auto granularity picks the finest that stays under this
+_LABEL_FORMATS = {"5m": "%d %H:%M", "1h": "%d %H:00", "1d": "%m-%d"}
+
+def as_utc(ts):
+    """Timestamps from timestamptz columns are aware; guard against naive ones anyway."""
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+def calculate_delta(current, previous):
+    """Calculates percentage change safely handling zero division."""
+    if previous == 0:
+        return 100.0 if current > 0 else 0.0
+    return round(((current - previous) / previous) * 100, 1)
+
+def parse_window(value: str) -> timedelta:
+    """'90m' / '24h' / '7d' -> timedelta. Raises ValueError on anything else."""
+    match = WINDOW_RE.match(value or "")
+    if not match:
+        raise ValueError(f"window must look like 90m, 24h or 7d, got {value!r}")
+    window = timedelta(**{_WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+    if window < timedelta(seconds=GRANULARITIES["5m"]):
+        raise ValueError("window must be at least 5m")
+    if window > timedelta(days=settings.DASHBOARD_MAX_WINDOW_DAYS):
+        raise ValueError(f"window must be at most {settings.DASHBOARD_MAX_WINDOW_DAYS}d")
+    return window
+
+def resolve_view(window: timedelta, granularity: str = None, now: datetime = None):
+    """
+    Snaps the window onto aggregate buckets and picks the chart granularity.
+    Returns (start, end, granularity). The window ends at the next 5m
+    boundary, or the next hour once the comparison period reaches past the
+    5m retention; the previous period is the same length right before it.
+    """
+    now = now or datetime.now(timezone.utc)
+    finest_cutoff = now - timedelta(days=settings.DECISION_AGG_5M_RETENTION_DAYS)
+
+    snap = GRANULARITIES["5m"] if window * 2 <= timedelta(days=settings.DECISION_AGG_5M_RETENTION_DAYS) else GRANULARITIES["1h"]
+    window = timedelta(seconds=-(-window.total_seconds() // snap) * snap)
+    end = ceil_ts(now, snap)
+    start = end - window
+
+    def points(gran):
+        return window.total_seconds() / GRANULARITIES[gran]
+
+    if granularity in (None, "", "auto"):
+        granularity = next(
+            (g for g in ("5m", "1h") if points(g) <= AUTO_MAX_POINTS and (g != "5m" or start >= finest_cutoff)),
+            "1d",
+        )
+    elif granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of auto, {', '.join(GRANULARITIES)}")
+    elif points(granularity) > settings.DASHBOARD_MAX_POINTS:
+        raise ValueError(f"{granularity} over this window exceeds {settings.DASHBOARD_MAX_POINTS} points")
+    elif granularity == "5m" and start < finest_cutoff:
+        raise ValueError(f"5m history is kept for {settings.DECISION_AGG_5M_RETENTION_DAYS} days")
+    return start, end, granularity
+
+async def compute_dashboard(db, window: str = None, granularity: str = None) -> dict:
+    """
+    Everything the executive dashboard renders: KPIs, chart series, the AI
+    insight and recent blocks, for `window` (default DASHBOARD_DEFAULT_WINDOW)
+    against the window before it. Shared by the page and the live (SSE) feed.
+
+    Counts, amounts, latency and the AI insight come from the pre-bucketed
+    aggregate tables (see decision_aggregates), so a 90-day window reads a
+    few hundred rows.
+    """
+    t_start = time.perf_counter()
+
+    label = window or settings.DASHBOARD_DEFAULT_WINDOW
+    span = parse_window(label)
+    start, end, gran = resolve_view(span, granularity)
+    prev_start = start - (end - start)
+
+    # --- 1. WINDOW TOTALS (current and previous) + SERIES, all from the aggregates ---
+    curr_rows = await decision_totals(db, start, end)
+    prev_rows = await decision_totals(db, prev_start, start)
+    latency_rows = await latency_totals(db, start, end)
+    # Series buckets are whole `gran` buckets overlapping the window
+    series_start = floor_ts(start, GRANULARITIES[gran])
+    vol_rows = await decision_series(db, gran, series_start, end)
+    lat_series_rows = await latency_series(db, gran, series_start, end)
+
+    # --- 2. RECENT BLOCKS (latest decision per txn, non-PASS, newest first) ---
+    blocks_res = await db.execute(
+        select(RiskTxnLatestDecision)
+        .where(
+            RiskTxnLatestDecision.decision_timestamp >= start,
+            RiskTxnLatestDecision.decision_timestamp < end,
+            func.upper(func.coalesce(RiskTxnLatestDecision.decision, "")) != "PASS",
+        )
+        .order_by(RiskTxnLatestDecision.decision_timestamp.desc())
+        .limit(5)
+    )
+    recent_txns = blocks_res.scalars().all()
+
+    # AI Insight: highest-confidence AI reject of the window (latest wins on ties),
+    # picked from the per-bucket winners, then one row fetched by key. Plain
+    # columns only: the result is cached and shared across requests
+    ai_save_of_day = None
+    top = await top_ai_reject(db, start, end)
+    if top is not None:
+        D = RiskWithdrawDecision
+        insight_res = await db.execute(
+            select(D.user_code, D.confidence, D.primary_threat, D.narrative, D.llm_reasoning).where(
+                D.log_id == top.log_id,
+                D.decision_timestamp == top.decision_timestamp,
+            )
+        )
+        row = insight_res.first()
+        ai_save_of_day = dict(row._mapping) if row is not None else None
+
+    t_queried = time.perf_counter()
+    DASHBOARD_COMPUTE.labels("query").observe(t_queried - t_start)
+
+    # --- 3. OPERATIONAL METRICS (LATENCY, over every raw decision) ---
+    metrics_latency = {"RULE": [0.0, 0], "AI": [0.0, 0]}
+    for source, count, total in latency_rows:
+        metrics_latency[source][0] += float(total or 0)
+        metrics_latency[source][1] += int(count or 0)
+
+    # --- 4. BUSINESS METRICS ---
+    stats = {
+        "curr": {"volume": 0.0, "count": 0, "pass": 0, "reject": 0, "hold": 0},
+        "prev": {"volume": 0.0, "count": 0, "pass": 0, "reject": 0, "hold": 0}
+    }
+    source_stats = {
+        "RULE": {"PASS": 0, "HOLD": 0, "REJECT": 0},
+        "AI":   {"PASS": 0, "HOLD": 0, "REJECT": 0}
+    }
+    country_risk = defaultdict(float)
+
+    for bucket, rows in (("curr", curr_rows), ("prev", prev_rows)):
+        for source, decision, country, count, amount in rows:
+            count, amount = int(count or 0), float(amount or 0.0)
+            stats[bucket]["volume"] += amount
+            stats[bucket]["count"] += count
+            if decision == "PASS": stats[bucket]["pass"] += count
+            elif decision == "REJECT": stats[bucket]["reject"] += count
+            elif decision == "HOLD": stats[bucket]["hold"] += count
+
+            if bucket == "curr":
+                if decision in source_stats[source]:
+                    source_stats[source][decision] += count
+                if decision != "PASS":
+                    country_risk[country] += amount
+
+    # --- 5. KPI CALCULATIONS ---
+    vol_curr = stats["curr"]["volume"]
+    vol_trend = calculate_delta(vol_curr, stats["prev"]["volume"])
+
+    cnt_curr = stats["curr"]["count"]
+    cnt_trend = calculate_delta(cnt_curr, stats["prev"]["count"])
+
+    pass_rate_curr = round((stats["curr"]["pass"] / cnt_curr * 100), 1) if cnt_curr else 0.0
+    pass_rate_prev = round((stats["prev"]["pass"] / stats["prev"]["count"] * 100), 1) if stats["prev"]["count"] else 0.0
+    pass_rate_trend = round(pass_rate_curr - pass_rate_prev, 1)
+
+    rule_sum, rule_count = metrics_latency["RULE"]
+    ai_sum, ai_count = metrics_latency["AI"]
+    avg_rule = int(rule_sum / rule_count) if rule_count else 0
+    avg_ai = int(ai_sum / ai_count) if ai_count else 0
+
+    kpi = {
+        "value_secured": f"${vol_curr:,.2f}",
+        "value_trend": vol_trend,
+        "txn_count": cnt_curr,
+        "txn_trend": cnt_trend,
+        "pass_rate": pass_rate_curr,
+        "pass_trend": pass_rate_trend,
+        "avg_rule_lat": f"{avg_rule}ms",
+        "avg_ai_lat": f"{avg_ai}ms"
+    }
+
+    # Chart 1: Global Decision Trend (Comparison)
+    decision_trend_data = {
+        "labels": ["PASS", "HOLD", "REJECT"],
+        "current": [stats["curr"]["pass"], stats["curr"]["hold"], stats["curr"]["reject"]],
+        "previous": [stats["prev"]["pass"], stats["prev"]["hold"], stats["prev"]["reject"]]
+    }
+
+    # Chart 2: Source Distribution (Rule vs AI)
+    source_distribution_data = {
+        "labels": ["PASS", "HOLD", "REJECT"],
+        "rule": [source_stats["RULE"]["PASS"], source_stats["RULE"]["HOLD"], source_stats["RULE"]["REJECT"]],
+        "ai":   [source_stats["AI"]["PASS"],   source_stats["AI"]["HOLD"],   source_stats["AI"]["REJECT"]]
+    }
+
+    # Time series, one point per `gran` bucket that has data
+    series_vol = defaultdict(lambda: {"pass": 0.0, "block": 0.0})
+    for bucket_start, decision, amount in vol_rows:
+        series_vol[bucket_start]["pass" if decision == "PASS" else "block"] += float(amount or 0.0)
+    series_lat = defaultdict(lambda: {"RULE": [0.0, 0], "AI": [0.0, 0]})
+    for bucket_start, source, count, total in lat_series_rows:
+        series_lat[bucket_start][source][0] += float(total or 0)
+        series_lat[bucket_start][source][1] += int(count or 0)
+
+    buckets = sorted(set(series_vol) | set(series_lat))
+    labels = [as_utc(b).strftime(_LABEL_FORMATS[gran]) for b in buckets]
+    chart_rule_lat, chart_ai_lat, chart_vol_pass, chart_vol_block = [], [], [], []
+    for b in buckets:
+        lats = series_lat[b]
+        chart_rule_lat.append(int(lats["RULE"][0] / lats["RULE"][1]) if lats["RULE"][1] else 0)
+        chart_ai_lat.append(int(lats["AI"][0] / lats["AI"][1]) if lats["AI"][1] else 0)
+        chart_vol_pass.append(series_vol[b]["pass"])
+        chart_vol_block.append(series_vol[b]["block"])
+
+    # Riskiest countries first
+    countries = sorted(country_risk.items(), key=lambda kv: (-kv[1], kv[0]))
+
+    charts = {
+        "countries": { "labels": [c for c, _ in countries], "data": [v for _, v in countries] },
+        "volume": { "labels": labels, "pass": chart_vol_pass, "block": chart_vol_block },
+        "latency": { "labels": labels, "rule": chart_rule_lat, "ai": chart_ai_lat },
+        "decisions_trend": decision_trend_data,
+        "source_dist": source_distribution_data
+    }
+
+    # Table: Recent Blocks (Only showing blocked/held for attention)
+    recent_blocks_display = []
+    for log in recent_txns:
+        recent_blocks_display.append({
+            "time_str": as_utc(log.decision_timestamp).strftime('%H:%M:%S'),
+            "user_code": log.user_code,
+            "currency": log.withdraw_currency or "CRYPTO",
+            "country": log.country or "Unknown",
+            "source_label": "AI Agent" if "AI" in (log.decision_source or "") else "Rule Engine",
+            "decision": log.decision
+        })
+
+    DASHBOARD_COMPUTE.labels("aggregate").observe(time.perf_counter() - t_queried)
+
+    return {
+        "kpi": kpi,
+        "charts": charts,
+        "ai_insight": ai_save_of_day,
+        "recent_blocks": recent_blocks_display,
+        "view": {
+            "window": label,
+            "granularity": gran,
+            "requested_granularity": granularity or "auto",
+            "start": start,
+            "end": end,
+            # Only the default view is pushed over SSE
+            "live": label == settings.DASHBOARD_DEFAULT_WINDOW and granularity in (None, "", "auto"),
+        },
+    }
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from typing import Optional, Set
+
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.serialization import dumps
+from app.models.risk_tables import RiskWithdrawDecision
+from app.services.dashboard_data import compute_dashboard
+
+logger = logging.getLogger("phalanx.dashboard_live")
+
+# Parts of compute_dashboard() that are pushed (the AI insight card stays page-only)
+_LIVE_KEYS = ("kpi", "charts", "recent_blocks")
+_PING = b": ping\n\n"
+
+
+def _sse(event: str, payload) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(payload) + b"\n\n"
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.DASHBOARD_SSE_QUEUE)
+
+
+class DashboardBroadcaster:
+    """
+    One producer computes the dashboard once per tick, diffs it against the
+    previous tick and encodes the delta once; every connected client just
+    receives the same bytes. A client whose queue is full (slow consumer)
+    has its backlog replaced by a single full snapshot, so it catches up
+    in one message instead of making the producer wait.
+    """
+
+    def __init__(self):
+        self.subscribers: Set[_Subscriber] = set()
+        self.state: Optional[dict] = None
+        self.last_log_id: Optional[int] = None
+        # log_ids already pushed inside the re-scanned overlap below last_log_id
+        self._sent: Set[int] = set()
+        self._snapshot_msg: Optional[bytes] = None
+        self._wakeup = asyncio.Event()
+
+    # ---------- clients ----------
+    def subscribe(self) -> _Subscriber:
+        sub = _Subscriber()
+        if self._snapshot_msg is not None:
+            sub.queue.put_nowait(self._snapshot_msg)
+        self.subscribers.add(sub)
+        self._wakeup.set()
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber):
+        self.subscribers.discard(sub)
+
+    def _publish(self, message: bytes):
+        for sub in self.subscribers:
+            try:
+                sub.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.queue.put_nowait(self._snapshot_msg)
+
+    # ---------- producer ----------
+    async def _new_decisions(self, db) -> list:
+        cols = (
+            RiskWithdrawDecision.log_id,
+            RiskWithdrawDecision.user_code,
+            RiskWithdrawDecision.txn_id,
+            RiskWithdrawDecision.decision_source,
+            RiskWithdrawDecision.decision,
+            RiskWithdrawDecision.decision_timestamp,
+        )
+        # Same overlap re-read as the decision projection: a decision that
+        # commits after a higher log_id was pushed still gets pushed once
+        overlap = settings.DECISION_PROJECTION_OVERLAP
+        if self.last_log_id is None:
+            res = await db.execute(select(RiskWithdrawDecision.log_id).order_by(RiskWithdrawDecision.log_id.desc()).limit(1))
+            self.last_log_id = res.scalar() or 0
+            res = await db.execute(
+                select(RiskWithdrawDecision.log_id).where(RiskWithdrawDecision.log_id > self.last_log_id - overlap)
+            )
+            self._sent = set(res.scalars())
+            return []
+        floor = self.last_log_id - overlap
+        self._sent.difference_update([i for i in self._sent if i <= floor])
+        res = await db.execute(
+            select(*cols)
+            .where(RiskWithdrawDecision.log_id > floor)
+            .order_by(RiskWithdrawDecision.log_id)
+            .limit(overlap + settings.DASHBOARD_SSE_MAX_NEW_DECISIONS)
+        )
+        rows = [dict(r._mapping) for r in res.all() if r.log_id not in self._sent]
+        rows = rows[:settings.DASHBOARD_SSE_MAX_NEW_DECISIONS]
+        if rows:
+            self.last_log_id = max(self.last_log_id, rows[-1]["log_id"])
+            self._sent.update(r["log_id"] for r in rows)
+        return rows
+
+    async def tick(self):
+        async with SessionLocal() as db:
+            data = await compute_dashboard(db)
+            new_decisions = await self._new_decisions(db)
+        fresh = {k: data[k] for k in _LIVE_KEYS}
+
+        cold = self.state is None
+        delta = {}
+        if not cold:
+            kpi = {k: v for k, v in fresh["kpi"].items() if self.state["kpi"].get(k) != v}
+            if kpi:
+                delta["kpi"] = kpi
+            charts = {k: v for k, v in fresh["charts"].items() if self.state["charts"].get(k) != v}
+            if charts:
+                delta["charts"] = charts
+            if fresh["recent_blocks"] != self.state["recent_blocks"]:
+                delta["recent_blocks"] = fresh["recent_blocks"]
+        if new_decisions:
+            delta["new_decisions"] = new_decisions
+
+        self.state = fresh
+        self._snapshot_msg = _sse("snapshot", fresh)
+        if cold:
+            # Clients that connected while nothing was computed get their initial snapshot
+            self._publish(self._snapshot_msg)
+        elif delta:
+            self._publish(_sse("delta", delta))
+        else:
+            self._publish(_PING)
+
+    async def run(self):
+        while True:
+            if not self.subscribers:
+                # Nobody watching: compute nothing until someone connects
+                self.state = None
+                self._snapshot_msg = None
+                self.last_log_id = None
+                self._sent.clear()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("dashboard live tick failed")
+            await asyncio.sleep(settings.DASHBOARD_SSE_TICK_S)
+
+
+broadcaster = DashboardBroadcaster()
+
+
+async def event_stream(request):
+    """Per-client generator for StreamingResponse: snapshot first, then deltas / pings."""
+    sub = broadcaster.subscribe()
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(sub.queue.get(), timeout=settings.DASHBOARD_SSE_TICK_S * 3)
+            except asyncio.TimeoutError:
+                message = _PING
+            if await request.is_disconnected():
+                break
+            yield message
+    finally:
+        broadcaster.unsubscribe(sub)
@@ -0,0 +1,397 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import and_, case, delete, func, literal, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.risk_tables import (
+    RiskAggDirty, RiskAiRejectAgg, RiskDecisionAgg, RiskLatencyAgg, RiskTxnLatestDecision, RiskWithdrawDecision,
+)
+
+logger = logging.getLogger("phalanx.aggregates")
+
+GRANULARITIES = {"5m": 300, "1h": 3600, "1d": 86400}
+FINEST = "5m"
+DIRTY_CHUNK = 1000
+
+_state = {"caught_up": False, "pruned_at": 0.0}
+
+
+def is_caught_up() -> bool:
+    return _state["caught_up"]
+
+
+# ================= BUCKET MATH =================
+def floor_ts(ts: datetime, seconds: int) -> datetime:
+    return datetime.fromtimestamp(int(ts.timestamp() // seconds * seconds), tz=timezone.utc)
+
+
+def ceil_ts(ts: datetime, seconds: int) -> datetime:
+    floored = floor_ts(ts, seconds)
+    return floored if floored == ts else floored + timedelta(seconds=seconds)
+
+
+def bucket_expr(col, seconds: int):
+    """SQL twin of floor_ts (UTC epoch buckets, so 1d == UTC days)."""
+    return func.to_timestamp(func.floor(func.extract("epoch", col) / seconds) * seconds)
+
+
+def _ranges(buckets: Iterable[datetime], seconds: int) -> List[Tuple[datetime, datetime]]:
+    """Merge bucket starts into contiguous [lo, hi) ranges."""
+    out = []
+    step = timedelta(seconds=seconds)
+    for b in sorted(set(buckets)):
+        if out and out[-1][1] == b:
+            out[-1] = (out[-1][0], b + step)
+        else:
+            out.append((b, b + step))
+    return out
+
+
+# Same normalisation the dashboard has always applied in Python
+def _source(col):
+    return case((col.contains("AI"), "AI"), else_="RULE")
+
+
+def _decision(col):
+    return func.upper(func.coalesce(func.nullif(col, ""), "UNKNOWN"))
+
+
+def _country(col):
+    return func.coalesce(func.nullif(col, ""), "Unknown")
+
+
+def _is_ai_reject(model):
+    return and_(model.decision_source.contains("AI"), model.decision == "REJECT", model.confidence > 0)
+
+
+def _top_first(model):
+    # Highest confidence, then the latest (log_id settles exact ties)
+    return (model.confidence.desc(), model.decision_timestamp.desc(), model.log_id.desc())
+
+
+# ================= DIRTY MARKING (called by the projection worker) =================
+async def mark_dirty(db, timestamps: Iterable[datetime]):
+    """Queue the 5m buckets of `timestamps` for recompute. Joins the caller's transaction."""
+    buckets = sorted({floor_ts(ts, GRANULARITIES[FINEST]) for ts in timestamps if ts is not None})
+    for i in range(0, len(buckets), DIRTY_CHUNK):
+        stmt = insert(RiskAggDirty).values([{"bucket_start": b} for b in buckets[i:i + DIRTY_CHUNK]])
+        # Re-marking bumps marked_at so a compactor mid-flight won't clear it
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RiskAggDirty.bucket_start], set_={"marked_at": func.clock_timestamp()}
+        )
+        await db.execute(stmt)
+
+
+# ================= REBUILD =================
+async def _rebuild_from_source(db, gran: str, lo: datetime, hi: datetime):
+    seconds = GRANULARITIES[gran]
+    P = RiskTxnLatestDecision
+    await db.execute(delete(RiskDecisionAgg).where(
+        RiskDecisionAgg.granularity == gran,
+        RiskDecisionAgg.bucket_start >= lo, RiskDecisionAgg.bucket_start < hi,
+    ))
+    rows = (
+        select(
+            bucket_expr(P.decision_timestamp, seconds).label("bucket_start"),
+            _source(P.decision_source).label("source"),
+            _decision(P.decision).label("decision"),
+            _country(P.country).label("country"),
+            func.coalesce(P.withdrawal_amount, 0).label("amount"),
+        )
+        .where(P.decision_timestamp >= lo, P.decision_timestamp < hi)
+        .subquery()
+    )
+    await _upsert_decisions(db, select(
+        literal(gran), rows.c.bucket_start, rows.c.source, rows.c.decision, rows.c.country,
+        func.count(), func.sum(rows.c.amount),
+    ).group_by(rows.c.bucket_start, rows.c.source, rows.c.decision, rows.c.country))
+
+    # Latency is measured over every raw decision, not just the latest per txn
+    R = RiskWithdrawDecision
+    await db.execute(delete(RiskLatencyAgg).where(
+        RiskLatencyAgg.granularity == gran,
+        RiskLatencyAgg.bucket_start >= lo, RiskLatencyAgg.bucket_start < hi,
+    ))
+    raw = (
+        select(
+            bucket_expr(R.decision_timestamp, seconds).label("bucket_start"),
+            _source(R.decision_source).label("source"),
+            func.coalesce(R.processing_time_ms, 0).label("latency"),
+        )
+        .where(R.decision_timestamp >= lo, R.decision_timestamp < hi)
+        .subquery()
+    )
+    await _upsert_latency(db, select(
+        literal(gran), raw.c.bucket_start, raw.c.source, func.count(), func.sum(raw.c.latency),
+    ).group_by(raw.c.bucket_start, raw.c.source))
+
+    # AI insight: also over the raw log (any AI reject, even if superseded)
+    await db.execute(delete(RiskAiRejectAgg).where(
+        RiskAiRejectAgg.granularity == gran,
+        RiskAiRejectAgg.bucket_start >= lo, RiskAiRejectAgg.bucket_start < hi,
+    ))
+    bucket = bucket_expr(R.decision_timestamp, seconds)
+    await _upsert_ai_reject(db, select(
+        literal(gran), bucket, R.log_id, R.confidence, R.decision_timestamp,
+    ).where(
+        R.decision_timestamp >= lo, R.decision_timestamp < hi, _is_ai_reject(R),
+    ).distinct(bucket).order_by(bucket, *_top_first(R)))
+
+
+async def _rollup(db, src: str, dst: str, lo: datetime, hi: datetime):
+    seconds = GRANULARITIES[dst]
+    for model, dims, measures, upsert in (
+        (RiskDecisionAgg, ("source", "decision", "country"), ("txn_count", "amount_sum"), _upsert_decisions),
+        (RiskLatencyAgg, ("source",), ("log_count", "latency_sum_ms"), _upsert_latency),
+    ):
+        await db.execute(delete(model).where(
+            model.granularity == dst, model.bucket_start >= lo, model.bucket_start < hi,
+        ))
+        rows = (
+            select(
+                bucket_expr(model.bucket_start, seconds).label("bucket_start"),
+                *(getattr(model, d) for d in dims),
+                *(getattr(model, m) for m in measures),
+            )
+            .where(model.granularity == src, model.bucket_start >= lo, model.bucket_start < hi)
+            .subquery()
+        )
+        await upsert(db, select(
+            literal(dst), rows.c.bucket_start, *(rows.c[d] for d in dims),
+            *(func.sum(rows.c[m]) for m in measures),
+        ).group_by(rows.c.bucket_start, *(rows.c[d] for d in dims)))
+
+    T = RiskAiRejectAgg
+    await db.execute(delete(T).where(T.granularity == dst, T.bucket_start >= lo, T.bucket_start < hi))
+    bucket = bucket_expr(T.bucket_start, seconds)
+    await _upsert_ai_reject(db, select(
+        literal(dst), bucket, T.log_id, T.confidence, T.decision_timestamp,
+    ).where(
+        T.granularity == src, T.bucket_start >= lo, T.bucket_start < hi,
+    ).distinct(bucket).order_by(bucket, *_top_first(T)))
+
+
+async def _upsert_decisions(db, sel):
+    cols = ["granularity", "bucket_start", "source", "decision", "country", "txn_count", "amount_sum"]
+    stmt = insert(RiskDecisionAgg).from_select(cols, sel)
+    # Two workers rebuilding the same bucket converge on the same values
+    stmt = stmt.on_conflict_do_update(
+        index_elements=cols[:5],
+        set_={"txn_count": stmt.excluded.txn_count, "amount_sum": stmt.excluded.amount_sum},
+    )
+    await db.execute(stmt)
+
+
+async def _upsert_latency(db, sel):
+    cols = ["granularity", "bucket_start", "source", "log_count", "latency_sum_ms"]
+    stmt = insert(RiskLatencyAgg).from_select(cols, sel)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=cols[:3],
+        set_={"log_count": stmt.excluded.log_count, "latency_sum_ms": stmt.excluded.latency_sum_ms},
+    )
+    await db.execute(stmt)
+
+
+async def _upsert_ai_reject(db, sel):
+    cols = ["granularity", "bucket_start", "log_id", "confidence", "decision_timestamp"]
+    stmt = insert(RiskAiRejectAgg).from_select(cols, sel)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=cols[:2],
+        set_={c: getattr(stmt.excluded, c) for c in cols[2:]},
+    )
+    await db.execute(stmt)
+
+
+async def compact_dirty(limit: int = None) -> int:
+    """Recompute up to `limit` dirty 5m buckets and their 1h / 1d parents. Returns buckets done."""
+    limit = limit or settings.DECISION_AGG_BATCH
+    async with SessionLocal() as db:
+        res = await db.execute(
+            select(RiskAggDirty.bucket_start, RiskAggDirty.marked_at)
+            .order_by(RiskAggDirty.bucket_start)
+            .limit(limit)
+        )
+        dirty = res.all()
+        if not dirty:
+            return 0
+
+        buckets = [r.bucket_start for r in dirty]
+        for lo, hi in _ranges(buckets, GRANULARITIES[FINEST]):
+            await _rebuild_from_source(db, FINEST, lo, hi)
+        # Hours whose 5m rows may already be pruned are rebuilt from the source instead
+        retained = floor_ts(_finest_cutoff(), GRANULARITIES["1h"]) + timedelta(hours=1)
+        hours = {floor_ts(b, GRANULARITIES["1h"]) for b in buckets}
+        for lo, hi in _ranges({h for h in hours if h >= retained}, GRANULARITIES["1h"]):
+            await _rollup(db, "5m", "1h", lo, hi)
+        for lo, hi in _ranges({h for h in hours if h < retained}, GRANULARITIES["1h"]):
+            await _rebuild_from_source(db, "1h", lo, hi)
+        days = {floor_ts(b, GRANULARITIES["1d"]) for b in buckets}
+        for lo, hi in _ranges(days, GRANULARITIES["1d"]):
+            await _rollup(db, "1h", "1d", lo, hi)
+
+        # Only clear marks we processed; a bucket re-marked meanwhile stays queued
+        for i in range(0, len(dirty), DIRTY_CHUNK):
+            chunk = dirty[i:i + DIRTY_CHUNK]
+            await db.execute(delete(RiskAggDirty).where(
+                tuple_(RiskAggDirty.bucket_start, RiskAggDirty.marked_at).in_([tuple(r) for r in chunk])
+            ))
+        await db.commit()
+        return len(dirty)
+
+
+async def backfill_if_empty():
+    """First run on an existing database: queue every 5m bucket present in the raw log."""
+    async with SessionLocal() as db:
+        has_rows = (await db.execute(select(RiskDecisionAgg.granularity).limit(1))).first()
+        if has_rows:
+            return
+        R = RiskWithdrawDecision
+        buckets = (
+            select(bucket_expr(R.decision_timestamp, GRANULARITIES[FINEST]).label("b"))
+            .where(R.decision_timestamp.isnot(None))
+            .distinct()
+            .subquery()
+        )
+        await db.execute(
+            insert(RiskAggDirty).from_select(["bucket_start"], select(buckets.c.b)).on_conflict_do_nothing()
+        )
+        await db.commit()
+        logger.info("queued dashboard aggregate backfill")
+
+
+def _finest_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=settings.DECISION_AGG_5M_RETENTION_DAYS)
+
+
+async def prune_finest():
+    """5m rows are only kept for DECISION_AGG_5M_RETENTION_DAYS; 1h / 1d are kept indefinitely."""
+    cutoff = _finest_cutoff()
+    async with SessionLocal() as db:
+        for model in (RiskDecisionAgg, RiskLatencyAgg, RiskAiRejectAgg):
+            await db.execute(delete(model).where(model.granularity == FINEST, model.bucket_start < cutoff))
+        await db.commit()
+
+
+async def run_aggregate_compactor():
+    try:
+        await backfill_if_empty()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("dashboard aggregate backfill failed")
+
+    while True:
+        done = 0
+        try:
+            done = await compact_dirty()
+            if done < settings.DECISION_AGG_BATCH:
+                _state["caught_up"] = True
+            if time.monotonic() - _state["pruned_at"] > 3600:
+                await prune_finest()
+                _state["pruned_at"] = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("dashboard aggregate compaction failed")
+
+        if done < settings.DECISION_AGG_BATCH:
+            await asyncio.sleep(settings.DECISION_AGG_INTERVAL_S)
+
+
+# ================= READS =================
+def window_segments(start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+    """
+    Covers [start, end) (5m-aligned) with the fewest buckets: whole days from
+    the 1d table, whole hours from 1h at the edges, 5m for what's left. A
+    90-day window costs about as much as a 1-day one.
+    """
+    order = ["1d", "1h", "5m"]
+    segments = []
+
+    def cover(a, b, level):
+        if a >= b:
+            return
+        gran = order[level]
+        if gran == FINEST:
+            segments.append((gran, a, b))
+            return
+        seconds = GRANULARITIES[gran]
+        inner_lo, inner_hi = ceil_ts(a, seconds), floor_ts(b, seconds)
+        if inner_lo < inner_hi:
+            cover(a, inner_lo, level + 1)
+            segments.append((gran, inner_lo, inner_hi))
+            cover(inner_hi, b, level + 1)
+        else:
+            cover(a, b, level + 1)
+
+    cover(start, end, 0)
+    return segments
+
+
+def _in_segments(model, segments):
+    return or_(*(
+        and_(model.granularity == g, model.bucket_start >= lo, model.bucket_start < hi)
+        for g, lo, hi in segments
+    ))
+
+
+async def decision_totals(db, start: datetime, end: datetime):
+    """(source, decision, country, txn_count, amount_sum) over the window."""
+    A = RiskDecisionAgg
+    res = await db.execute(
+        select(A.source, A.decision, A.country, func.sum(A.txn_count), func.sum(A.amount_sum))
+        .where(_in_segments(A, window_segments(start, end)))
+        .group_by(A.source, A.decision, A.country)
+    )
+    return res.all()
+
+
+async def top_ai_reject(db, start: datetime, end: datetime):
+    """(log_id, decision_timestamp) of the window's highest-confidence AI reject, or None."""
+    T = RiskAiRejectAgg
+    res = await db.execute(
+        select(T.log_id, T.decision_timestamp)
+        .where(_in_segments(T, window_segments(start, end)))
+        .order_by(*_top_first(T))
+        .limit(1)
+    )
+    return res.first()
+
+
+async def latency_totals(db, start: datetime, end: datetime):
+    """(source, log_count, latency_sum_ms) over the window."""
+    L = RiskLatencyAgg
+    res = await db.execute(
+        select(L.source, func.sum(L.log_count), func.sum(L.latency_sum_ms))
+        .where(_in_segments(L, window_segments(start, end)))
+        .group_by(L.source)
+    )
+    return res.all()
+
+
+async def decision_series(db, granularity: str, start: datetime, end: datetime):
+    """(bucket_start, decision, amount_sum) per bucket of `granularity`."""
+    A = RiskDecisionAgg
+    res = await db.execute(
+        select(A.bucket_start, A.decision, func.sum(A.amount_sum))
+        .where(A.granularity == granularity, A.bucket_start >= start, A.bucket_start < end)
+        .group_by(A.bucket_start, A.decision)
+    )
+    return res.all()
+
+
+async def latency_series(db, granularity: str, start: datetime, end: datetime):
+    """(bucket_start, source, log_count, latency_sum_ms) per bucket of `granularity`."""
+    L = RiskLatencyAgg
+    res = await db.execute(
+        select(L.bucket_start, L.source, L.log_count, L.latency_sum_ms)
+        .where(L.granularity == granularity, L.bucket_start >= start, L.bucket_start < end)
+    )
+    return res.all()
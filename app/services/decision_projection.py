@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.risk_tables import RiskWithdrawDecision, RiskTxnLatestDecision, ProjectionWatermark
+from app.services.country_enrichment import resolve_countries
+from app.services.decision_aggregates import mark_dirty
+
+logger = logging.getLogger("phalanx.projection")
+
+WATERMARK_NAME = "risk_txn_latest_decision"
+UPSERT_CHUNK = 1000
+
+_UPSERT_COLUMNS = (
+    "log_id", "user_code", "decision_source", "decision", "confidence",
+    "decision_timestamp", "withdrawal_amount", "withdraw_currency", "country",
+)
+
+# Flipped once the worker has caught up with the decision log (readiness uses it)
+_state = {"caught_up": False, "countries_at": 0.0}
+# log_ids this process applied inside the re-scanned overlap below the watermark
+_applied = set()
+
+
+def is_caught_up() -> bool:
+    return _state["caught_up"]
+
+
+def extract_snapshot_fields(snapshot):
+    """(withdrawal_amount, withdraw_currency) from a features_snapshot (dict or JSON string)."""
+    try:
+        data = json.loads(snapshot) if isinstance(snapshot, str) else (snapshot or {})
+        amount = float(data.get("withdrawal_amount", 0.0) or 0.0)
+        currency = (data.get("withdraw_currency") or "CRYPTO").upper()
+        return amount, currency
+    except Exception:
+        return 0.0, "CRYPTO"
+
+
+async def refresh_latest_decisions(batch_size: int = None) -> int:
+    """
+    Applies the next batch of risk_withdraw_decision rows (by log_id) to the
+    projection. Returns the number of new raw rows consumed.
+
+    log_ids are handed out before commit, so a row can become visible after
+    a higher log_id was already read. Each pass therefore re-reads the last
+    DECISION_PROJECTION_OVERLAP ids below the watermark and applies the rows
+    it hasn't seen yet.
+
+    Safe to run from several workers at once: the upsert only overwrites a
+    txn when the incoming decision is at least as new, and the watermark only
+    moves forward. Re-applying a row (another worker, or a restart) is a no-op.
+    """
+    batch_size = batch_size or settings.DECISION_PROJECTION_BATCH
+    overlap = settings.DECISION_PROJECTION_OVERLAP
+
+    async with SessionLocal() as db:
+        wm_res = await db.execute(
+            select(ProjectionWatermark.last_log_id).where(ProjectionWatermark.name == WATERMARK_NAME)
+        )
+        watermark = wm_res.scalar() or 0
+        floor = watermark - overlap
+        _applied.difference_update([i for i in _applied if i <= floor])
+
+        res = await db.execute(
+            select(
+                RiskWithdrawDecision.log_id,
+                RiskWithdrawDecision.txn_id,
+                RiskWithdrawDecision.user_code,
+                RiskWithdrawDecision.decision_source,
+                RiskWithdrawDecision.decision,
+                RiskWithdrawDecision.confidence,
+                RiskWithdrawDecision.decision_timestamp,
+                RiskWithdrawDecision.features_snapshot,
+            )
+            .where(RiskWithdrawDecision.log_id > floor)
+            .order_by(RiskWithdrawDecision.log_id)
+            .limit(overlap + batch_size)
+        )
+        rows = [r for r in res.all() if r.log_id not in _applied]
+        fresh = sum(1 for r in rows if r.log_id > watermark)
+        if not rows:
+            return 0
+
+        # Last write wins inside the batch too (timestamp, then log_id)
+        latest = {}
+        for row in rows:
+            if not row.txn_id or row.decision_timestamp is None:
+                continue
+            curr = latest.get(row.txn_id)
+            if curr is None or (row.decision_timestamp, row.log_id) > (curr.decision_timestamp, curr.log_id):
+                latest[row.txn_id] = row
+
+        countries = await resolve_countries(db, latest.keys())
+
+        # Dashboard aggregates: every raw row's bucket (latency), plus the bucket
+        # each txn is leaving if its latest decision moves
+        touched = [row.decision_timestamp for row in rows]
+        txn_ids = list(latest.keys())
+        for i in range(0, len(txn_ids), UPSERT_CHUNK):
+            prev = await db.execute(
+                select(RiskTxnLatestDecision.decision_timestamp)
+                .where(RiskTxnLatestDecision.txn_id.in_(txn_ids[i:i + UPSERT_CHUNK]))
+            )
+            touched.extend(prev.scalars().all())
+        await mark_dirty(db, touched)
+
+        values = []
+        for txn_id, row in latest.items():
+            amount, currency = extract_snapshot_fields(row.features_snapshot)
+            values.append({
+                "txn_id": txn_id,
+                "log_id": row.log_id,
+                "user_code": row.user_code,
+                "decision_source": row.decision_source,
+                "decision": row.decision,
+                "confidence": row.confidence,
+                "decision_timestamp": row.decision_timestamp,
+                "withdrawal_amount": amount,
+                "withdraw_currency": currency,
+                "country": countries.get(str(txn_id), "Unknown"),
+            })
+
+        # Chunked to stay under the driver's 32k bind-parameter limit
+        for i in range(0, len(values), UPSERT_CHUNK):
+            stmt = insert(RiskTxnLatestDecision).values(values[i:i + UPSERT_CHUNK])
+            excluded = stmt.excluded
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[RiskTxnLatestDecision.txn_id],
+                set_={c: getattr(excluded, c) for c in _UPSERT_COLUMNS},
+                # Same order as the batch: a late lower log_id never overwrites a tie
+                where=tuple_(RiskTxnLatestDecision.decision_timestamp, RiskTxnLatestDecision.log_id)
+                <= tuple_(excluded.decision_timestamp, excluded.log_id),
+            )
+            await db.execute(stmt)
+
+        new_watermark = rows[-1].log_id
+        wm_stmt = insert(ProjectionWatermark).values(name=WATERMARK_NAME, last_log_id=new_watermark)
+        wm_stmt = wm_stmt.on_conflict_do_update(
+            index_elements=[ProjectionWatermark.name],
+            set_={
+                "last_log_id": func.greatest(ProjectionWatermark.last_log_id, wm_stmt.excluded.last_log_id),
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(wm_stmt)
+        await db.commit()
+        _applied.update(r.log_id for r in rows)
+        return fresh
+
+
+async def reresolve_unknown_countries(limit: int = 1000) -> int:
+    """
+    Recent projection rows stored as "Unknown" because user_device lagged:
+    look them up again, and re-bucket the dashboard aggregates they move.
+    """
+    since = datetime.now(timezone.utc) - timedelta(hours=settings.DECISION_PROJECTION_COUNTRY_RETRY_HOURS)
+    P = RiskTxnLatestDecision
+    async with SessionLocal() as db:
+        res = await db.execute(
+            select(P.txn_id, P.decision_timestamp)
+            .where(P.country == "Unknown", P.decision_timestamp >= since)
+            .order_by(P.decision_timestamp.desc())
+            .limit(limit)
+        )
+        pending = {txn_id: ts for txn_id, ts in res}
+        countries = await resolve_countries(db, pending.keys())
+        if not countries:
+            await db.rollback()
+            return 0
+        by_country = {}
+        for txn_id, country in countries.items():
+            by_country.setdefault(country, []).append(txn_id)
+        for country, txn_ids in by_country.items():
+            await db.execute(
+                update(P).where(P.txn_id.in_(txn_ids), P.country == "Unknown").values(country=country)
+            )
+        await mark_dirty(db, [pending[t] for t in countries])
+        await db.commit()
+        return len(countries)
+
+
+async def run_projection_worker():
+    """Background loop: drain the backlog in batches, then poll every interval."""
+    while True:
+        consumed = 0
+        try:
+            consumed = await refresh_latest_decisions()
+            if consumed < settings.DECISION_PROJECTION_BATCH:
+                _state["caught_up"] = True
+                if time.monotonic() - _state["countries_at"] > settings.DECISION_PROJECTION_COUNTRY_RETRY_S:
+                    _state["countries_at"] = time.monotonic()
+                    await reresolve_unknown_countries()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("latest-decision projection refresh failed")
+
+        if consumed < settings.DECISION_PROJECTION_BATCH:
+            await asyncio.sleep(settings.DECISION_PROJECTION_INTERVAL_S)
@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Integer, Numeric
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+# Parquet is optional: CSV / NDJSON work without pyarrow installed
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _json_default(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    return str(v)
+
+
+def _cell(v):
+    """Flat (CSV) representation: JSONB as a JSON string, datetimes as ISO-8601."""
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, default=_json_default)
+    return v
+
+
+def _arrow_type(column):
+    t = column.type
+    if isinstance(t, Boolean):
+        return pa.bool_()
+    if isinstance(t, (Integer, BigInteger)):
+        return pa.int64()
+    if isinstance(t, (Float, Numeric)):
+        return pa.float64()
+    if isinstance(t, DateTime):
+        return pa.timestamp("us", tz="UTC") if t.timezone else pa.timestamp("us")
+    return pa.string()  # String / Text / JSONB (serialized)
+
+
+# ================= WRITERS (one chunk of bytes per DB partition) =================
+async def _csv_chunks(partitions, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([c.name for c in columns])
+    async for rows in partitions:
+        for row in rows:
+            writer.writerow([_cell(v) for v in row])
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+async def _ndjson_chunks(partitions, columns):
+    names = [c.name for c in columns]
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=_json_default) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object: the Parquet writer appends, we drain after each row group."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+async def _parquet_chunks(partitions, columns):
+    schema = pa.schema([(c.name, _arrow_type(c)) for c in columns])
+    json_cols = {i for i, c in enumerate(columns) if isinstance(c.type, JSONB)}
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in partitions:
+            cols = list(zip(*rows))
+            arrays = []
+            for i, field in enumerate(schema):
+                values = cols[i]
+                if i in json_cols:
+                    values = [None if v is None else json.dumps(v, default=_json_default) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            # One row group per DB partition keeps memory bounded by EXPORT_BATCH
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+_WRITERS = {"csv": _csv_chunks, "ndjson": _ndjson_chunks, "parquet": _parquet_chunks}
+
+
+async def _stream(stmt, columns, fmt):
+    # Own session: FastAPI tears request dependencies down before the body streams
+    async with SessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH))
+        async for chunk in _WRITERS[fmt](result.partitions(), columns):
+            yield chunk
+
+
+def export_response(stmt, columns, fmt: str, basename: str) -> StreamingResponse:
+    """
+    Streams `stmt` (a select over `columns`) through a server-side cursor in
+    EXPORT_BATCH-row partitions, so memory stays flat regardless of size.
+    """
+    fmt = (fmt or "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}' (csv, ndjson, parquet)")
+    if fmt == "parquet" and pa is None:
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow on the server")
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return StreamingResponse(
+        _stream(stmt, columns, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{basename}_{stamp}.{fmt}"'},
+    )
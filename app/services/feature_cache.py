@@ -0,0 +1,278 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Boolean, DateTime, Float, Integer, Numeric, tuple_
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.risk_tables import RiskFeature
+
+logger = logging.getLogger("phalanx.feature_cache")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Storage kinds: numbers -> float64 (NaN = NULL), bools -> int8 (-1 = NULL),
+# timestamps -> datetime64[us] UTC (NaT = NULL), everything else -> object.
+_NUM, _INT, _BOOL, _TS, _OBJ = "num", "int", "bool", "ts", "obj"
+_EST_BYTES = {_NUM: 8, _INT: 8, _BOOL: 1, _TS: 8, _OBJ: 72}  # object: pointer + small str
+# A compaction leaves the cache at most this full, so the reindex after it
+# is paid once per (1 - LOW_WATER) * capacity inserts, not on every batch
+LOW_WATER = 0.75
+LOOKUP_CHUNK = 1000
+
+
+def _kind(column) -> str:
+    t = column.type
+    if isinstance(t, Boolean):
+        return _BOOL
+    if isinstance(t, Integer):
+        return _INT
+    if isinstance(t, (Float, Numeric)):
+        return _NUM
+    if isinstance(t, DateTime):
+        return _TS
+    return _OBJ
+
+
+def _empty(kind: str, n: int):
+    if kind in (_NUM, _INT):
+        return np.full(n, np.nan, dtype=np.float64)
+    if kind == _BOOL:
+        return np.full(n, -1, dtype=np.int8)
+    if kind == _TS:
+        return np.full(n, np.datetime64("NaT"), dtype="datetime64[us]")
+    return np.empty(n, dtype=object)
+
+
+def _store_value(kind, v):
+    if v is None:
+        return _empty(kind, 1)[0]
+    if kind == _BOOL:
+        return 1 if v else 0
+    if kind == _TS:
+        return np.datetime64(v.astimezone(timezone.utc).replace(tzinfo=None), "us")
+    return v
+
+
+def _load_value(kind, v):
+    if kind in (_NUM, _INT):
+        if np.isnan(v):
+            return None
+        return int(v) if kind == _INT else float(v)
+    if kind == _BOOL:
+        return None if v < 0 else bool(v)
+    if kind == _TS:
+        if np.isnat(v):
+            return None
+        return _EPOCH + timedelta(microseconds=int(v.astype("int64")))
+    return v
+
+
+class RecentFeatureCache:
+    """
+    Last FEATURE_CACHE_HOURS of rt.risk_features in column arrays, with a
+    (user_code, txn_id) -> row index and a user_code -> rows index.
+    Capacity is derived from FEATURE_CACHE_MAX_MB; when full, rows outside
+    the window and then the oldest rows are compacted away (down to
+    LOW_WATER of capacity). Once in-window rows have been dropped, reads
+    reaching back past them are not served from here (see `covers`).
+    """
+
+    def __init__(self, window_hours: float, max_mb: float):
+        self.window = timedelta(hours=window_hours)
+        self.columns = [(c.name, c.key, _kind(c)) for c in RiskFeature.__table__.columns]
+        self.kinds = {name: kind for name, _, kind in self.columns}
+        row_bytes = sum(_EST_BYTES[k] for _, _, k in self.columns) + 120  # + index entries
+        self.capacity = max(1000, int(max_mb * 2 ** 20 / row_bytes))
+
+        self.size = 0
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.index: Dict[Tuple[str, str], int] = {}
+        self.by_user: Dict[str, List[int]] = {}
+        # Keyset watermark: (update_time, user_code, txn_id) of the last row applied
+        self.watermark: Optional[tuple] = None
+        # Newest update_time among in-window rows dropped for capacity
+        self.evicted_through: Optional[np.datetime64] = None
+        self.warm = False
+        self._allocate(min(self.capacity, 4096))
+
+    # ---------- storage ----------
+    def _allocate(self, n: int):
+        fresh = {name: _empty(kind, n) for name, _, kind in self.columns}
+        for name, arr in self.arrays.items():
+            fresh[name][:self.size] = arr[:self.size]
+        self.arrays = fresh
+
+    def _reindex(self):
+        self.index = {}
+        self.by_user = {}
+        users, txns = self.arrays["user_code"], self.arrays["txn_id"]
+        for i in range(self.size):
+            self.index[(users[i], txns[i])] = i
+            self.by_user.setdefault(users[i], []).append(i)
+
+    def _compact(self, now: datetime, needed: int):
+        """
+        Drop rows outside the window, then the oldest, to make room for
+        `needed` rows and bring the cache down to LOW_WATER of capacity.
+        """
+        ts = self.arrays["update_time"][:self.size]
+        cutoff = np.datetime64((now - self.window).replace(tzinfo=None), "us")
+        keep = np.nonzero(ts >= cutoff)[0]
+
+        room = max(0, min(int(self.capacity * LOW_WATER), self.capacity - needed))
+        if len(keep) > room:
+            order = np.argsort(ts[keep], kind="stable")
+            dropped = keep[order[:len(keep) - room]]
+            newest = ts[dropped].max()
+            if self.evicted_through is None or newest > self.evicted_through:
+                self.evicted_through = newest
+            keep = np.sort(keep[order[len(keep) - room:]])
+
+        for name in self.arrays:
+            arr = self.arrays[name]
+            kept = arr[keep]
+            arr[:len(kept)] = kept
+            arr[len(kept):self.size] = _empty(self.kinds[name], self.size - len(kept))
+        self.size = len(keep)
+        self._reindex()
+
+    def upsert(self, records, now: Optional[datetime] = None):
+        now = now or datetime.now(timezone.utc)
+        new_keys = {(r.user_code, r.txn_id) for r in records} - self.index.keys()
+        if self.size + len(new_keys) > len(self.arrays["user_code"]):
+            if self.size + len(new_keys) > self.capacity:
+                self._compact(now, len(new_keys))
+            target = min(self.capacity, max(self.size + len(new_keys), 2 * len(self.arrays["user_code"])))
+            if target > len(self.arrays["user_code"]):
+                self._allocate(target)
+
+        for r in records:
+            key = (r.user_code, r.txn_id)
+            i = self.index.get(key)
+            if i is None:
+                if self.size >= len(self.arrays["user_code"]):
+                    break  # over budget even after compaction; newest rows win next round
+                i = self.size
+                self.size += 1
+                self.index[key] = i
+                self.by_user.setdefault(r.user_code, []).append(i)
+            for name, attr, kind in self.columns:
+                self.arrays[name][i] = _store_value(kind, getattr(r, attr))
+            if r.update_time is not None:
+                wm = (r.update_time, r.user_code, r.txn_id)
+                if self.watermark is None or wm > self.watermark:
+                    self.watermark = wm
+
+    # ---------- reads ----------
+    def _row(self, i: int) -> dict:
+        return {name: _load_value(kind, self.arrays[name][i]) for name, _, kind in self.columns}
+
+    def get(self, user_code: str, txn_id: str) -> Optional[dict]:
+        i = self.index.get((user_code, txn_id))
+        return self._row(i) if i is not None else None
+
+    def user_history(self, user_code: str, since: datetime, limit: int) -> List[dict]:
+        rows = self.by_user.get(user_code)
+        if not rows:
+            return []
+        idx = np.asarray(rows)
+        ts = self.arrays["update_time"][idx]
+        cutoff = np.datetime64(since.astimezone(timezone.utc).replace(tzinfo=None), "us")
+        idx, ts = idx[ts >= cutoff], ts[ts >= cutoff]
+        order = np.argsort(ts)[::-1][:limit]
+        return [self._row(int(i)) for i in idx[order]]
+
+    def holds(self, user_code: str, txn_id: str, update_time: datetime) -> bool:
+        """True if the row is cached at this version, or was dropped for capacity on purpose."""
+        ts = _store_value(_TS, update_time)
+        if self.evicted_through is not None and ts <= self.evicted_through:
+            return True
+        i = self.index.get((user_code, txn_id))
+        return i is not None and self.arrays["update_time"][i] == ts
+
+    def covers(self, since: datetime) -> bool:
+        """True if the cache holds everything newer than `since`."""
+        if not self.warm or since < datetime.now(timezone.utc) - self.window:
+            return False
+        if self.evicted_through is not None:
+            return np.datetime64(since.astimezone(timezone.utc).replace(tzinfo=None), "us") > self.evicted_through
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "rows": self.size,
+            "capacity": self.capacity,
+            "users": len(self.by_user),
+            "watermark": self.watermark[0].isoformat() if self.watermark else None,
+            "evicted_through": _load_value(_TS, self.evicted_through) if self.evicted_through is not None else None,
+            "warm": self.warm,
+        }
+
+
+cache = RecentFeatureCache(settings.FEATURE_CACHE_HOURS, settings.FEATURE_CACHE_MAX_MB)
+
+
+def is_warm() -> bool:
+    return cache.warm
+
+
+async def _late_rows(db, key) -> list:
+    """
+    Rows behind the watermark the keyset read skipped: committed late with
+    an older update_time. Only keys are re-read over FEATURE_CACHE_OVERLAP_S;
+    full rows are fetched for the ones the cache doesn't hold.
+    """
+    lo = cache.watermark[0] - timedelta(seconds=settings.FEATURE_CACHE_OVERLAP_S)
+    res = await db.execute(
+        select(*key).where(RiskFeature.update_time > lo, tuple_(*key) <= tuple_(*cache.watermark))
+    )
+    missing = [(u, t) for ts, u, t in res if not cache.holds(u, t, ts)]
+    records = []
+    for i in range(0, len(missing), LOOKUP_CHUNK):
+        res = await db.execute(
+            select(RiskFeature).where(
+                tuple_(RiskFeature.user_code, RiskFeature.txn_id).in_(missing[i:i + LOOKUP_CHUNK])
+            )
+        )
+        records.extend(res.scalars().all())
+    return records
+
+
+async def refresh_feature_cache(batch_size: int = None) -> int:
+    """Applies the next batch of rows after the keyset watermark, plus late rows behind it; returns rows read."""
+    batch_size = batch_size or settings.FEATURE_CACHE_BATCH
+    key = (RiskFeature.update_time, RiskFeature.user_code, RiskFeature.txn_id)
+    query = select(RiskFeature)
+    late = []
+    if cache.watermark is None:
+        query = query.where(RiskFeature.update_time >= datetime.now(timezone.utc) - cache.window)
+    else:
+        query = query.where(tuple_(*key) > tuple_(*cache.watermark))
+    async with SessionLocal() as db:
+        res = await db.execute(query.order_by(*key).limit(batch_size))
+        records = res.scalars().all()
+        if cache.watermark is not None:
+            late = await _late_rows(db, key)
+    cache.upsert(late + records)
+    return len(records) + len(late)
+
+
+async def run_feature_cache_worker():
+    while True:
+        consumed = 0
+        try:
+            consumed = await refresh_feature_cache()
+            if consumed < settings.FEATURE_CACHE_BATCH:
+                cache.warm = True
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("recent feature cache refresh failed")
+
+        if consumed < settings.FEATURE_CACHE_BATCH:
+            await asyncio.sleep(settings.FEATURE_CACHE_INTERVAL_S)
@@ -0,0 +1,315 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Boolean, Integer, and_, delete, exists, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.result_cache import cached
+from app.models.risk_tables import (
+    RiskFeature, RiskFeatureProfile, RiskFeatureProfiled, RiskFeatureProfileWatermark,
+)
+from app.services.decision_aggregates import ceil_ts, floor_ts, window_segments
+from app.services.sketches import THRESHOLD_OPS, QuantileSketch
+
+logger = logging.getLogger("phalanx.feature_profiles")
+
+WATERMARK_NAME = "risk_feature_profile"
+GRANULARITIES = {"1h": 3600, "1d": 86400}
+DEFAULT_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+UPSERT_CHUNK = 500
+PRUNE_EVERY_S = 3600
+
+
+def _profiled_columns() -> Dict[str, str]:
+    """Numeric and boolean feature columns -> "number" | "integer" | "boolean"."""
+    kinds = {}
+    for col in RiskFeature.__table__.columns:
+        if col.primary_key:
+            continue
+        if isinstance(col.type, Boolean):
+            kinds[col.key] = "boolean"
+        elif isinstance(col.type, Integer):
+            kinds[col.key] = "integer"
+        elif getattr(col.type, "python_type", None) is float:
+            kinds[col.key] = "number"
+    return kinds
+
+
+COLUMNS = _profiled_columns()
+_state = {"caught_up": False, "watermark": None, "pruned_at": float("-inf")}
+
+
+def status() -> dict:
+    watermark = _state["watermark"]
+    return {"caught_up": _state["caught_up"], "watermark": watermark.isoformat() if watermark else None}
+
+
+def _new_sketch(column: str) -> QuantileSketch:
+    return QuantileSketch(settings.FEATURE_PROFILE_ACCURACY, integers=COLUMNS[column] != "number")
+
+
+# ================= INCREMENTAL BUILD =================
+# Pure-Python sketch work, run in a thread so a batch doesn't stall the loop
+def _fold(rows) -> Dict[Tuple[str, str, datetime], list]:
+    """(granularity, column, bucket) -> [partial sketch, nulls] for one batch."""
+    partials: Dict[Tuple[str, str, datetime], list] = {}
+    for row in rows:
+        buckets = [(g, floor_ts(row.update_time, s)) for g, s in GRANULARITIES.items()]
+        for column in COLUMNS:
+            value = getattr(row, column)
+            for gran, bucket in buckets:
+                part = partials.get((gran, column, bucket))
+                if part is None:
+                    part = partials[(gran, column, bucket)] = [_new_sketch(column), 0]
+                if value is None:
+                    part[1] += 1
+                else:
+                    part[0].add(value)
+    return partials
+
+
+def _merge(partials, existing) -> List[dict]:
+    """Upsert rows: each partial merged into the stored sketch of its bucket, if any."""
+    values = []
+    for (gran, column, bucket), (sketch, nulls) in partials.items():
+        prev = existing.get((gran, column, bucket))
+        if prev is not None:
+            merged = QuantileSketch.from_dict(prev[0])
+            merged.merge(sketch)
+            sketch, nulls = merged, nulls + prev[1]
+        values.append({
+            "granularity": gran, "column_name": column, "bucket_start": bucket,
+            "nulls": nulls, "sketch": sketch.to_dict(),
+        })
+    return values
+
+
+async def refresh_profiles(batch_size: int = None) -> int:
+    """
+    Folds the next batch of risk_features rows (keyset on update_time) into
+    the hourly and daily sketches of every profiled column. Returns rows read.
+
+    The watermark row is locked for the whole transaction, so workers take
+    turns. Counts are per transaction: each (user_code, txn_id) is claimed in
+    risk_feature_profiled the first time it is folded, and a row re-written
+    later with a newer update_time is skipped, so the first write is what the
+    profile holds. Rows committed late with an update_time below the
+    watermark are picked up by re-reading FEATURE_PROFILE_OVERLAP_S behind it.
+    """
+    batch_size = batch_size or settings.FEATURE_PROFILE_BATCH
+    key = (RiskFeature.update_time, RiskFeature.user_code, RiskFeature.txn_id)
+    W = RiskFeatureProfileWatermark
+    S = RiskFeatureProfiled
+
+    async with SessionLocal() as db:
+        await db.execute(insert(W).values(name=WATERMARK_NAME).on_conflict_do_nothing())
+        wm = (await db.execute(select(W).where(W.name == WATERMARK_NAME).with_for_update())).scalar_one()
+
+        query = select(*key, *(getattr(RiskFeature, c) for c in COLUMNS))
+        late = []
+        if wm.update_time is None:
+            since = datetime.now(timezone.utc) - timedelta(days=settings.FEATURE_PROFILE_BACKFILL_DAYS)
+            rows = (await db.execute(
+                query.where(RiskFeature.update_time >= since).order_by(*key).limit(batch_size)
+            )).all()
+        else:
+            position = tuple_(wm.update_time, wm.user_code, wm.txn_id)
+            rows = (await db.execute(query.where(tuple_(*key) > position).order_by(*key).limit(batch_size))).all()
+            not_profiled = ~exists().where(S.user_code == RiskFeature.user_code, S.txn_id == RiskFeature.txn_id)
+            late = (await db.execute(
+                query.where(
+                    RiskFeature.update_time > wm.update_time - timedelta(seconds=settings.FEATURE_PROFILE_OVERLAP_S),
+                    tuple_(*key) <= position,
+                    not_profiled,
+                ).order_by(*key).limit(batch_size)
+            )).all()
+        _state["watermark"] = wm.update_time
+        if not rows and not late:
+            await db.rollback()
+            return 0
+
+        # Claim first: only transactions never folded before are counted
+        claimed = set()
+        candidates = late + rows
+        for i in range(0, len(candidates), UPSERT_CHUNK):
+            res = await db.execute(
+                insert(S)
+                .values([
+                    {"user_code": r.user_code, "txn_id": r.txn_id, "update_time": r.update_time}
+                    for r in candidates[i:i + UPSERT_CHUNK]
+                ])
+                .on_conflict_do_nothing()
+                .returning(S.user_code, S.txn_id)
+            )
+            claimed.update((r.user_code, r.txn_id) for r in res)
+        fold = [r for r in candidates if (r.user_code, r.txn_id) in claimed]
+
+        partials = await asyncio.to_thread(_fold, fold)
+
+        P = RiskFeatureProfile
+        keys = list(partials)
+        existing = {}
+        for i in range(0, len(keys), UPSERT_CHUNK):
+            res = await db.execute(
+                select(P.granularity, P.column_name, P.bucket_start, P.sketch, P.nulls)
+                .where(tuple_(P.granularity, P.column_name, P.bucket_start).in_(keys[i:i + UPSERT_CHUNK]))
+            )
+            for r in res:
+                existing[(r.granularity, r.column_name, r.bucket_start)] = (r.sketch, r.nulls)
+
+        values = await asyncio.to_thread(_merge, partials, existing)
+        for i in range(0, len(values), UPSERT_CHUNK):
+            stmt = insert(P).values(values[i:i + UPSERT_CHUNK])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[P.granularity, P.column_name, P.bucket_start],
+                set_={"nulls": stmt.excluded.nulls, "sketch": stmt.excluded.sketch},
+            )
+            await db.execute(stmt)
+
+        if rows:
+            last = rows[-1]
+            wm.update_time, wm.user_code, wm.txn_id = last.update_time, last.user_code, last.txn_id
+        wm.updated_at = datetime.now(timezone.utc)
+        watermark = wm.update_time
+        await db.commit()
+        _state["watermark"] = watermark
+        return len(rows) + len(late)
+
+
+async def prune_profiled() -> int:
+    """Forgets claims past the backfill window; a transaction re-written after that counts again."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.FEATURE_PROFILE_BACKFILL_DAYS)
+    async with SessionLocal() as db:
+        res = await db.execute(delete(RiskFeatureProfiled).where(RiskFeatureProfiled.update_time < cutoff))
+        await db.commit()
+        return res.rowcount
+
+
+async def run_profile_worker():
+    """Background loop: drain the backlog in batches, then poll every interval."""
+    while True:
+        consumed = 0
+        try:
+            consumed = await refresh_profiles()
+            if consumed < settings.FEATURE_PROFILE_BATCH:
+                _state["caught_up"] = True
+                if time.monotonic() - _state["pruned_at"] >= PRUNE_EVERY_S:
+                    _state["pruned_at"] = time.monotonic()
+                    pruned = await prune_profiled()
+                    if pruned:
+                        logger.info("forgot %d profiled transactions past the backfill window", pruned)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("feature profile refresh failed")
+
+        if consumed < settings.FEATURE_PROFILE_BATCH:
+            await asyncio.sleep(settings.FEATURE_PROFILE_INTERVAL_S)
+
+
+# ================= READ (merge on demand) =================
+def profile_window(window: timedelta, now: datetime = None) -> Tuple[datetime, datetime]:
+    """[start, end) on hour boundaries, ending with the current (partial) hour."""
+    now = now or datetime.now(timezone.utc)
+    end = ceil_ts(now, GRANULARITIES["1h"])
+    if end == now:
+        end += timedelta(hours=1)
+    return floor_ts(end - window, GRANULARITIES["1h"]), end
+
+
+async def _merged(db, columns, start: datetime, end: datetime) -> Dict[str, Tuple[QuantileSketch, int]]:
+    """column -> (sketch, nulls) over [start, end), merged from day and hour rows in one query."""
+    P = RiskFeatureProfile
+    segments = or_(*(
+        and_(P.granularity == gran, P.bucket_start >= lo, P.bucket_start < hi)
+        for gran, lo, hi in window_segments(start, end)
+    ))
+    merged = {c: (_new_sketch(c), [0]) for c in columns}
+    res = await db.execute(
+        select(P.column_name, P.sketch, P.nulls).where(P.column_name.in_(list(columns)), segments)
+    )
+    for column, part, nulls in res:
+        sketch, null_count = merged[column]
+        sketch.merge(QuantileSketch.from_dict(part))
+        null_count[0] += nulls
+    return {c: (sketch, nulls[0]) for c, (sketch, nulls) in merged.items()}
+
+
+@cached("feature_profile", ttl_s=settings.FEATURE_PROFILE_CACHE_TTL_S)
+async def merged_profile(db, column: str, start: datetime, end: datetime) -> Tuple[QuantileSketch, int]:
+    """One sketch (+ null count) for `column` over [start, end)."""
+    return (await _merged(db, [column], start, end))[column]
+
+
+def _summary(column: str, sketch: QuantileSketch, nulls: int, quantiles) -> dict:
+    rows = sketch.count + nulls
+    out = {
+        "column": column,
+        "kind": COLUMNS[column],
+        "rows": rows,
+        "nulls": nulls,
+        "min": sketch.min,
+        "max": sketch.max,
+        "mean": sketch.sum / sketch.count if sketch.count else None,
+    }
+    if COLUMNS[column] == "boolean":
+        out["true_fraction"] = sketch.count_where(">=", 1) / rows if rows else None
+    else:
+        out["quantiles"] = dict(zip((str(q) for q in quantiles), sketch.quantiles(list(quantiles))))
+    return out
+
+
+async def column_profile(
+    db, column: str, window: timedelta, quantiles=DEFAULT_QUANTILES,
+    threshold: Optional[float] = None, op: str = ">", bins: int = 20,
+) -> dict:
+    """
+    Quantiles, histogram and (given `threshold`) the share of rows that a
+    rule `column <op> threshold` would hit; NULLs never hit, like in a rule.
+    """
+    if column not in COLUMNS:
+        raise ValueError(f"column must be one of {', '.join(sorted(COLUMNS))}")
+    if op not in THRESHOLD_OPS:
+        raise ValueError(f"op must be one of {' '.join(THRESHOLD_OPS)}")
+    started = time.perf_counter()
+    start, end = profile_window(window)
+    sketch, nulls = await merged_profile(db, column, start, end)
+
+    out = _summary(column, sketch, nulls, quantiles)
+    out.update({"start": start.isoformat(), "end": end.isoformat(), "histogram": sketch.histogram(bins)})
+    if threshold is not None:
+        hits = sketch.count_where(op, threshold)
+        out["threshold"] = {
+            "op": op,
+            "value": threshold,
+            "hits": hits,
+            "hit_fraction": hits / out["rows"] if out["rows"] else None,
+        }
+    out["relative_accuracy"] = settings.FEATURE_PROFILE_ACCURACY
+    out["compute_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return out
+
+
+@cached("feature_profile_summary", ttl_s=settings.FEATURE_PROFILE_CACHE_TTL_S)
+async def _all_summaries(db, start: datetime, end: datetime) -> List[dict]:
+    merged = await _merged(db, COLUMNS, start, end)
+    return [_summary(c, sketch, nulls, (0.5, 0.9, 0.95, 0.99)) for c, (sketch, nulls) in merged.items()]
+
+
+async def all_profiles(db, window: timedelta) -> dict:
+    """Summary (quantiles or true fraction) of every profiled column."""
+    started = time.perf_counter()
+    start, end = profile_window(window)
+    columns = await _all_summaries(db, start, end)
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "columns": columns,
+        "compute_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.future import select
+
+from app.core.audit import set_system_actor
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.risk_tables import (
+    RiskBlacklistAddress, RiskBlacklistEmailDomain, RiskBlacklistIP, RiskBlacklistUser,
+    RiskGreylist, RiskWhitelistAddress, RiskWhitelistUser,
+)
+
+logger = logging.getLogger("phalanx.list_expiry")
+
+LIST_MODELS = (
+    RiskWhitelistUser, RiskWhitelistAddress, RiskGreylist,
+    RiskBlacklistUser, RiskBlacklistIP, RiskBlacklistEmailDomain, RiskBlacklistAddress,
+)
+EXPIRED = "EXPIRED"
+
+
+async def expire_batch(model, batch_size: int = None) -> int:
+    """
+    Flips up to `batch_size` ACTIVE rows of `model` whose expires_at has
+    passed to EXPIRED, oldest first, in one short transaction. Rows another
+    worker is already sweeping are skipped (SKIP LOCKED). Returns the count.
+    """
+    batch_size = batch_size or settings.LIST_EXPIRY_BATCH
+    pk = [c for c in model.__table__.primary_key.columns]
+    # Matches the partial index ix_<table>_expiry from migrations/006
+    due = (
+        select(*pk)
+        .where(
+            model.status == "ACTIVE",
+            model.expires_at.isnot(None),
+            model.expires_at <= func.now(),
+        )
+        .order_by(model.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    async with SessionLocal() as db:
+        keys = [tuple(row) for row in (await db.execute(due)).all()]
+        if not keys:
+            # Nothing due: no UPDATE, so no version bump / NOTIFY either
+            return 0
+        # ORM-level update, so the list pages' version bump and the
+        # invalidation NOTIFY fire like for any other write; the audit trail
+        # gets one event per entry
+        await db.execute(
+            update(model)
+            .where(tuple_(*pk).in_(keys))
+            .values(status=EXPIRED)
+            .execution_options(
+                synchronize_session=False, audit_keys=keys, audit_values={"status": EXPIRED},
+            )
+        )
+        await db.commit()
+        return len(keys)
+
+
+async def sweep_expired() -> dict:
+    """One pass over every list table; each drained in bounded batches."""
+    expired = {}
+    for model in LIST_MODELS:
+        total = 0
+        while True:
+            n = await expire_batch(model)
+            total += n
+            if n < settings.LIST_EXPIRY_BATCH:
+                break
+        if total:
+            expired[model.__table__.name] = total
+    return expired
+
+
+async def run_expiry_sweeper():
+    """Background loop; safe to run on every worker."""
+    set_system_actor("list_expiry")
+    while True:
+        try:
+            expired = await sweep_expired()
+            if expired:
+                logger.info("expired list entries: %s", expired)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("list expiry sweep failed")
+        await asyncio.sleep(settings.LIST_EXPIRY_INTERVAL_S)
@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.risk_tables import (
+    ProjectionWatermark, RiskBlacklistAddress, RiskBlacklistEmailDomain, RiskBlacklistIP,
+    RiskBlacklistUser, RiskGreylist, RiskListChange, RiskTableVersion, RiskWhitelistAddress,
+    RiskWhitelistUser,
+)
+from app.services import list_snapshot
+
+logger = logging.getLogger("phalanx.list_feed")
+
+# Feed name -> (model, key column, partition column). Greylist entries are
+# published per entity_type: "greylist:IP", "greylist:USER_CODE", ...
+LISTS = {
+    "whitelist_user": (RiskWhitelistUser, "user_code", None),
+    "whitelist_address": (RiskWhitelistAddress, "destination_address", None),
+    "greylist": (RiskGreylist, "entity_value", "entity_type"),
+    "blacklist_user": (RiskBlacklistUser, "user_code", None),
+    "blacklist_ip": (RiskBlacklistIP, "ip_address", None),
+    "blacklist_email_domain": (RiskBlacklistEmailDomain, "email_domain", None),
+    "blacklist_address": (RiskBlacklistAddress, "destination_address", None),
+}
+_BY_TABLE = {model.__table__.name: name for name, (model, _, _) in LISTS.items()}
+# Feed version counter (a row of rt.risk_table_version)
+FEED_VERSION_NAME = "risk_list_changes"
+# Oldest version deltas can still be served from (pruning moves it forward)
+HORIZON_NAME = "risk_list_changes"
+LOOKUP_CHUNK = 1000
+
+
+class VersionGone(Exception):
+    """`since` predates the retained change log, or the change set is too large: reload the snapshot."""
+
+
+def _feed_name(name: str, part: Optional[str]) -> str:
+    return f"{name}:{part}" if part is not None else name
+
+
+async def _feed_version(db) -> int:
+    res = await db.execute(select(RiskTableVersion.version).where(RiskTableVersion.table_name == FEED_VERSION_NAME))
+    return res.scalar() or 0
+
+
+async def _horizon(db) -> int:
+    res = await db.execute(select(ProjectionWatermark.last_log_id).where(ProjectionWatermark.name == HORIZON_NAME))
+    return res.scalar() or 0
+
+
+# ================= CAPTURE =================
+# No DB triggers (the production database has none): writes made through
+# the app's sessions log the keys they touch, in their own transaction, like
+# the version bumps in app/core/conditional.py. Writes from outside the app
+# (psql, other services) are not in the feed.
+#
+# Each flush takes the next feed version from one counter row; the upsert
+# holds that row's lock until commit, so versions become visible in commit
+# order and a reader that sees version V sees every change up to V.
+def _next_version(connection) -> int:
+    stmt = insert(RiskTableVersion).values(table_name=FEED_VERSION_NAME, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RiskTableVersion.table_name],
+        set_={"version": RiskTableVersion.version + 1, "updated_at": func.now()},
+    )
+    return connection.execute(stmt.returning(RiskTableVersion.version)).scalar()
+
+
+def _append(connection, changes):
+    version = _next_version(connection)
+    connection.execute(insert(RiskListChange), [
+        {"version": version, "table_name": table, "entry_part": part, "entry_key": key}
+        for table, part, key in sorted(changes, key=lambda c: (c[0], c[1] or "", c[2] or ""))
+    ])
+
+
+def _entry(state, table: str, old: bool) -> tuple:
+    """(table, part, key) of a list row, before (`old`) or after this flush."""
+    _, key_col, part_col = LISTS[_BY_TABLE[table]]
+
+    def value(col):
+        if col is None:
+            return None
+        attr = state.attrs[col]
+        if old and attr.history.deleted:
+            return attr.history.deleted[0]
+        return attr.value
+
+    part = value(part_col)
+    return table, str(part) if part is not None else None, str(value(key_col))
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_flush(session, flush_context):
+    changes = set()
+    for objs, old in ((session.new, False), (session.deleted, True)):
+        for obj in objs:
+            table = getattr(getattr(obj, "__table__", None), "name", None)
+            if table in _BY_TABLE:
+                changes.add(_entry(inspect(obj), table, old))
+    for obj in session.dirty:
+        table = getattr(getattr(obj, "__table__", None), "name", None)
+        if table not in _BY_TABLE:
+            continue
+        state = inspect(obj)
+        _, key_col, part_col = LISTS[_BY_TABLE[table]]
+        moved = any(state.attrs[c].history.has_changes() for c in (key_col, part_col) if c)
+        if moved:
+            changes.add(_entry(state, table, True))
+        if moved or state.attrs["status"].history.has_changes():
+            # reason / description edits don't change membership
+            changes.add(_entry(state, table, False))
+    if changes:
+        _append(session.connection(), changes)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _capture_bulk(orm_execute_state):
+    # update(Model) / delete(Model) statements skip the flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement.table, "name", None)
+    if table not in _BY_TABLE:
+        return
+    _, key_col, part_col = LISTS[_BY_TABLE[table]]
+    pk = [c.key for c in orm_execute_state.statement.table.primary_key.columns]
+    # Rows hit are known from execution_options(audit_keys=...) (the expiry
+    # sweeper) or from per-row primary keys in an executemany
+    keys = orm_execute_state.execution_options.get("audit_keys")
+    params = orm_execute_state.parameters
+    if keys is None and isinstance(params, list) and params and all(c in p for p in params for c in pk):
+        keys = [[p[c] for c in pk] for p in params]
+    if keys is None:
+        # Unknown rows: a keyless change makes deltas across it reload the snapshot
+        changes = {(table, None, None)}
+    else:
+        changes = set()
+        for k in keys:
+            row = dict(zip(pk, k))
+            part = row.get(part_col) if part_col else None
+            changes.add((table, str(part) if part is not None else None, str(row[key_col])))
+    if changes:
+        _append(orm_execute_state.session.connection(), changes)
+
+
+# ================= SNAPSHOT =================
+async def read_active_lists() -> Tuple[int, Dict[str, list]]:
+    """(version, {feed list name: active keys}); the lists hold every change up to `version`."""
+    async with SessionLocal() as db:
+        # Read first: the lists read after it hold at least every change up to it
+        version = await _feed_version(db)
+        lists: Dict[str, list] = {}
+        for name, (model, key_col, part_col) in LISTS.items():
+            key = getattr(model, key_col)
+            if part_col is None:
+                res = await db.execute(select(key).where(model.status == "ACTIVE"))
+                lists[name] = res.scalars().all()
+            else:
+                res = await db.execute(select(getattr(model, part_col), key).where(model.status == "ACTIVE"))
+                for part, value in res:
+                    lists.setdefault(_feed_name(name, part), []).append(value)
+        await db.rollback()
+    return version, lists
+
+
+async def _change_marker() -> int:
+    async with SessionLocal() as db:
+        return await _feed_version(db)
+
+
+# bloom (bool) -> (change marker, (version, body, digest))
+_built: Dict[bool, Tuple[int, Tuple[int, bytes, str]]] = {}
+
+
+def _encode(lists, version: int, bits: float) -> Tuple[bytes, str]:
+    body = list_snapshot.build(lists, version, bits)
+    return body, hashlib.md5(body, usedforsecurity=False).hexdigest()[:16]
+
+
+async def snapshot(bloom: bool = False) -> Tuple[int, bytes, str]:
+    """
+    (version, snapshot bytes, content digest). Rebuilt only when the feed
+    version has moved since the last build; an older version is still a
+    valid base for deltas.
+    """
+    marker = await _change_marker()
+    cached = _built.get(bloom)
+    if cached is not None and cached[0] == marker:
+        return cached[1]
+    version, lists = await read_active_lists()
+    bits = settings.LIST_SNAPSHOT_BLOOM_BITS if bloom else 0
+    body, digest = await asyncio.to_thread(_encode, lists, version, bits)
+    _built[bloom] = (marker, (version, body, digest))
+    return version, body, digest
+
+
+# ================= DELTA =================
+async def delta(since: int) -> dict:
+    """
+    Changes to the active lists after version `since`: for every key touched
+    in between, its current state ("add" or "remove"). Keys are looked up
+    after the version is read, so a change just past it may show here and
+    again in the next delta; replaying is harmless, so a consumer just
+    applies it and keeps the returned version.
+    """
+    async with SessionLocal() as db:
+        version = await _feed_version(db)
+        if since < await _horizon(db):
+            raise VersionGone("version is older than the retained change log")
+        if since > version:
+            raise ValueError("since is newer than the current version")
+
+        C = RiskListChange
+        res = await db.execute(
+            select(C.table_name, C.entry_part, C.entry_key)
+            .where(C.version > since, C.version <= version)
+            .distinct()
+            .limit(settings.LIST_DELTA_MAX_CHANGES + 1)
+        )
+        touched = defaultdict(set)
+        for table, part, key in res:
+            if key is None:
+                raise VersionGone(f"bulk change to {table} without keys")
+            touched[table].add((part, key))
+        if sum(len(keys) for keys in touched.values()) > settings.LIST_DELTA_MAX_CHANGES:
+            raise VersionGone(f"more than {settings.LIST_DELTA_MAX_CHANGES} changes")
+
+        changes = []
+        for table, keys in touched.items():
+            name = _BY_TABLE.get(table)
+            if name is None:
+                continue
+            model, key_col, part_col = LISTS[name]
+            key = getattr(model, key_col)
+            keys = sorted(keys, key=lambda pk: (pk[0] or "", pk[1]))
+            active = set()
+            for i in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[i:i + LOOKUP_CHUNK]
+                if part_col is None:
+                    res = await db.execute(
+                        select(key).where(model.status == "ACTIVE", key.in_([k for _, k in chunk]))
+                    )
+                    active.update((None, k) for k in res.scalars())
+                else:
+                    part = getattr(model, part_col)
+                    res = await db.execute(
+                        select(part, key).where(model.status == "ACTIVE", tuple_(part, key).in_(chunk))
+                    )
+                    active.update((p, k) for p, k in res)
+            for part, value in keys:
+                changes.append({
+                    "list": _feed_name(name, part),
+                    "key": value,
+                    "op": "add" if (part, value) in active else "remove",
+                })
+        await db.rollback()
+    return {"since": since, "version": version, "changes": changes}
+
+
+# ================= BACKGROUND: prune the log, publish the file =================
+async def prune_changes() -> int:
+    """Drops change rows past retention and moves the delta horizon past them."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.LIST_CHANGES_RETENTION_HOURS)
+    async with SessionLocal() as db:
+        res = await db.execute(
+            delete(RiskListChange).where(RiskListChange.changed_at < cutoff).returning(RiskListChange.version)
+        )
+        versions = res.scalars().all()
+        if not versions:
+            await db.rollback()
+            return 0
+        # A transaction's rows share changed_at, so versions are dropped whole
+        stmt = insert(ProjectionWatermark).values(name=HORIZON_NAME, last_log_id=max(versions))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProjectionWatermark.name],
+            set_={
+                "last_log_id": func.greatest(ProjectionWatermark.last_log_id, stmt.excluded.last_log_id),
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+        await db.commit()
+        return len(versions)
+
+
+def _write_atomically(path: str, body: bytes):
+    # Readers holding the old file's mmap keep it; new opens see the new one
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".lists-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+async def run_list_feed_worker():
+    """Prunes the change log; with LIST_SNAPSHOT_PATH set, also keeps that file current."""
+    published: Optional[str] = None
+    while True:
+        try:
+            pruned = await prune_changes()
+            if pruned:
+                logger.info("pruned %d list change rows", pruned)
+            if settings.LIST_SNAPSHOT_PATH:
+                version, body, digest = await snapshot(bloom=settings.LIST_SNAPSHOT_BLOOM_BITS > 0)
+                if digest != published:
+                    await asyncio.to_thread(_write_atomically, settings.LIST_SNAPSHOT_PATH, body)
+                    published = digest
+                    logger.info("published list snapshot v%d (%d bytes)", version, len(body))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("list feed maintenance failed")
+        await asyncio.sleep(settings.LIST_FEED_INTERVAL_S)
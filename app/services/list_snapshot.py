@@ -0,0 +1,170 @@
+"""
+Binary list snapshot: every active list's keys as a sorted array, plus an
+optional Bloom filter per list, in one file a consumer can mmap and query
+in place without parsing or copying.
+
+All integers are little-endian; every section starts on an 8-byte boundary.
+
+    header      magic "PHXLST01" | u32 format | u32 list_count
+                | u64 version | u64 built_at_ms | u64 directory_at
+    directory   list_count x 64 bytes:
+                name (32 bytes, UTF-8, NUL-padded) | u64 count
+                | u64 offsets_at | u64 data_at | u64 bloom_at (0 = none)
+    offsets     u64[count + 1]; key i is data[offsets[i]:offsets[i + 1]]
+    data        UTF-8 keys, sorted bytewise, no separators
+    bloom       u64 m_bits | u32 k | u32 reserved | m_bits / 8 bytes
+                bit j of byte j // 8 is (1 << j % 8). For key bytes b:
+                h = blake2b(b, digest_size=16); h1, h2 = two u64 of h;
+                probe i sets bit (h1 + i * h2) mod m_bits, i < k
+
+`version` is the list feed version the snapshot reflects: ask the delta
+endpoint for changes since it to catch up.
+"""
+import hashlib
+import math
+import mmap
+import struct
+import time
+from typing import Dict, Iterable, Iterator, List
+
+MAGIC = b"PHXLST01"
+FORMAT = 1
+_HEADER = struct.Struct("<8sIIQQQ")
+_DIR_ENTRY = struct.Struct("<32sQQQQ")
+_BLOOM_HEADER = struct.Struct("<QII")
+
+
+def _pad(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def bloom_probes(key: bytes, k: int, m_bits: int) -> Iterator[int]:
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little")
+    for i in range(k):
+        yield (h1 + i * h2) % m_bits
+
+
+def _bloom(keys: List[bytes], bits_per_key: float) -> bytes:
+    m_bits = max(64, math.ceil(len(keys) * bits_per_key / 64) * 64)
+    k = max(1, round(bits_per_key * math.log(2)))
+    bits = bytearray(m_bits // 8)
+    for key in keys:
+        for j in bloom_probes(key, k, m_bits):
+            bits[j >> 3] |= 1 << (j & 7)
+    return _BLOOM_HEADER.pack(m_bits, k, 0) + bytes(bits)
+
+
+def build(lists: Dict[str, Iterable[str]], version: int, bloom_bits_per_key: float = 0) -> bytes:
+    """Serialize {list name: keys}; keys are de-duplicated and sorted."""
+    names = sorted(lists)
+    directory_at = _HEADER.size
+    cursor = directory_at + _DIR_ENTRY.size * len(names)
+    entries, sections = [], []
+
+    for name in names:
+        keys = sorted({k.encode() for k in lists[name]})
+        offsets, pos = [0], 0
+        for key in keys:
+            pos += len(key)
+            offsets.append(pos)
+        offsets_blob = struct.pack(f"<{len(offsets)}Q", *offsets)
+        data_blob = b"".join(keys)
+
+        offsets_at = cursor
+        data_at = offsets_at + len(offsets_blob)
+        cursor = data_at + len(data_blob)
+        parts = [offsets_blob, data_blob, b"\0" * _pad(cursor)]
+        cursor += _pad(cursor)
+
+        bloom_at = 0
+        if bloom_bits_per_key > 0:
+            bloom_blob = _bloom(keys, bloom_bits_per_key)
+            bloom_at = cursor
+            cursor += len(bloom_blob)
+            parts += [bloom_blob, b"\0" * _pad(cursor)]
+            cursor += _pad(cursor)
+
+        encoded_name = name.encode()
+        if len(encoded_name) > 32:
+            raise ValueError(f"list name {name!r} is longer than 32 bytes")
+        entries.append(_DIR_ENTRY.pack(encoded_name, len(keys), offsets_at, data_at, bloom_at))
+        sections.extend(parts)
+
+    header = _HEADER.pack(MAGIC, FORMAT, len(names), version, int(time.time() * 1000), directory_at)
+    return b"".join([header, *entries, *sections])
+
+
+# ================= READER =================
+class _List:
+    __slots__ = ("count", "offsets", "data", "bloom_bits", "bloom_k", "bloom")
+
+    def __init__(self, buf: memoryview, count, offsets_at, data_at, bloom_at):
+        self.count = count
+        self.offsets = buf[offsets_at:offsets_at + 8 * (count + 1)].cast("Q")
+        self.data = buf[data_at:data_at + self.offsets[count]]
+        self.bloom = None
+        if bloom_at:
+            self.bloom_bits, self.bloom_k, _ = _BLOOM_HEADER.unpack_from(buf, bloom_at)
+            start = bloom_at + _BLOOM_HEADER.size
+            self.bloom = buf[start:start + self.bloom_bits // 8]
+
+    def key(self, i: int) -> bytes:
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]])
+
+    def __contains__(self, key: bytes) -> bool:
+        if self.bloom is not None:
+            for j in bloom_probes(key, self.bloom_k, self.bloom_bits):
+                if not self.bloom[j >> 3] & (1 << (j & 7)):
+                    return False
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self.count and self.key(lo) == key
+
+
+class ListSnapshot:
+    """
+    Reads a snapshot in place (bytes, or an mmap via `open`). Reference
+    implementation for consumers; assumes a little-endian host.
+    """
+
+    def __init__(self, buf):
+        self._buf = memoryview(buf)
+        magic, fmt, n_lists, self.version, self.built_at_ms, directory_at = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError("not a list snapshot (or an unsupported format)")
+        self.lists: Dict[str, _List] = {}
+        for i in range(n_lists):
+            raw_name, *fields = _DIR_ENTRY.unpack_from(self._buf, directory_at + i * _DIR_ENTRY.size)
+            self.lists[raw_name.rstrip(b"\0").decode()] = _List(self._buf, *fields)
+
+    @classmethod
+    def open(cls, path: str) -> "ListSnapshot":
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def contains(self, name: str, key: str) -> bool:
+        entries = self.lists.get(name)
+        return entries is not None and key.encode() in entries
+
+    def keys(self, name: str) -> Iterator[str]:
+        entries = self.lists[name]
+        return (entries.key(i).decode() for i in range(entries.count))
+
+    def counts(self) -> Dict[str, int]:
+        return {name: entries.count for name, entries in self.lists.items()}
+
+    def release(self):
+        """Drop the views so an mmap behind them can be closed."""
+        for entries in self.lists.values():
+            for view in (entries.offsets, entries.data, entries.bloom):
+                if view is not None:
+                    view.release()
+        self.lists.clear()
+        self._buf.release()
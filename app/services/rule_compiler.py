@@ -0,0 +1,336 @@
+import ast
+import asyncio
+import operator
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.future import select
+
+from app.core.invalidation import listener, register_invalidator
+from app.models.risk_tables import RiskFeature, RiskRule
+
+# --- AST validation (shared with the rule editor) ---
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.Compare,
+    ast.Name, ast.Load, ast.Constant, ast.And, ast.Or, ast.Not,
+    ast.UAdd, ast.USub, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod,
+    ast.Eq, ast.NotEq, ast.Gt, ast.GtE, ast.Lt, ast.LtE,
+)
+
+def validate_logic_expression(expr: str):
+    """
+    Parses string to AST and checks if it is a safe, valid Python expression.
+    Returns (True, None) or (False, error_message).
+    """
+    expr = (expr or "").replace("\n", " ").strip()
+    if not expr:
+        return False, "Expression cannot be empty."
+
+    try:
+        # 1. Check Syntax
+        tree = ast.parse(expr, mode="eval")
+
+        # 2. Check Security/Allowed Nodes
+        for n in ast.walk(tree):
+            if not isinstance(n, _ALLOWED_NODES):
+                return False, f"Security Block: Disallowed logic element '{type(n).__name__}'"
+
+        return True, None
+    except SyntaxError as e:
+        return False, f"Syntax Error: {e.msg} at offset {e.offset}"
+    except Exception as e:
+        return False, str(e)
+
+
+# ================= DAG =================
+_BINOPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Mod: operator.mod,
+}
+_UNARY = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos}
+_COMPARE = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+    ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+# a > b is stored as b < a, so both spellings share a node
+_FLIPPED = {ast.Gt: ast.Lt, ast.GtE: ast.LtE}
+_SYMMETRIC = (ast.Eq, ast.NotEq)
+
+_UNSET = object()
+_FAILED = object()
+
+
+class EvaluationFailed(Exception):
+    """A node raised (e.g. None > 5); every rule depending on it doesn't match."""
+
+
+class CompiledRule(NamedTuple):
+    rule_id: int
+    rule_name: str
+    action: str
+    priority: int
+    root: int
+
+
+class RuleSet:
+    """
+    All active rules compiled into one DAG. Every subexpression is
+    hash-consed: `is_new_device and is_new_ip` appearing in ten rules is
+    one node, evaluated at most once per feature row. Rules are tried in
+    priority order and evaluation stops at the first one that matches.
+
+    Nodes are tuples: ("const", type, value), ("name", field),
+    ("unary", op, a), ("binop", op, a, b), ("cmp", op, a, b),
+    ("and" | "or", children). Semantics follow Python's (short-circuit,
+    `and`/`or` return an operand); a rule whose expression raises doesn't match.
+    """
+
+    def __init__(self):
+        self.nodes: List[tuple] = []
+        self._ids: Dict[tuple, int] = {}
+        self.rules: List[CompiledRule] = []
+        self.skipped: Dict[int, str] = {}  # rule_id -> why it couldn't be compiled
+
+    # --- building ---
+    def _intern(self, key: tuple) -> int:
+        node_id = self._ids.get(key)
+        if node_id is None:
+            node_id = self._ids[key] = len(self.nodes)
+            self.nodes.append(key)
+        return node_id
+
+    def _compare(self, op, a: int, b: int) -> int:
+        if type(op) in _FLIPPED:
+            op, a, b = _FLIPPED[type(op)](), b, a
+        elif isinstance(op, _SYMMETRIC):
+            a, b = min(a, b), max(a, b)
+        return self._intern(("cmp", type(op), a, b))
+
+    def _build(self, node) -> int:
+        if isinstance(node, ast.Expression):
+            return self._build(node.body)
+        if isinstance(node, ast.Constant):
+            # type in the key: 1, 1.0 and True hash alike but aren't the same constant
+            return self._intern(("const", type(node.value), node.value))
+        if isinstance(node, ast.Name):
+            return self._intern(("name", node.id))
+        if isinstance(node, ast.BoolOp):
+            kind = "and" if isinstance(node.op, ast.And) else "or"
+            children = []
+            for value in node.values:
+                child = self._build(value)
+                # a and (b and c) -> and(a, b, c)
+                if self.nodes[child][0] == kind:
+                    children.extend(self.nodes[child][1])
+                else:
+                    children.append(child)
+            return self._intern((kind, tuple(children)))
+        if isinstance(node, ast.UnaryOp):
+            return self._intern(("unary", type(node.op), self._build(node.operand)))
+        if isinstance(node, ast.BinOp):
+            return self._intern(("binop", type(node.op), self._build(node.left), self._build(node.right)))
+        if isinstance(node, ast.Compare):
+            operands = [self._build(node.left)] + [self._build(c) for c in node.comparators]
+            pairs = [self._compare(op, operands[i], operands[i + 1]) for i, op in enumerate(node.ops)]
+            # a < b < c -> (a < b) and (b < c); b is shared, so still evaluated once
+            return pairs[0] if len(pairs) == 1 else self._intern(("and", tuple(pairs)))
+        raise ValueError(f"unsupported element {type(node).__name__}")
+
+    def add_rule(self, rule):
+        ok, error = validate_logic_expression(rule.logic_expression)
+        if not ok:
+            self.skipped[rule.rule_id] = error
+            return
+        tree = ast.parse(rule.logic_expression.replace("\n", " ").strip(), mode="eval")
+        self.rules.append(CompiledRule(rule.rule_id, rule.rule_name, rule.action, rule.priority or 0, self._build(tree)))
+
+    @classmethod
+    def compile(cls, rules) -> "RuleSet":
+        rule_set = cls()
+        for rule in sorted(rules, key=lambda r: (-(r.priority or 0), r.rule_id)):
+            rule_set.add_rule(rule)
+        return rule_set
+
+    # --- evaluation ---
+    def _evaluator(self, row, memo):
+        """
+        Returns (ev, counter). With a memo list each node is computed once;
+        with memo=None it walks the expressions as trees (the naive way).
+        """
+        nodes = self.nodes
+        counter = [0]
+
+        def compute(node_id):
+            node = nodes[node_id]
+            kind = node[0]
+            if kind == "const":
+                return node[2]
+            counter[0] += 1
+            if kind == "name":
+                return row.get(node[1])
+            if kind == "and":
+                value = True
+                for child in node[1]:
+                    value = ev(child)
+                    if not value:
+                        return value
+                return value
+            if kind == "or":
+                value = False
+                for child in node[1]:
+                    value = ev(child)
+                    if value:
+                        return value
+                return value
+            if kind == "unary":
+                return _UNARY[node[1]](ev(node[2]))
+            if kind == "binop":
+                return _BINOPS[node[1]](ev(node[2]), ev(node[3]))
+            return _COMPARE[node[1]](ev(node[2]), ev(node[3]))
+
+        if memo is None:
+            def ev(node_id):
+                try:
+                    return compute(node_id)
+                except EvaluationFailed:
+                    raise
+                except Exception as e:
+                    raise EvaluationFailed(str(e)) from e
+            return ev, counter
+
+        def ev(node_id):
+            value = memo[node_id]
+            if value is _UNSET:
+                try:
+                    value = compute(node_id)
+                except EvaluationFailed:
+                    memo[node_id] = _FAILED
+                    raise
+                except Exception as e:
+                    memo[node_id] = _FAILED
+                    raise EvaluationFailed(str(e)) from e
+                memo[node_id] = value
+            elif value is _FAILED:
+                raise EvaluationFailed(f"node {node_id} failed")
+            return value
+        return ev, counter
+
+    def evaluate(self, row: dict, shared: bool = True) -> Tuple[Optional[CompiledRule], int]:
+        """First matching rule (or None) and how many nodes were computed to find it."""
+        ev, counter = self._evaluator(row, [_UNSET] * len(self.nodes) if shared else None)
+        for rule in self.rules:
+            try:
+                if ev(rule.root):
+                    return rule, counter[0]
+            except EvaluationFailed:
+                continue
+        return None, counter[0]
+
+    def stats(self) -> dict:
+        computed = [i for i, n in enumerate(self.nodes) if n[0] != "const"]
+        parents = Counter()
+        for rule in self.rules:
+            for node_id in self._reachable(rule.root):
+                parents[node_id] += 1
+        return {
+            "rules": len(self.rules),
+            "skipped": self.skipped,
+            "tree_nodes": sum(self._tree_size(r.root) for r in self.rules),
+            "dag_nodes": len(computed),
+            "shared_nodes": sum(1 for i in computed if parents[i] > 1),
+        }
+
+    def _reachable(self, root: int) -> set:
+        seen, stack = set(), [root]
+        while stack:
+            node_id = stack.pop()
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            stack.extend(self._children(node_id))
+        return seen
+
+    def _children(self, node_id: int):
+        node = self.nodes[node_id]
+        if node[0] in ("and", "or"):
+            return node[1]
+        if node[0] == "unary":
+            return (node[2],)
+        if node[0] in ("binop", "cmp"):
+            return node[2:4]
+        return ()
+
+    def _tree_size(self, node_id: int) -> int:
+        own = 0 if self.nodes[node_id][0] == "const" else 1
+        return own + sum(self._tree_size(c) for c in self._children(node_id))
+
+
+# ================= ACTIVE RULE SET =================
+_compiled: Optional[RuleSet] = None
+# Bumped on every invalidation, so a compile that raced a NOTIFY isn't cached
+_generation = 0
+
+
+def _invalidate(keys):
+    global _compiled, _generation
+    _generation += 1
+    _compiled = None
+
+
+register_invalidator(RiskRule.__table__.name, _invalidate)
+
+
+async def get_rule_set(db) -> RuleSet:
+    """The compiled ACTIVE rules; kept until a rule changes (only while invalidations are heard)."""
+    global _compiled
+    if _compiled is not None and listener.is_listening():
+        return _compiled
+    generation = _generation
+    rules = (await db.execute(select(RiskRule).where(RiskRule.status == "ACTIVE"))).scalars().all()
+    rule_set = RuleSet.compile(rules)
+    if generation == _generation:
+        _compiled = rule_set
+    return rule_set
+
+
+async def evaluation_report(db, sample: int = 1000) -> dict:
+    """
+    Runs the latest `sample` feature rows through the DAG and through a
+    per-rule tree walk, and reports how many node evaluations sharing saved.
+    The two must agree on every row; `mismatches` says if they didn't.
+    """
+    rule_set = await get_rule_set(db)
+    rows = (await db.execute(
+        select(RiskFeature.__table__).order_by(RiskFeature.update_time.desc()).limit(sample)
+    )).mappings().all()
+    return {**rule_set.stats(), **await asyncio.to_thread(_compare, rule_set, rows)}
+
+
+def _compare(rule_set: RuleSet, rows) -> dict:
+    naive_evals = dag_evals = mismatches = 0
+    naive_s = dag_s = 0.0
+    actions = Counter()
+    for row in rows:
+        started = time.perf_counter()
+        naive_rule, n = rule_set.evaluate(row, shared=False)
+        naive_s += time.perf_counter() - started
+        started = time.perf_counter()
+        rule, d = rule_set.evaluate(row)
+        dag_s += time.perf_counter() - started
+        naive_evals += n
+        dag_evals += d
+        mismatches += naive_rule != rule
+        actions[rule.action if rule else "NO_MATCH"] += 1
+
+    return {
+        "rows": len(rows),
+        "naive_evaluations": naive_evals,
+        "dag_evaluations": dag_evals,
+        "saved": naive_evals - dag_evals,
+        "saved_pct": round(100 * (naive_evals - dag_evals) / naive_evals, 1) if naive_evals else 0.0,
+        "naive_us_per_row": round(naive_s * 1e6 / len(rows), 2) if rows else None,
+        "dag_us_per_row": round(dag_s * 1e6 / len(rows), 2) if rows else None,
+        "actions": dict(actions),
+        "mismatches": mismatches,
+    }
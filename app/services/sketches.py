@@ -0,0 +1,164 @@
+import math
+from typing import Dict, Iterable, List, Optional
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch (DDSketch-style): values fall into
+    logarithmic buckets, so any quantile comes back within `accuracy` of
+    the true value (relative), whatever the column's range.
+
+    Merging is plain bucket-count addition, so hourly sketches combine into
+    a window without losing accuracy and without caring about merge order.
+    Counting how many values fall past a threshold is a walk over the buckets.
+
+    With `integers=True` bucket values are rounded, which makes small
+    integer columns (scores, counts, flags) exact while the bucket width
+    stays under 1 (|v| < 0.5 / accuracy).
+    """
+
+    MAX_BINS = 2048           # per sign; smallest magnitudes collapse past this
+    MIN_INDEXABLE = 1e-9      # |v| below this counts as zero
+
+    def __init__(self, accuracy: float = 0.005, integers: bool = False):
+        self.accuracy = accuracy
+        self.integers = integers
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    # --- building ---
+    def _index(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # Representative value of bucket (gamma^(i-1), gamma^i]
+        value = 2 * self.gamma ** index / (self.gamma + 1)
+        return float(round(value)) if self.integers else value
+
+    def add(self, value: float, weight: int = 1):
+        value = float(value)
+        if math.isnan(value):
+            return
+        if value > self.MIN_INDEXABLE:
+            i = self._index(value)
+            self.positive[i] = self.positive.get(i, 0) + weight
+        elif value < -self.MIN_INDEXABLE:
+            i = self._index(-value)
+            self.negative[i] = self.negative.get(i, 0) + weight
+        else:
+            self.zero += weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def extend(self, values: Iterable[float]):
+        for v in values:
+            self.add(v)
+        self._collapse()
+
+    def merge(self, other: "QuantileSketch"):
+        if (other.accuracy, other.integers) != (self.accuracy, self.integers):
+            raise ValueError("can only merge sketches built with the same accuracy and mode")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for i, c in theirs.items():
+                mine[i] = mine.get(i, 0) + c
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._collapse()
+
+    def _collapse(self):
+        for bins in (self.positive, self.negative):
+            if len(bins) > self.MAX_BINS:
+                keys = sorted(bins)
+                cut = keys[len(keys) - self.MAX_BINS]
+                folded = sum(bins.pop(k) for k in keys[:len(keys) - self.MAX_BINS])
+                bins[cut] += folded
+
+    # --- reading ---
+    def _ordered(self):
+        """(representative value, count) from smallest to largest, clamped to [min, max]."""
+        lo, hi = self.min, self.max
+        for i in sorted(self.negative, reverse=True):
+            yield min(max(-self._value(i), lo), hi), self.negative[i]
+        if self.zero:
+            yield 0.0, self.zero
+        for i in sorted(self.positive):
+            yield min(max(self._value(i), lo), hi), self.positive[i]
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        if not self.count:
+            return [None] * len(qs)
+        targets = sorted((max(0.0, min(1.0, q)) * (self.count - 1), n) for n, q in enumerate(qs))
+        out: List[Optional[float]] = [None] * len(qs)
+        seen, t = 0, 0
+        for value, c in self._ordered():
+            seen += c
+            while t < len(targets) and targets[t][0] < seen:
+                out[targets[t][1]] = value
+                t += 1
+        for rank, n in targets[t:]:
+            out[n] = self.max
+        return out
+
+    def count_where(self, op: str, threshold: float) -> int:
+        """Estimated number of values v with `v <op> threshold` (op in > >= < <=)."""
+        compare = _OPS[op]
+        if not self.count:
+            return 0
+        # Monotone predicates: decided by the exact extremes when they agree
+        at_min, at_max = compare(self.min, threshold), compare(self.max, threshold)
+        if at_min == at_max:
+            return self.count if at_min else 0
+        return sum(c for value, c in self._ordered() if compare(value, threshold))
+
+    def histogram(self, bins: int = 20) -> List[dict]:
+        """Equal-width histogram between min and max, rebinned from the sketch buckets."""
+        if not self.count:
+            return []
+        lo, hi = self.min, self.max
+        width = (hi - lo) / bins if hi > lo else 1.0
+        counts = [0] * (bins if hi > lo else 1)
+        for value, c in self._ordered():
+            counts[min(len(counts) - 1, int((value - lo) / width))] += c
+        return [{"lo": lo + k * width, "hi": lo + (k + 1) * width, "count": n} for k, n in enumerate(counts)]
+
+    # --- storage ---
+    def to_dict(self) -> dict:
+        return {
+            "a": self.accuracy, "i": self.integers, "p": self.positive, "n": self.negative, "z": self.zero,
+            "count": self.count, "sum": self.sum, "min": self.min, "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["a"], data.get("i", False))
+        # JSON object keys come back as strings
+        sketch.positive = {int(k): v for k, v in data["p"].items()}
+        sketch.negative = {int(k): v for k, v in data["n"].items()}
+        sketch.zero = data["z"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+
+_OPS = {
+    ">": lambda v, t: v > t,
+    ">=": lambda v, t: v >= t,
+    "<": lambda v, t: v < t,
+    "<=": lambda v, t: v <= t,
+}
+THRESHOLD_OPS = tuple(_OPS)
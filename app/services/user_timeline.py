@@ -0,0 +1,180 @@
+import asyncio
+import base64
+import heapq
+from datetime import datetime
+from itertools import islice
+from typing import List, NamedTuple, Optional
+
+import orjson
+from sqlalchemy import String, cast, tuple_
+from sqlalchemy.future import select
+
+from app.core.database import SessionLocal
+from app.models.risk_tables import RiskFeature, RiskWithdrawDecision, UserDevice
+
+# Order inside one timestamp: decision, then feature row, then device event
+DECISION, FEATURE, DEVICE = 0, 1, 2
+KIND_NAMES = {DECISION: "decision", FEATURE: "feature", DEVICE: "device"}
+
+
+class Event(NamedTuple):
+    ts: datetime
+    rank: int
+    key: object
+    data: dict
+
+    @property
+    def sort_key(self):
+        # Merged with reverse=True: ts desc, rank asc, key desc
+        return (self.ts, -self.rank, self.key)
+
+
+# ================= CURSOR =================
+def encode_cursor(e: Event) -> str:
+    raw = orjson.dumps([e.ts.isoformat(), e.rank, e.key])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Raises ValueError on anything that isn't a cursor we issued."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, rank, key = orjson.loads(raw)
+        return datetime.fromisoformat(ts), int(rank), key
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+def _after(ts_col, key_col, rank: int, cursor) -> list:
+    """Keyset condition: rows of this source that sort after the cursor."""
+    if cursor is None:
+        return []
+    c_ts, c_rank, c_key = cursor
+    if rank > c_rank:
+        return [ts_col <= c_ts]
+    if rank < c_rank:
+        return [ts_col < c_ts]
+    return [tuple_(ts_col, key_col) < tuple_(c_ts, c_key)]
+
+
+def _range(ts_col, start, end) -> list:
+    filters = [ts_col.isnot(None)]
+    if start:
+        filters.append(ts_col >= start)
+    if end:
+        filters.append(ts_col < end)
+    return filters
+
+
+# ================= SOURCES =================
+# Each is an indexed equality on user_code plus a time range, newest first,
+# limited to one page (+1) so no source ever reads more than the page needs.
+async def _decisions(user_code, start, end, cursor, limit) -> List[Event]:
+    ts, key = RiskWithdrawDecision.decision_timestamp, RiskWithdrawDecision.log_id
+    query = (
+        select(
+            ts, key,
+            RiskWithdrawDecision.txn_id,
+            RiskWithdrawDecision.decision_source,
+            RiskWithdrawDecision.decision,
+            RiskWithdrawDecision.primary_threat,
+            RiskWithdrawDecision.confidence,
+            RiskWithdrawDecision.narrative,
+        )
+        .where(
+            RiskWithdrawDecision.user_code == user_code,
+            *_range(ts, start, end),
+            *_after(ts, key, DECISION, cursor),
+        )
+        .order_by(ts.desc(), key.desc())
+        .limit(limit)
+    )
+    async with SessionLocal() as db:
+        rows = (await db.execute(query)).all()
+    return [Event(r.decision_timestamp, DECISION, r.log_id, dict(r._mapping)) for r in rows]
+
+
+async def _features(user_code, start, end, cursor, limit) -> List[Event]:
+    ts, key = RiskFeature.update_time, RiskFeature.txn_id
+    query = (
+        select(
+            ts, key,
+            RiskFeature.withdrawal_amount,
+            RiskFeature.withdraw_currency,
+            RiskFeature.chain,
+            RiskFeature.destination_address,
+            RiskFeature.session_risk_score,
+            RiskFeature.source_risk_score,
+            RiskFeature.is_sanctioned,
+            RiskFeature.is_impossible_travel,
+            RiskFeature.is_new_device,
+            RiskFeature.is_new_ip,
+        )
+        .where(
+            RiskFeature.user_code == user_code,
+            *_range(ts, start, end),
+            *_after(ts, key, FEATURE, cursor),
+        )
+        .order_by(ts.desc(), key.desc())
+        .limit(limit)
+    )
+    async with SessionLocal() as db:
+        rows = (await db.execute(query)).all()
+    return [Event(r.update_time, FEATURE, r.txn_id, dict(r._mapping)) for r in rows]
+
+
+async def _devices(user_code, start, end, cursor, limit) -> List[Event]:
+    # user_device has no timestamp of its own (and a numeric user_code): an
+    # event sits on the timeline at its txn's feature row (event_id == txn_id).
+    # Feature rows are walked in time order and each one's devices fetched via
+    # ix_user_device_user_event_text (migration 011), so a page stays cheap
+    # however long the user's history is.
+    if not user_code.isdigit():
+        return []
+    ts, key = RiskFeature.update_time, UserDevice.id
+    query = (
+        select(ts, key, UserDevice.event_id, UserDevice.country, UserDevice.country_code)
+        .join(RiskFeature, (RiskFeature.user_code == user_code)
+              & (RiskFeature.txn_id == cast(UserDevice.event_id, String)))
+        .where(
+            UserDevice.user_code == int(user_code),
+            *_range(ts, start, end),
+            *_after(ts, key, DEVICE, cursor),
+        )
+        .order_by(ts.desc(), key.desc())
+        .limit(limit)
+    )
+    async with SessionLocal() as db:
+        rows = (await db.execute(query)).all()
+    return [Event(r.update_time, DEVICE, r.id, dict(r._mapping)) for r in rows]
+
+
+async def user_timeline(
+    user_code: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> dict:
+    """
+    One page of a user's decisions, feature rows and device events, newest
+    first. The three sources are queried concurrently (one session each) and
+    merged lazily; `next_cursor` continues exactly where this page stopped.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    sources = await asyncio.gather(*(
+        fetch(user_code, start, end, after, limit + 1)
+        for fetch in (_decisions, _features, _devices)
+    ))
+    merged = heapq.merge(*sources, key=lambda e: e.sort_key, reverse=True)
+    page = list(islice(merged, limit + 1))
+
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return {
+        "user_code": user_code,
+        "events": [
+            {"ts": e.ts, "kind": KIND_NAMES[e.rank], **e.data}
+            for e in page[:limit]
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,261 @@
+"""
+Seeded synthetic data for the router benchmarks: rebuilds the `rt` schema
+(models + migrations/*.sql) and fills it with realistic volumes.
+
+    python -m benchmarks.datagen --scale 1000000 [--seed 7] --yes
+
+`scale` is the number of risk_withdraw_decision rows. Everything else is
+derived from it: ~0.95 txns per decision (HOLDs get an AI follow-up),
+one risk_features row per txn, a user_device row for ~60% of txns, and
+list tables at roughly 1 row per 2000 decisions. Timestamps cover the
+last 30 days, skewed towards now like real traffic.
+
+DESTRUCTIVE: drops the `rt` schema of the configured database. Refuses
+to run unless DB_NAME contains "bench" or --yes is given.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import string
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.database import Base, engine
+import app.models.risk_tables  # noqa: F401  (registers the rt models on Base)
+import app.models.users  # noqa: F401
+from app.services import decision_aggregates, decision_projection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+COPY_CHUNK = 50_000
+HISTORY_DAYS = 30
+
+COUNTRIES = ["SG", "US", "GB", "DE", "HK", "JP", "KR", "VN", "TH", "ID", "BR", "NG", "RU", "TR", "AE"]
+COUNTRY_WEIGHTS = [20, 14, 8, 6, 9, 5, 5, 6, 4, 5, 4, 3, 3, 4, 4]
+CURRENCIES = ["USDT", "BTC", "ETH", "USDC", "TRX"]
+CHAINS = ["TRON", "ETH", "BSC", "BTC", "SOL"]
+THREATS = ["NONE", "ACCOUNT_TAKEOVER", "MONEY_MULE", "SANCTIONS", "BONUS_ABUSE", "VELOCITY"]
+
+
+def ensure_bench_database(force: bool):
+    if not force and "bench" not in (settings.DB_NAME or "").lower():
+        raise SystemExit(
+            f"refusing to drop schema rt on database {settings.DB_NAME!r}: "
+            "point DB_NAME at a *bench* database or pass --yes"
+        )
+
+
+def _ts(rnd: random.Random, now: datetime) -> datetime:
+    # u**3 puts ~half of the rows in the last ~4 days, like a growing book
+    return now - timedelta(seconds=HISTORY_DAYS * 86400 * rnd.random() ** 3)
+
+
+def _address(rnd: random.Random) -> str:
+    return "T" + "".join(rnd.choices(string.ascii_letters + string.digits, k=33))
+
+
+def _snapshot(rnd: random.Random, amount: float, currency: str) -> str:
+    """A features_snapshot roughly the size of production ones (~25 keys)."""
+    return json.dumps({
+        "withdrawal_amount": amount,
+        "withdraw_currency": currency,
+        "chain": rnd.choice(CHAINS),
+        "pnl_amount": round(rnd.gauss(0, 500), 2),
+        "total_balance_sum": round(rnd.lognormvariate(8, 1.5), 2),
+        "session_risk_score": rnd.randint(0, 100),
+        "source_risk_score": rnd.randint(0, 100),
+        "is_sanctioned": rnd.random() < 0.01,
+        "is_impossible_travel": rnd.random() < 0.03,
+        "is_new_device": rnd.random() < 0.2,
+        "is_new_ip": rnd.random() < 0.25,
+        "deposit_fan_out": rnd.randint(0, 12),
+        "withdrawal_fan_in": rnd.randint(0, 12),
+        "ip_density": rnd.randint(0, 40),
+        "device_density": rnd.randint(0, 40),
+        "withdrawal_ratio": round(rnd.random(), 4),
+        "rapid_cycling": rnd.random() < 0.05,
+        "user_whitelisted": rnd.random() < 0.02,
+        "address_whitelisted": rnd.random() < 0.02,
+        "user_blacklisted": rnd.random() < 0.01,
+        "address_blacklisted": rnd.random() < 0.01,
+        "kyc_level": rnd.randint(0, 3),
+        "account_age_days": rnd.randint(0, 2000),
+        "geo": {"country": rnd.choices(COUNTRIES, COUNTRY_WEIGHTS)[0], "asn": rnd.randint(1000, 65000)},
+        "recent_amounts": [round(rnd.lognormvariate(5, 1.2), 2) for _ in range(5)],
+    })
+
+
+# ================= SCHEMA =================
+async def reset_schema():
+    async with engine.begin() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.execute("DROP SCHEMA IF EXISTS rt CASCADE; CREATE SCHEMA rt")
+        await conn.run_sync(Base.metadata.create_all)
+        for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql"))):
+            with open(path) as f:
+                await raw.execute(f.read())
+
+
+# ================= ROWS =================
+def _decision_rows(scale: int, rnd: random.Random, now: datetime):
+    """
+    Yields (decision, feature, device) tuples; feature / device are None for
+    AI follow-ups of a txn that already has them.
+    """
+    users = max(100, scale // 25)
+    log_id = 0
+    txn = 10_000_000
+    while log_id < scale:
+        txn += 1
+        user_code = str(1_000_000 + int(users * rnd.random() ** 2))  # a few heavy users
+        ts = _ts(rnd, now)
+        amount = round(rnd.lognormvariate(5, 1.4), 2)
+        currency = rnd.choice(CURRENCIES)
+        snapshot = _snapshot(rnd, amount, currency)
+        country = rnd.choices(COUNTRIES, COUNTRY_WEIGHTS)[0]
+
+        decision = rnd.choices(["PASS", "HOLD", "REJECT"], [75, 15, 10])[0]
+        log_id += 1
+        yield (
+            (log_id, user_code, str(txn), "RULE_ENGINE_RULES", decision, "NONE", 1.0, "Rule engine decision",
+             None, round(rnd.uniform(2, 40), 2), snapshot, ts),
+            (user_code, str(txn), amount, currency, rnd.choice(CHAINS), round(rnd.gauss(0, 500), 2),
+             round(rnd.lognormvariate(8, 1.5), 2), rnd.randint(0, 100), rnd.randint(0, 100),
+             rnd.random() < 0.01, "CLEAR", rnd.random() < 0.03, rnd.random() < 0.2, rnd.random() < 0.25, ts,
+             rnd.randint(0, 12), rnd.randint(0, 12), rnd.randint(0, 40), rnd.randint(0, 40), round(rnd.random(), 4),
+             _address(rnd), rnd.random() < 0.05, rnd.random() < 0.02, rnd.random() < 0.02, rnd.random() < 0.01,
+             rnd.random() < 0.01),
+            (txn, int(user_code), txn, country, country) if rnd.random() < 0.6 else None,
+        )
+
+        # Most HOLDs go to the AI agent, which decides a few seconds later
+        if decision == "HOLD" and log_id < scale and rnd.random() < 0.8:
+            log_id += 1
+            ai_decision = rnd.choices(["PASS", "REJECT", "HOLD"], [60, 30, 10])[0]
+            yield (
+                (log_id, user_code, str(txn), "AI_AGENT_REVIEW", ai_decision, rnd.choice(THREATS),
+                 round(rnd.random(), 3), "Agent narrative " * 4, "Step-by-step reasoning. " * 20,
+                 round(rnd.uniform(800, 9000), 2), snapshot, ts + timedelta(seconds=rnd.uniform(1, 30))),
+                None,
+                None,
+            )
+
+
+_DECISION_COLUMNS = [
+    "log_id", "user_code", "txn_id", "decision_source", "decision", "primary_threat", "confidence",
+    "narrative", "llm_reasoning", "processing_time_ms", "features_snapshot", "decision_timestamp",
+]
+_FEATURE_COLUMNS = [
+    "user_code", "txn_id", "withdrawal_amount", "withdraw_currency", "chain", "pnl_amount",
+    "total_balance_sum", "session_risk_score", "source_risk_score", "is_sanctioned", "sanctions_status",
+    "is_impossible_travel", "is_new_device", "is_new_ip", "update_time", "deposit_fan_out",
+    "withdrawal_fan_in", "ip_density", "device_density", "withdrawal_ratio", "destination_address",
+    "rapid_cycling", "user_whitelisted", "address_whitelisted", "user_blacklisted", "address_blacklisted",
+]
+_DEVICE_COLUMNS = ["id", "user_code", "event_id", "country", "country_code"]
+
+
+async def _copy(raw, table, columns, records):
+    if records:
+        await raw.copy_records_to_table(table, records=records, columns=columns, schema_name="rt")
+
+
+async def _seed_lists(raw, scale: int, rnd: random.Random, now: datetime):
+    n = max(50, scale // 2000)
+
+    def expiry():
+        return now + timedelta(days=rnd.randint(-30, 180)) if rnd.random() < 0.3 else None
+
+    def user():
+        return str(1_000_000 + rnd.randint(0, max(100, scale // 25)))
+
+    await raw.executemany(
+        "INSERT INTO rt.risk_rules (rule_name, logic_expression, action, narrative, priority, status) "
+        "VALUES ($1, $2, $3, $4, $5, $6)",
+        [(f"rule_{i:03d}", f"withdrawal_amount > {rnd.randint(100, 50000)} and session_risk_score > {rnd.randint(10, 90)}",
+          rnd.choice(["HOLD", "REJECT", "PASS"]), "Synthetic rule", rnd.randint(1, 100), "ACTIVE")
+         for i in range(40)],
+    )
+    await _copy(raw, "risk_whitelist_user", ["user_code", "description", "status", "created_at", "expires_at"],
+                list({u: (u, "vip", "ACTIVE", now, expiry()) for u in (user() for _ in range(n))}.values()))
+    await _copy(raw, "risk_whitelist_address", ["destination_address", "chain", "description", "status", "created_at", "expires_at"],
+                [(_address(rnd), rnd.choice(CHAINS), "treasury", "ACTIVE", now, expiry()) for _ in range(n)])
+    await _copy(raw, "risk_greylist", ["entity_value", "entity_type", "reason", "status", "created_at", "expires_at"],
+                [(f"{i}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}", "IP", "watch", "ACTIVE", now, expiry())
+                 for i in range(n)])
+    await _copy(raw, "risk_blacklist_user", ["user_code", "reason", "status", "created_at", "expires_at"],
+                list({u: (u, "fraud", "ACTIVE", now, expiry()) for u in (user() for _ in range(n))}.values()))
+    await _copy(raw, "risk_blacklist_ip", ["ip_address", "reason", "status", "created_at", "expires_at"],
+                [(f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", "tor exit", "ACTIVE", now, expiry()) for i in range(n)])
+    await _copy(raw, "risk_blacklist_emaildomain", ["email_domain", "reason", "status", "created_at", "expires_at"],
+                [(f"mailer{i}.example", "disposable", "ACTIVE", now, expiry()) for i in range(n)])
+    await _copy(raw, "risk_blacklist_address", ["destination_address", "chain", "reason", "status", "created_at", "expires_at"],
+                [(_address(rnd), rnd.choice(CHAINS), "mixer", "ACTIVE", now, expiry()) for _ in range(n)])
+
+
+async def seed(scale: int, seed_value: int = 7) -> dict:
+    """Reset and fill the schema, then run the projection / aggregates to completion. Returns row counts."""
+    rnd = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    await reset_schema()
+
+    counts = {"risk_withdraw_decision": 0, "risk_features": 0, "user_device": 0}
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        decisions, features, devices = [], [], []
+
+        async def flush():
+            await _copy(raw, "risk_withdraw_decision", _DECISION_COLUMNS, decisions)
+            await _copy(raw, "risk_features", _FEATURE_COLUMNS, features)
+            await _copy(raw, "user_device", _DEVICE_COLUMNS, devices)
+            counts["risk_withdraw_decision"] += len(decisions)
+            counts["risk_features"] += len(features)
+            counts["user_device"] += len(devices)
+            decisions.clear(), features.clear(), devices.clear()
+
+        for decision, feature, device in _decision_rows(scale, rnd, now):
+            decisions.append(decision)
+            if feature is not None:
+                features.append(feature)
+            if device is not None:
+                devices.append(device)
+            if len(decisions) >= COPY_CHUNK:
+                await flush()
+        await flush()
+        await _seed_lists(raw, scale, rnd, now)
+
+    # Derived tables the routes read, built the same way production builds them
+    while await decision_projection.refresh_latest_decisions():
+        pass
+    await decision_aggregates.backfill_if_empty()
+    while await decision_aggregates.compact_dirty():
+        pass
+
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.execute("VACUUM ANALYZE")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--yes", action="store_true", help="drop rt even if DB_NAME doesn't look like a bench DB")
+    args = parser.parse_args()
+    ensure_bench_database(args.yes)
+
+    async def run():
+        started = time.perf_counter()
+        counts = await seed(args.scale, args.seed)
+        await engine.dispose()
+        print(json.dumps(counts), f"in {time.perf_counter() - started:.1f}s")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Router benchmark: seeds a local Postgres at several data scales
+(benchmarks.datagen) and drives every read route in-process through an
+ASGI client, recording p50 / p99 latency, SQL query count and memory.
+
+    python -m benchmarks.router_bench [--scales 10000,100000,1000000] [--requests 30]
+                                      [--baseline benchmarks/router_baseline.json]
+                                      [--update-baseline] [--tolerance 0.25] [--yes]
+
+The first run (or --update-baseline) writes the baseline JSON; later runs
+compare against it and exit 1 if any endpoint regressed by more than
+`tolerance` (p50 or p99) or issues more queries than before. Baselines
+are machine-specific, so keep them out of version control.
+
+Query counts come from the app's own Server-Timing header
+(app/core/instrumentation.py). peak_rss_mb is the process high-water mark
+after the endpoint ran; peak_alloc_mb is the Python allocation peak of a
+single extra request, traced separately so tracing doesn't skew timings.
+
+The ASGI client doesn't run startup hooks, so background workers and the
+in-memory feature cache stay off, and the result cache is disabled so
+repeated requests don't turn into cache hits: numbers are for the
+database path.
+Needs httpx (not a runtime dependency). DESTRUCTIVE: see benchmarks.datagen.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+import httpx
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.risk_tables import RiskFeature, RiskWithdrawDecision
+from benchmarks.datagen import ensure_bench_database, seed
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_baseline.json")
+WARMUP_REQUESTS = 3
+_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+# (name, path); {placeholders} are filled from the seeded data
+ENDPOINTS = [
+    ("dashboard", "/dashboard/"),
+    ("dashboard_7d", "/dashboard/?window=7d"),
+    ("dashboard_30d", "/dashboard/?window=30d"),
+    ("decisions", "/decisions"),
+    ("decisions_page_50", "/decisions?page=50"),
+    ("decisions_search", "/decisions?q={user_code}"),
+    ("decisions_source", "/decisions?source=AI_AGENT_REVIEW"),
+    ("decision_detail", "/decisions/{log_id}"),
+    ("decisions_export_1h", "/decisions/export?format=csv&start={hour_ago}"),
+    ("risk_features", "/risk-features"),
+    ("risk_features_page_50", "/risk-features?page=50"),
+    ("risk_features_search", "/risk-features?q={user_code}"),
+    ("feature_details", "/risk-features/details?user_code={user_code}&txn_id={txn_id}"),
+    ("feature_history_30d", "/risk-features/history?user_code={user_code}&hours=720"),
+    ("features_export_1h", "/risk-features/export?format=ndjson&start={hour_ago}"),
+    ("user_timeline", "/users/{user_code}/timeline"),
+    ("risk_rules", "/risk-rules"),
+    ("blacklist", "/blacklist"),
+    ("whitelist_users", "/whitelist/users"),
+    ("whitelist_addresses", "/whitelist/addresses"),
+    ("greylist", "/greylist"),
+]
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _sample_params() -> dict:
+    """Ids the parameterised routes are pointed at: the busiest user and one of their txns."""
+    async with SessionLocal() as db:
+        user_code = (await db.execute(
+            select(RiskFeature.user_code).group_by(RiskFeature.user_code)
+            .order_by(func.count().desc()).limit(1)
+        )).scalar()
+        txn_id = (await db.execute(
+            select(RiskFeature.txn_id).where(RiskFeature.user_code == user_code)
+            .order_by(RiskFeature.update_time.desc()).limit(1)
+        )).scalar()
+        log_id = (await db.execute(select(func.max(RiskWithdrawDecision.log_id)))).scalar()
+    hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    return {"user_code": user_code, "txn_id": txn_id, "log_id": (log_id or 0) // 2, "hour_ago": quote(hour_ago)}
+
+
+async def _run_endpoint(client, path: str, n: int) -> dict:
+    for _ in range(WARMUP_REQUESTS):
+        await client.get(path)
+
+    timings, queries, statuses = [], [], set()
+    for _ in range(n):
+        started = time.perf_counter()
+        resp = await client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        statuses.add(resp.status_code)
+        match = _QUERIES_RE.search(resp.headers.get("server-timing", ""))
+        if match:
+            queries.append(int(match.group(1)))
+
+    tracemalloc.start()
+    await client.get(path)
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p99_ms": round(_percentile(timings, 0.99), 3),
+        "queries": max(queries) if queries else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_alloc_mb": round(peak_alloc / (1024 * 1024), 2),
+        "status": sorted(statuses),
+    }
+
+
+async def run_scale(app, scale: int, n: int, seed_value: int) -> dict:
+    started = time.perf_counter()
+    counts = await seed(scale, seed_value)
+    print(f"\n== scale {scale:,}: seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+    params = await _sample_params()
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, template in ENDPOINTS:
+            results[name] = await _run_endpoint(client, template.format(**params), n)
+            r = results[name]
+            print(f"  {name:<24} p50 {r['p50_ms']:9.2f} ms   p99 {r['p99_ms']:9.2f} ms   "
+                  f"queries {r['queries']!s:>3}   alloc {r['peak_alloc_mb']:8.2f} MB   {r['status']}")
+    return {"rows": counts, "endpoints": results}
+
+
+# ================= BASELINE =================
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Human-readable regressions of `current` against `baseline` (same scale + endpoint only)."""
+    regressions = []
+    for scale, data in current["scales"].items():
+        base_scale = baseline.get("scales", {}).get(scale)
+        if not base_scale:
+            continue
+        for name, r in data["endpoints"].items():
+            b = base_scale["endpoints"].get(name)
+            if not b:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                # Sub-millisecond wobble isn't a regression
+                if r[metric] > b[metric] * (1 + tolerance) and r[metric] - b[metric] > 1.0:
+                    regressions.append(f"{scale} {name}: {metric} {b[metric]:.2f} -> {r[metric]:.2f} ms "
+                                       f"({r[metric] / b[metric]:.2f}x)")
+            if r["queries"] is not None and b["queries"] is not None and r["queries"] > b["queries"]:
+                regressions.append(f"{scale} {name}: queries {b['queries']} -> {r['queries']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", default="10000,100000,1000000", help="comma-separated decision row counts")
+    parser.add_argument("--requests", type=int, default=30, help="timed requests per endpoint")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio before failing")
+    parser.add_argument("--yes", action="store_true", help="drop rt even if DB_NAME doesn't look like a bench DB")
+    args = parser.parse_args()
+    ensure_bench_database(args.yes)
+
+    from main import app  # after arg parsing: importing the app reads settings / builds the manifest
+    settings.RESULT_CACHE_ENABLED = False
+
+    async def run():
+        scales = {}
+        for scale in (int(s) for s in args.scales.split(",") if s.strip()):
+            scales[str(scale)] = await run_scale(app, scale, args.requests, args.seed)
+        await engine.dispose()
+        return scales
+
+    current = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.node(),
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "scales": asyncio.run(run()),
+    }
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, current, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) vs {args.baseline}:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print(f"\nno regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
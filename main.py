@@ -1,13 +1,91 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
-from app.routers import auth, risk_rules, lists, blacklist, features, decisions, dashboard,prompts
+from fastapi.responses import RedirectResponse, Response, JSONResponse
+from app.routers import auth, risk_rules, lists, blacklist, features, decisions, dashboard,prompts, timeline
+from app.core.instrumentation import query_timing_middleware
+from app.core.metrics import metrics_middleware, render_metrics
+from app.core.health import readiness, register_status, register_warm_check
+from app.core.config import settings
+from app.core.warmup import run_startup_warmup
+from app.core.invalidation import listener as invalidation_listener
+from app.core.audit import audit_context_middleware, writer as audit_writer
+from app.core.compression import CompressionMiddleware
+from app.core.admission import AdmissionMiddleware, controller as admission
+from app.core.static_assets import static_files
+from app.services import decision_aggregates, decision_projection, feature_cache, feature_profiles, list_expiry, list_feed
+from app.services.dashboard_live import broadcaster
 # We will import dashboard router later
 
-app = FastAPI(title="Phalanx Console")
 
-# Mount Static Files (CSS/JS)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# ================= BACKGROUND WORKERS =================
+_background_tasks = []
+
+def start_background_workers():
+    if settings.INVALIDATION_ENABLED:
+        _background_tasks.append(asyncio.create_task(invalidation_listener.run()))
+    if settings.AUDIT_ENABLED:
+        _background_tasks.append(asyncio.create_task(audit_writer.run()))
+    if settings.DECISION_PROJECTION_ENABLED:
+        register_warm_check("latest_decision_projection", decision_projection.is_caught_up)
+        _background_tasks.append(asyncio.create_task(decision_projection.run_projection_worker()))
+        # Aggregates are fed by the projection's dirty marks, so they share its switch
+        register_warm_check("dashboard_aggregates", decision_aggregates.is_caught_up)
+        _background_tasks.append(asyncio.create_task(decision_aggregates.run_aggregate_compactor()))
+    if settings.FEATURE_CACHE_ENABLED:
+        register_warm_check("recent_feature_cache", feature_cache.is_warm)
+        _background_tasks.append(asyncio.create_task(feature_cache.run_feature_cache_worker()))
+    if settings.FEATURE_PROFILE_ENABLED:
+        # The backfill can take a while and only feeds reports, so it doesn't gate readiness
+        register_status("feature_profiles", feature_profiles.status)
+        _background_tasks.append(asyncio.create_task(feature_profiles.run_profile_worker()))
+    if settings.DASHBOARD_SSE_ENABLED:
+        _background_tasks.append(asyncio.create_task(broadcaster.run()))
+    if settings.LIST_EXPIRY_ENABLED:
+        _background_tasks.append(asyncio.create_task(list_expiry.run_expiry_sweeper()))
+    if settings.LIST_FEED_ENABLED:
+        _background_tasks.append(asyncio.create_task(list_feed.run_list_feed_worker()))
+
+async def stop_background_workers():
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+
+
+# --- LIFESPAN: warm pool / templates / hot queries before the first request, workers after ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_startup_warmup()
+    start_background_workers()
+    try:
+        yield
+    finally:
+        await stop_background_workers()
+        # Whatever the writer hadn't flushed yet
+        await audit_writer.close()
+
+
+app = FastAPI(title="Phalanx Console", lifespan=lifespan)
+
+# Brotli/gzip for large text responses (innermost: timings include compression)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+# Who / which request, for the audit trail captured in session hooks
+app.middleware("http")(audit_context_middleware)
+# Server-Timing header + slow-query log per request
+app.middleware("http")(query_timing_middleware)
+# Per-route-class concurrency limits / fast 503s (limits registered below, per router)
+app.add_middleware(AdmissionMiddleware, fastapi_app=app)
+# Per-route latency histograms / in-flight gauges (outermost, so it sees everything)
+app.middleware("http")(metrics_middleware)
+
+# Mount Static Files (CSS/JS), fingerprinted at startup -> immutable caching
+app.mount("/static", static_files, name="static")
 
 # Include Routers
 app.include_router(auth.router)
@@ -16,22 +94,50 @@ app.include_router(lists.router)
 app.include_router(blacklist.router)
 app.include_router(features.router)
 app.include_router(decisions.router)
+app.include_router(timeline.router)
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
 app.include_router(prompts.router, prefix="/prompts", tags=["Prompts"])
 
+admission.limit_router("dashboard", dashboard.router, exclude={"/stream"})  # SSE holds no DB connection
+# Streamed exports hold a slot for minutes: their own class, so they don't
+# inflate the page classes' service time and get pages refused up front
+EXPORTS = {"/risk-features/export", "/decisions/export"}
+admission.limit_router("features", features.router, exclude=EXPORTS)
+admission.limit_router("features", timeline.router)
+admission.limit_router("decisions", decisions.router, exclude=EXPORTS)
+admission.limit_router("exports", features.router, only=EXPORTS)
+admission.limit_router("exports", decisions.router, only=EXPORTS)
+admission.limit_router("lists", lists.router)
+admission.limit_router("lists", blacklist.router)
+admission.limit_router("lists", risk_rules.router)
+admission.limit_router("prompts", prompts.router)
+
 
+# --- LIVENESS: process is up (never touches the DB, so SAE won't restart us on DB blips) ---
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
     return {"status": "ok"}
 
-    
+# --- READINESS: DB reachable, pool not saturated, p95 ok, caches warm ---
+@app.get("/health/ready")
+async def readiness_check():
+    ready, report = await readiness()
+    return JSONResponse(report, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     return RedirectResponse(url="/login")
 
 # Temporary Dashboard Route to test login
-from fastapi.templating import Jinja2Templates
-templates = Jinja2Templates(directory="app/templates")
+from app.core.templating import templates
 
 # @app.get("/dashboard")
 # async def dashboard_home(request: Request):
@@ -0,0 +1,29 @@
+-- Latest decision per txn_id, maintained by app/services/decision_projection.py
+CREATE TABLE IF NOT EXISTS rt.risk_txn_latest_decision (
+    txn_id              TEXT PRIMARY KEY,
+    log_id              BIGINT,
+    user_code           TEXT,
+    decision_source     TEXT,
+    decision            TEXT,
+    confidence          DOUBLE PRECISION,
+    decision_timestamp  TIMESTAMPTZ,
+    withdrawal_amount   DOUBLE PRECISION,
+    withdraw_currency   TEXT,
+    country             TEXT
+);
+
+CREATE INDEX IF NOT EXISTS ix_risk_txn_latest_decision_ts
+    ON rt.risk_txn_latest_decision (decision_timestamp DESC);
+CREATE INDEX IF NOT EXISTS ix_risk_txn_latest_decision_user
+    ON rt.risk_txn_latest_decision (user_code);
+
+-- Incremental refresh watermark (highest risk_withdraw_decision.log_id applied)
+CREATE TABLE IF NOT EXISTS rt.risk_projection_watermark (
+    name         TEXT PRIMARY KEY,
+    last_log_id  BIGINT NOT NULL DEFAULT 0,
+    updated_at   TIMESTAMPTZ DEFAULT now()
+);
+
+-- The worker scans risk_withdraw_decision by log_id
+CREATE INDEX IF NOT EXISTS ix_risk_withdraw_decision_log_id
+    ON rt.risk_withdraw_decision (log_id);
@@ -0,0 +1,10 @@
+-- txn (user_device.event_id) -> country, filled lazily by app/services/country_enrichment.py
+CREATE TABLE IF NOT EXISTS rt.risk_txn_country (
+    event_id     BIGINT PRIMARY KEY,
+    country      TEXT,
+    resolved_at  TIMESTAMPTZ DEFAULT now()
+);
+
+-- Misses fall through to user_device by event_id
+CREATE INDEX IF NOT EXISTS ix_user_device_event_id
+    ON rt.user_device (event_id);
@@ -0,0 +1,11 @@
+-- Per-user timeline (app/services/user_timeline.py): equality on user_code
+-- plus a time range, newest first, on each source table.
+CREATE INDEX IF NOT EXISTS ix_risk_withdraw_decision_user_ts
+    ON rt.risk_withdraw_decision (user_code, decision_timestamp DESC, log_id DESC);
+
+CREATE INDEX IF NOT EXISTS ix_risk_features_user_ts
+    ON rt.risk_features (user_code, update_time DESC, txn_id DESC);
+
+-- Device events join back to risk_features on its (user_code, txn_id) key
+CREATE INDEX IF NOT EXISTS ix_user_device_user_code
+    ON rt.user_device (user_code);
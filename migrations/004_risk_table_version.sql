@@ -0,0 +1,7 @@
+-- Per-table change counter behind the list pages' ETag / Last-Modified
+-- (app/core/conditional.py). One row per tracked table, bumped on write.
+CREATE TABLE IF NOT EXISTS rt.risk_table_version (
+    table_name  TEXT PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ DEFAULT now()
+);
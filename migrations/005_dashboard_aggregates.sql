@@ -0,0 +1,30 @@
+-- Time-bucketed dashboard aggregates, maintained by app/services/decision_aggregates.py
+CREATE TABLE IF NOT EXISTS rt.risk_decision_agg (
+    granularity   TEXT NOT NULL,              -- 5m | 1h | 1d
+    bucket_start  TIMESTAMPTZ NOT NULL,
+    source        TEXT NOT NULL,              -- AI | RULE
+    decision      TEXT NOT NULL,
+    country       TEXT NOT NULL,
+    txn_count     BIGINT NOT NULL DEFAULT 0,
+    amount_sum    DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, source, decision, country)
+);
+
+CREATE TABLE IF NOT EXISTS rt.risk_latency_agg (
+    granularity     TEXT NOT NULL,
+    bucket_start    TIMESTAMPTZ NOT NULL,
+    source          TEXT NOT NULL,
+    log_count       BIGINT NOT NULL DEFAULT 0,
+    latency_sum_ms  DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, source)
+);
+
+-- 5m buckets waiting to be recomputed (marked by the projection worker)
+CREATE TABLE IF NOT EXISTS rt.risk_agg_dirty (
+    bucket_start  TIMESTAMPTZ PRIMARY KEY,
+    marked_at     TIMESTAMPTZ DEFAULT now()
+);
+
+-- Bucket recomputes range-scan the raw log by time
+CREATE INDEX IF NOT EXISTS ix_risk_withdraw_decision_ts
+    ON rt.risk_withdraw_decision (decision_timestamp);
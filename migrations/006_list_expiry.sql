@@ -0,0 +1,40 @@
+-- List expiry (app/services/list_expiry.py). Per list table:
+--  * ix_<table>_expiry: the sweeper's "ACTIVE and due" scan, ordered by expires_at.
+--    Only rows that can still expire are in it, so it stays tiny.
+--  * ix_<table>_active: membership lookups on the active set. EXPIRED /
+--    INACTIVE history accumulates in the heap, not in this index.
+
+CREATE INDEX IF NOT EXISTS ix_risk_whitelist_user_expiry
+    ON rt.risk_whitelist_user (expires_at) WHERE status = 'ACTIVE' AND expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_risk_whitelist_user_active
+    ON rt.risk_whitelist_user (user_code) WHERE status = 'ACTIVE';
+
+CREATE INDEX IF NOT EXISTS ix_risk_whitelist_address_expiry
+    ON rt.risk_whitelist_address (expires_at) WHERE status = 'ACTIVE' AND expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_risk_whitelist_address_active
+    ON rt.risk_whitelist_address (destination_address) WHERE status = 'ACTIVE';
+
+CREATE INDEX IF NOT EXISTS ix_risk_greylist_expiry
+    ON rt.risk_greylist (expires_at) WHERE status = 'ACTIVE' AND expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_risk_greylist_active
+    ON rt.risk_greylist (entity_type, entity_value) WHERE status = 'ACTIVE';
+
+CREATE INDEX IF NOT EXISTS ix_risk_blacklist_user_expiry
+    ON rt.risk_blacklist_user (expires_at) WHERE status = 'ACTIVE' AND expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_risk_blacklist_user_active
+    ON rt.risk_blacklist_user (user_code) WHERE status = 'ACTIVE';
+
+CREATE INDEX IF NOT EXISTS ix_risk_blacklist_ip_expiry
+    ON rt.risk_blacklist_ip (expires_at) WHERE status = 'ACTIVE' AND expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_risk_blacklist_ip_active
+    ON rt.risk_blacklist_ip (ip_address) WHERE status = 'ACTIVE';
+
+CREATE INDEX IF NOT EXISTS ix_risk_blacklist_emaildomain_expiry
+    ON rt.risk_blacklist_emaildomain (expires_at) WHERE status = 'ACTIVE' AND expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_risk_blacklist_emaildomain_active
+    ON rt.risk_blacklist_emaildomain (email_domain) WHERE status = 'ACTIVE';
+
+CREATE INDEX IF NOT EXISTS ix_risk_blacklist_address_expiry
+    ON rt.risk_blacklist_address (expires_at) WHERE status = 'ACTIVE' AND expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_risk_blacklist_address_active
+    ON rt.risk_blacklist_address (destination_address) WHERE status = 'ACTIVE';
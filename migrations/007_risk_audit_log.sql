@@ -0,0 +1,19 @@
+-- Who changed which list / rule / prompt / user row, with before/after
+-- values (app/core/audit.py batches inserts off the request path).
+CREATE TABLE IF NOT EXISTS rt.risk_audit_log (
+    audit_id     BIGSERIAL PRIMARY KEY,
+    occurred_at  TIMESTAMPTZ NOT NULL,
+    actor        TEXT,
+    action       TEXT NOT NULL,
+    table_name   TEXT NOT NULL,
+    entity_key   TEXT,
+    before       JSONB,
+    after        JSONB,
+    request      TEXT
+);
+
+-- "History of this entry" and "what did this person change"
+CREATE INDEX IF NOT EXISTS ix_risk_audit_log_entity
+    ON rt.risk_audit_log (table_name, entity_key, occurred_at DESC);
+CREATE INDEX IF NOT EXISTS ix_risk_audit_log_actor
+    ON rt.risk_audit_log (actor, occurred_at DESC);
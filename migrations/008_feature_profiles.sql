@@ -0,0 +1,22 @@
+-- Per-column quantile sketches of risk_features (app/services/feature_profiles.py)
+CREATE TABLE IF NOT EXISTS rt.risk_feature_profile (
+    granularity   TEXT NOT NULL,              -- 1h | 1d
+    column_name   TEXT NOT NULL,
+    bucket_start  TIMESTAMPTZ NOT NULL,
+    nulls         BIGINT NOT NULL DEFAULT 0,
+    sketch        JSONB NOT NULL,
+    PRIMARY KEY (granularity, column_name, bucket_start)
+);
+
+-- Keyset position of the profile builder in risk_features
+CREATE TABLE IF NOT EXISTS rt.risk_feature_profile_watermark (
+    name         TEXT PRIMARY KEY,
+    update_time  TIMESTAMPTZ,
+    user_code    TEXT,
+    txn_id       TEXT,
+    updated_at   TIMESTAMPTZ DEFAULT now()
+);
+
+-- Keyset scans by update_time (profile builder and the recent-feature cache)
+CREATE INDEX IF NOT EXISTS ix_risk_features_update_key
+    ON rt.risk_features (update_time, user_code, txn_id);
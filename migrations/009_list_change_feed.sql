@@ -0,0 +1,19 @@
+-- Change feed of list membership (app/services/list_feed.py). The app
+-- appends the affected keys in the writing transaction (no triggers: the
+-- production database has none), so writes made outside the app's
+-- sessions (psql, other services) are not in the feed.
+--
+-- version is the feed counter row 'risk_list_changes' in
+-- rt.risk_table_version, bumped by the same transaction; its row lock is
+-- held until commit, so versions become visible in order.
+CREATE TABLE IF NOT EXISTS rt.risk_list_changes (
+    change_id   BIGSERIAL PRIMARY KEY,
+    version     BIGINT NOT NULL,
+    table_name  TEXT NOT NULL,
+    entry_part  TEXT,                      -- greylist entity_type, NULL elsewhere
+    entry_key   TEXT,                      -- NULL: bulk write whose keys weren't known
+    changed_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_risk_list_changes_version ON rt.risk_list_changes (version);
+CREATE INDEX IF NOT EXISTS ix_risk_list_changes_changed_at ON rt.risk_list_changes (changed_at);
@@ -0,0 +1,5 @@
+-- Projection rows whose country is still unresolved, retried by
+-- app/services/decision_projection.py (reresolve_unknown_countries)
+CREATE INDEX IF NOT EXISTS ix_risk_txn_latest_decision_unknown_country
+    ON rt.risk_txn_latest_decision (decision_timestamp DESC)
+    WHERE country = 'Unknown';
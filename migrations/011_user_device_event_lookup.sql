@@ -0,0 +1,7 @@
+-- Timeline device events (app/services/user_timeline.py _devices): walk the
+-- user's feature rows newest first on ix_risk_features_user_ts and fetch each
+-- txn's device rows by key, instead of hash-joining and sorting every device
+-- row the user has. The expression must match the join's
+-- CAST(event_id AS VARCHAR).
+CREATE INDEX IF NOT EXISTS ix_user_device_user_event_text
+    ON rt.user_device (user_code, (CAST(event_id AS VARCHAR)));
@@ -0,0 +1,19 @@
+-- Top AI reject per bucket for the dashboard's AI insight, maintained with
+-- the other aggregates by app/services/decision_aggregates.py
+CREATE TABLE IF NOT EXISTS rt.risk_ai_reject_agg (
+    granularity         TEXT NOT NULL,        -- 5m | 1h | 1d
+    bucket_start        TIMESTAMPTZ NOT NULL,
+    log_id              BIGINT NOT NULL,
+    confidence          DOUBLE PRECISION NOT NULL,
+    decision_timestamp  TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (granularity, bucket_start)
+);
+
+-- Existing aggregates predate this table: queue the buckets that hold an AI
+-- reject so the compactor fills it in
+INSERT INTO rt.risk_agg_dirty (bucket_start)
+SELECT DISTINCT to_timestamp(floor(extract(epoch FROM decision_timestamp) / 300) * 300)
+FROM rt.risk_withdraw_decision
+WHERE decision_source LIKE '%AI%' AND decision = 'REJECT' AND confidence > 0
+  AND decision_timestamp IS NOT NULL
+ON CONFLICT DO NOTHING;
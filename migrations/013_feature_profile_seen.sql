@@ -0,0 +1,21 @@
+-- Transactions already folded into the feature profiles, so a risk_features
+-- row that is re-written in place is counted once (its first write)
+CREATE TABLE IF NOT EXISTS rt.risk_feature_profiled (
+    user_code    TEXT NOT NULL,
+    txn_id       TEXT NOT NULL,
+    update_time  TIMESTAMPTZ NOT NULL,    -- of the write that was folded
+    PRIMARY KEY (user_code, txn_id)
+);
+
+-- Pruning past the backfill window
+CREATE INDEX IF NOT EXISTS ix_risk_feature_profiled_update_time
+    ON rt.risk_feature_profiled (update_time);
+
+-- Profiles built before this table: everything up to the watermark is folded
+INSERT INTO rt.risk_feature_profiled (user_code, txn_id, update_time)
+SELECT f.user_code, f.txn_id, f.update_time
+FROM rt.risk_features f
+JOIN rt.risk_feature_profile_watermark w ON w.name = 'risk_feature_profile'
+WHERE f.update_time >= now() - INTERVAL '90 days'
+  AND (f.update_time, f.user_code, f.txn_id) <= (w.update_time, w.user_code, w.txn_id)
+ON CONFLICT DO NOTHING;
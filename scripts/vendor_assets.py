@@ -0,0 +1,36 @@
+"""
+Downloads the third-party CSS/JS/fonts listed in app.core.static_assets.VENDOR_ASSETS
+into app/static/vendor so the console works offline and serves them with
+immutable caching. Already-present files are skipped.
+
+    python scripts/vendor_assets.py [--force]
+"""
+import os
+import sys
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.static_assets import STATIC_DIR, VENDOR_ASSETS  # noqa: E402
+
+
+def main(force: bool = False) -> int:
+    fetched = 0
+    for rel, url in VENDOR_ASSETS.items():
+        target = os.path.join(STATIC_DIR, *rel.split("/"))
+        if os.path.exists(target) and not force:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            data = resp.read()
+        with open(target + ".part", "wb") as f:
+            f.write(data)
+        os.replace(target + ".part", target)
+        print(f"{rel}  <- {url} ({len(data)} bytes)")
+        fetched += 1
+    print(f"{fetched} fetched, {len(VENDOR_ASSETS) - fetched} already vendored")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(force="--force" in sys.argv))